@@ -0,0 +1,3 @@
+"""
+pytest 配置 - 测试从 parser-service 目录导入 utils / parsers
+"""
@@ -4,21 +4,89 @@
 """
 
 import os
+import json
+import time
+import asyncio
+import functools
+import hashlib
 import base64
 import shutil
 import tempfile
 import subprocess
 import warnings
-from typing import Optional
+import urllib.parse
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Union
 
 import requests
 import urllib3
-from fastapi import FastAPI
+from fastapi import FastAPI, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 
-from utils import UrlParser, post_with_retry, get_with_retry, request_with_retry
-from parsers import DouyinParser, BilibiliParser, XiaohongshuParser
+from utils import (
+    UrlParser,
+    async_get_with_retry,
+    async_post_with_retry,
+    async_request_with_retry,
+    RangeNotSatisfiable,
+    parse_range_header,
+    is_suffix_range,
+    format_content_range,
+    iter_upstream,
+    BlockCache,
+    media_key,
+    response_total,
+    iter_cached_range,
+    find_ffmpeg,
+    detect_audio_codec,
+    remux_command,
+    iter_ffmpeg,
+    sse_event,
+    TencentAsrClient,
+    TencentAsrError,
+    TranscriptStore,
+    audio_hash,
+    ResponseCache,
+    LRUCache,
+    chat_cache_key,
+    proxy_cache_key,
+    KeyedLimiter,
+    estimate_tokens,
+    chunk_text,
+    shape_result,
+    FastJSONResponse,
+    FastJSONRoute,
+    CompressionMiddleware,
+    json_loads,
+    ndjson_line,
+    BreakerRegistry,
+    CircuitOpenError,
+    host_breakers,
+    mirror_stats,
+    rank_urls,
+    hedged_get,
+    async_hedged_get,
+    DeadlineExceeded,
+    DeadlineMiddleware,
+    check_deadline,
+    deadline_expired,
+    RequestCancelled,
+    CONTROL_EXCEPTIONS,
+    DisconnectMiddleware,
+    check_cancelled,
+    cancel_stats,
+    run_ffmpeg,
+    host_latency,
+    BoundedExecutor,
+    PriorityMiddleware,
+    priority_stats,
+    ALL_KEYS,
+    AdmissionMiddleware,
+    admission_stats,
+)
+from parsers import DouyinParser, BilibiliParser, XiaohongshuParser, resolve_sections
 from parsers.xiaohongshu import get_xhs_cookie, set_xhs_cookie
 
 warnings.filterwarnings("ignore", category=urllib3.exceptions.InsecureRequestWarning)
@@ -26,6 +94,67 @@ warnings.filterwarnings("ignore", category=urllib3.exceptions.InsecureRequestWar
 # B站 Cookie 配置
 BILIBILI_COOKIE = os.environ.get("BILIBILI_COOKIE", "")
 
+# B站代理 GET 响应缓存条目数（0 时关闭缓存）
+BILIBILI_CACHE_SIZE = int(os.environ.get("BILIBILI_CACHE_SIZE", "512"))
+
+# 音频块缓存配置：默认关闭，设置 AUDIO_CACHE_MAX_MB（如 1024）后 /proxy-audio
+# 将回源数据按块缓存到 AUDIO_CACHE_DIR
+AUDIO_CACHE_DIR = os.environ.get(
+    "AUDIO_CACHE_DIR", os.path.join(tempfile.gettempdir(), "wenan_audio_cache")
+)
+AUDIO_CACHE_MAX_MB = int(os.environ.get("AUDIO_CACHE_MAX_MB", "0"))
+AUDIO_CACHE_BLOCK_KB = int(os.environ.get("AUDIO_CACHE_BLOCK_KB", "256"))
+
+# 转写结果缓存数据库
+TRANSCRIPT_DB = os.environ.get(
+    "TRANSCRIPT_DB", os.path.join(tempfile.gettempdir(), "wenan_transcripts.db")
+)
+
+# 豆包 AI 结果缓存配置（DOUBAO_CACHE_DIR 为空时只使用内存缓存）
+DOUBAO_CACHE_SIZE = int(os.environ.get("DOUBAO_CACHE_SIZE", "256"))
+DOUBAO_CACHE_DIR = os.environ.get("DOUBAO_CACHE_DIR", "")
+
+# 豆包 AI 每个 API Key 的并发数与每分钟 token 配额（0 表示不限制）
+DOUBAO_MAX_CONCURRENCY = int(os.environ.get("DOUBAO_MAX_CONCURRENCY", "4"))
+DOUBAO_TOKENS_PER_MINUTE = int(os.environ.get("DOUBAO_TOKENS_PER_MINUTE", "0"))
+
+# 各平台解析（单条、分阶段与批量共用）与音频提取的并发上限，
+# 阻塞工作在专用线程池中执行，线程数为各上限之和
+PARSE_CONCURRENCY = {
+    "douyin": int(os.environ.get("PARSE_CONCURRENCY_DOUYIN", "4")),
+    "bilibili": int(os.environ.get("PARSE_CONCURRENCY_BILIBILI", "3")),
+    "xiaohongshu": int(os.environ.get("PARSE_CONCURRENCY_XIAOHONGSHU", "2")),
+}
+EXTRACT_AUDIO_CONCURRENCY = int(os.environ.get("EXTRACT_AUDIO_CONCURRENCY", "2"))
+
+# 未携带 X-Priority 时按后台任务调度的路由（其余为交互式请求）
+BACKGROUND_PATHS = (
+    "/parse/batch",
+    "/extract-audio",
+    "/proxy/batch",
+    "/proxy/doubao/batch",
+    "/proxy/doubao/long",
+    "/asr/tencent",
+)
+
+# 准入控制按目标队列检查排队：路由 -> 线程池的键（批量解析跨平台，检查全部键）
+ADMISSION_ROUTE_KEYS = {
+    "/parse": "douyin",
+    "/parse/bilibili": "bilibili",
+    "/parse/xiaohongshu": "xiaohongshu",
+    "/parse/batch": ALL_KEYS,
+    "/extract-audio": "extract",
+}
+
+# 平台解析熔断的慢调用阈值（秒）
+PARSE_BREAKER_SLOW_SECONDS = float(os.environ.get("PARSE_BREAKER_SLOW_SECONDS", "20"))
+
+# 请求未携带 X-Request-Deadline 时的默认截止时间（秒，0 表示不限制）
+REQUEST_DEADLINE_DEFAULT = float(os.environ.get("REQUEST_DEADLINE_DEFAULT", "0"))
+
+# 腾讯云 ASR 接口地址（可指向本地替身服务用于测试，见 mock_asr_server.py）
+TENCENT_ASR_ENDPOINT = os.environ.get("TENCENT_ASR_ENDPOINT", "")
+
 
 # ==================== FastAPI 应用 ====================
 
@@ -33,7 +162,32 @@ app = FastAPI(
     title="视频解析服务",
     description="支持抖音、B站、小红书视频解析 API",
     version="2.0.0",
+    default_response_class=FastJSONResponse,
 )
+# 路由返回的 dict / 模型直接编码为 JSON，跳过 jsonable_encoder
+app.router.route_class = FastJSONRoute
+
+# 较大的 JSON 响应按 Accept-Encoding 压缩（br 需安装 brotli）
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+# 按 X-Request-Deadline 请求头设置整体截止时间，传递到重定向、签名、请求与重试
+app.add_middleware(
+    DeadlineMiddleware, default_seconds=REQUEST_DEADLINE_DEFAULT or None
+)
+
+# 准入控制：进行中的请求、目标队列的排队数或排队时间超限时返回 429/503 +
+# Retry-After，后台请求先被拒绝；/health 与 /metrics 不受限制
+app.add_middleware(
+    AdmissionMiddleware,
+    load=lambda key, priority: worker_pool.load(key, priority),
+    route_keys=ADMISSION_ROUTE_KEYS,
+)
+
+# 按 X-Priority 请求头（或路由）设置优先级：排队时交互式请求优先于后台任务
+app.add_middleware(PriorityMiddleware, background_paths=BACKGROUND_PATHS)
+
+# 客户端断开时取消仍在进行的下载、FFmpeg、重试与轮询
+app.add_middleware(DisconnectMiddleware)
 
 # CORS 配置
 app.add_middleware(
@@ -42,31 +196,87 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # 允许前端读取代理信封与缓存状态响应头
+    expose_headers=["X-Proxy-Success", "X-Proxy-Status", "X-Proxy-Cookies", "X-Cache"],
 )
 
 
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(request: Request, exc: CircuitOpenError):
+    """熔断中的平台 / 上游主机：立即返回 503，不再走完整的请求与重试流程"""
+    return FastJSONResponse(
+        {"success": False, "message": str(exc), "circuit": exc.name},
+        status_code=503,
+        headers={"Retry-After": str(max(1, round(exc.retry_after)))},
+    )
+
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceeded):
+    """调用方的截止时间已耗尽：返回 504，不再继续后续阶段"""
+    return FastJSONResponse(
+        {"success": False, "message": str(exc), "stage": exc.stage},
+        status_code=504,
+    )
+
+
+@app.exception_handler(RequestCancelled)
+async def request_cancelled_handler(request: Request, exc: RequestCancelled):
+    """客户端已断开：响应不会被接收，返回 499 仅用于日志"""
+    return FastJSONResponse({"success": False, "message": str(exc)}, status_code=499)
+
+
 # ==================== 请求/响应模型 ====================
 
 
 class ParseRequest(BaseModel):
     url: str
     cookie: Optional[str] = None
+    # 分阶段返回：先返回元数据，再返回视频/音频流（NDJSON）
+    progressive: bool = False
+    # 需要计算的可选部分：streams/audio/subtitles/pages/music（逗号分隔或列表），默认全部
+    include: Optional[Union[str, List[str]]] = None
+    # 只返回指定字段（点分路径，如 title,stat.view,videoStreams.url）
+    fields: Optional[Union[str, List[str]]] = None
+    # 精简模式：去掉格式化的重复字段与视频流备用地址
+    compact: bool = False
 
 
 class CookieRequest(BaseModel):
     cookie: str
 
 
+# 解析失败的原因：上游故障（网络错误、5xx、风控，计入平台熔断统计）
+# 或链接本身的问题（链接无效、作品已删除 / 私密等，不计入）
+ERROR_UPSTREAM = "upstream"
+ERROR_INVALID = "invalid"
+
+
 class ParseResponse(BaseModel):
     success: bool
     message: str
     data: Optional[dict] = None
     needCookie: Optional[bool] = None
+    errorKind: Optional[str] = None
+
+
+def _parse_failure(
+    parser: Any, message: str = "解析失败，请检查链接是否正确"
+) -> ParseResponse:
+    """解析失败的结果，按解析器记录的上游错误区分失败原因"""
+    error_kind = ERROR_UPSTREAM if parser.upstream_error else ERROR_INVALID
+    return ParseResponse(success=False, message=message, errorKind=error_kind)
 
 
 class ExtractAudioRequest(BaseModel):
     video_url: str
     platform: str = "xiaohongshu"
+    # 备用 CDN 地址（解析结果中的 backupUrls），首字节过慢时对冲请求
+    backup_urls: Optional[List[str]] = None
+    # 可选：提供规范媒体 ID 与识别引擎时，先查询转写缓存，命中则跳过提取
+    media_id: Optional[str] = None
+    asr_engine: Optional[str] = None
+    asr_params: Optional[dict] = None
 
 
 class ExtractAudioResponse(BaseModel):
@@ -75,6 +285,23 @@ class ExtractAudioResponse(BaseModel):
     audio_base64: Optional[str] = None
     audio_size: Optional[int] = None
     duration: Optional[int] = None
+    audio_hash: Optional[str] = None
+    transcript: Optional[str] = None
+
+
+class TranscriptRequest(BaseModel):
+    """转写缓存查询/保存请求"""
+
+    engine: str
+    params: Optional[dict] = None
+    platform: Optional[str] = None
+    media_id: Optional[str] = None
+    audio_hash: Optional[str] = None
+    text: Optional[str] = None
+
+
+# 转写结果缓存
+transcript_store = TranscriptStore(TRANSCRIPT_DB)
 
 
 # ==================== 健康检查 ====================
@@ -89,7 +316,33 @@ async def root():
 @app.get("/health")
 async def health():
     """健康检查"""
-    return {"status": "healthy", "xhs_cookie_configured": bool(get_xhs_cookie())}
+    return {
+        "status": "healthy",
+        "xhs_cookie_configured": bool(get_xhs_cookie()),
+        "audio_cache": audio_cache.stats() if audio_cache is not None else None,
+        "transcripts": transcript_store.stats(),
+        "doubao_cache": doubao_cache.stats(),
+        "bilibili_cache": (
+            bilibili_cache.stats() if bilibili_cache is not None else None
+        ),
+        "circuits": {
+            "platforms": platform_breakers.stats(),
+            "hosts": host_breakers.stats(),
+        },
+        "mirrors": mirror_stats.stats(),
+        "latency": host_latency.stats(),
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    """运行指标：被取消的请求与工作、线程池排队情况、各优先级的耗时"""
+    return {
+        "cancelled": cancel_stats.stats(),
+        "executor": worker_pool.stats(),
+        "priority": priority_stats.stats(),
+        "admission": admission_stats.stats(),
+    }
 
 
 # ==================== Cookie 配置 ====================
@@ -117,6 +370,9 @@ async def config_bilibili_cookie(request: CookieRequest):
     """配置B站 Cookie"""
     global BILIBILI_COOKIE
     BILIBILI_COOKIE = request.cookie
+    # 登录身份变化，之前缓存的接口响应全部失效
+    if bilibili_cache is not None:
+        bilibili_cache.clear()
     return {"success": True, "message": "B站 Cookie 配置成功"}
 
 
@@ -136,241 +392,533 @@ async def get_bilibili_cookie_status():
 # ==================== 抖音解析 ====================
 
 
+def _resolve_douyin_url(url: str) -> str:
+    """抖音短链接重定向为真实链接"""
+    if "v.douyin.com" in url or not (
+        "douyin.com/video" in url or "douyin.com/note" in url
+    ):
+        real_url = DouyinParser.fetch_redirect_url(url)
+        if real_url:
+            url = real_url
+    return url
+
+
+def _parse_douyin_url(
+    url: str, cookie: Optional[str] = None, include: Optional[Iterable[str]] = None
+) -> ParseResponse:
+    """解析（已重定向的）抖音链接"""
+    parser = DouyinParser(url)
+    video_info = parser.get_video_info(include)
+
+    if video_info:
+        return ParseResponse(success=True, message="解析成功", data=video_info)
+    return _parse_failure(parser)
+
+
 @app.post("/parse", response_model=ParseResponse)
 async def parse_douyin(request: ParseRequest):
     """解析抖音视频"""
-    try:
-        url = request.url.strip()
-
-        # 从文本中提取 URL
-        extracted_url = UrlParser.get_url(url)
-        if not extracted_url:
-            extracted_url = url
-
-        # 检查是否是短链接，需要重定向
-        if "v.douyin.com" in extracted_url or not (
-            "douyin.com/video" in extracted_url or "douyin.com/note" in extracted_url
-        ):
-            real_url = DouyinParser.fetch_redirect_url(extracted_url)
-            if real_url:
-                extracted_url = real_url
-
-        # 解析视频
-        parser = DouyinParser(extracted_url)
-        video_info = parser.get_video_info()
-
-        if video_info:
-            return ParseResponse(success=True, message="解析成功", data=video_info)
-        else:
-            return ParseResponse(success=False, message="解析失败，请检查链接是否正确")
+    if request.progressive:
+        return _progressive_response("douyin", request)
+    result = await worker_pool.run(
+        "douyin", _parse_link, "douyin", request.url, request.cookie, request.include
+    )
+    return _shape_response(result, request)
 
-    except Exception as e:
-        print(f"[Douyin] Parse error: {e}")
-        import traceback
 
-        traceback.print_exc()
-        return ParseResponse(success=False, message=f"解析出错: {str(e)}")
+# ==================== B站解析 ====================
 
 
-# ==================== B站解析 ====================
+def _resolve_bilibili_url(url: str) -> str:
+    """B站短链接重定向为真实链接"""
+    if "b23.tv" in url:
+        real_url = BilibiliParser.fetch_redirect_url(url)
+        if real_url:
+            url = real_url
+            print(f"[Bilibili] Redirect URL: {url}")
+    return url
+
+
+def _parse_bilibili_url(
+    url: str, cookie: Optional[str] = None, include: Optional[Iterable[str]] = None
+) -> ParseResponse:
+    """解析（已重定向的）B站链接"""
+    parser = BilibiliParser(url, cookie)
+    video_info = parser.get_video_info(include)
+
+    if video_info:
+        return ParseResponse(success=True, message="解析成功", data=video_info)
+    return _parse_failure(parser)
 
 
 @app.post("/parse/bilibili", response_model=ParseResponse)
 async def parse_bilibili(request: ParseRequest):
     """解析B站视频"""
-    try:
-        url = request.url.strip()
-        cookie = request.cookie
-
-        print("=" * 60)
-        print("[Bilibili API] 收到解析请求")
-        print("=" * 60)
+    url = request.url.strip()
+    cookie = request.cookie
+
+    print("=" * 60)
+    print("[Bilibili API] 收到解析请求")
+    print("=" * 60)
+    print(
+        f"[Bilibili API] 原始输入: {url[:100]}..."
+        if len(url) > 100
+        else f"[Bilibili API] 原始输入: {url}"
+    )
+    print(f"[Bilibili API] Cookie长度: {len(cookie) if cookie else 0}")
 
-        # 从文本中提取 URL
-        extracted_url = UrlParser.get_url(url)
-        if not extracted_url:
-            extracted_url = url
+    if cookie:
+        print(f"[Bilibili API] Cookie包含 SESSDATA: {'SESSDATA' in cookie}")
+        print(f"[Bilibili API] Cookie包含 bili_jct: {'bili_jct' in cookie}")
+        print(f"[Bilibili API] Cookie包含 DedeUserID: {'DedeUserID' in cookie}")
 
-        print(
-            f"[Bilibili API] 原始输入: {url[:100]}..."
-            if len(url) > 100
-            else f"[Bilibili API] 原始输入: {url}"
-        )
-        print(f"[Bilibili API] 提取URL: {extracted_url}")
-        print(f"[Bilibili API] Cookie长度: {len(cookie) if cookie else 0}")
-
-        if cookie:
-            print(f"[Bilibili API] Cookie包含 SESSDATA: {'SESSDATA' in cookie}")
-            print(f"[Bilibili API] Cookie包含 bili_jct: {'bili_jct' in cookie}")
-            print(f"[Bilibili API] Cookie包含 DedeUserID: {'DedeUserID' in cookie}")
-
-        # 检查是否是短链接，需要重定向
-        if "b23.tv" in extracted_url:
-            real_url = BilibiliParser.fetch_redirect_url(extracted_url)
-            if real_url:
-                extracted_url = real_url
-                print(f"[Bilibili] Redirect URL: {extracted_url}")
-
-        # 解析视频
-        parser = BilibiliParser(extracted_url, cookie)
-        video_info = parser.get_video_info()
-
-        if video_info:
-            return ParseResponse(success=True, message="解析成功", data=video_info)
-        else:
-            return ParseResponse(success=False, message="解析失败，请检查链接是否正确")
+    if request.progressive:
+        return _progressive_response("bilibili", request)
+    result = await worker_pool.run(
+        "bilibili", _parse_link, "bilibili", url, cookie, request.include
+    )
+    return _shape_response(result, request)
 
-    except Exception as e:
-        print(f"[Bilibili] Parse error: {e}")
-        import traceback
 
-        traceback.print_exc()
-        return ParseResponse(success=False, message=f"解析出错: {str(e)}")
+# ==================== 小红书解析 ====================
 
 
-# ==================== 小红书解析 ====================
+def _resolve_xiaohongshu_url(url: str) -> str:
+    """小红书短链接重定向为真实链接"""
+    if "xhslink.com" in url:
+        real_url = XiaohongshuParser.fetch_redirect_url(url)
+        if not real_url:
+            raise ValueError("短链接解析失败，请检查链接是否有效")
+        print(f"[XHS] Short link redirect: {real_url}")
+        return real_url
+    if "xiaohongshu.com" in url:
+        print(f"[XHS] Long link: {url}")
+        return url
+    raise ValueError("不支持的链接格式")
+
+
+def _parse_xiaohongshu_url(
+    url: str, cookie: Optional[str] = None, include: Optional[Iterable[str]] = None
+) -> ParseResponse:
+    """解析（已重定向的）小红书链接，带重试"""
+    print(f"[XHS] Final URL: {url}")
+    # 未请求视频流时不以 videoUrl 判断是否需要重试
+    need_video_url = "streams" in resolve_sections(include)
+
+    max_attempts = 3
+    video_info = None
+    last_error = None
+    upstream_error = None
+
+    for attempt in range(max_attempts):
+        if attempt:
+            # 预算耗尽时不再重试
+            check_deadline("parse")
+        try:
+            parser = XiaohongshuParser(url)
+            video_info = parser.get_video_info(include)
+            upstream_error = parser.upstream_error
+            if video_info and (
+                video_info.get("videoUrl")
+                or video_info.get("images")
+                or not need_video_url
+            ):
+                break
+            print(f"[XHS] Attempt {attempt + 1} failed, retrying...")
+        except CONTROL_EXCEPTIONS:
+            raise
+        except Exception as e:
+            last_error = upstream_error = e
+            print(f"[XHS] Attempt {attempt + 1} error: {e}")
+
+    if video_info:
+        return ParseResponse(success=True, message="解析成功", data=video_info)
+    error_msg = "解析失败，请检查链接是否有效"
+    if last_error:
+        error_msg += f" ({str(last_error)})"
+    return ParseResponse(
+        success=False,
+        message=error_msg,
+        errorKind=ERROR_UPSTREAM if upstream_error else ERROR_INVALID,
+    )
 
 
 @app.post("/parse/xiaohongshu", response_model=ParseResponse)
 async def parse_xiaohongshu(request: ParseRequest):
     """解析小红书视频/图文"""
-    try:
-        url = request.url.strip()
+    if request.progressive:
+        return _progressive_response("xiaohongshu", request)
+    result = await worker_pool.run(
+        "xiaohongshu",
+        _parse_link,
+        "xiaohongshu",
+        request.url,
+        request.cookie,
+        request.include,
+    )
+    return _shape_response(result, request)
 
-        # 从文本中提取 URL
-        extracted_url = UrlParser.get_url(url)
-        if not extracted_url:
-            extracted_url = url
 
-        print(f"[XHS] Extracted URL: {extracted_url}")
+# ==================== 通用解析流程 ====================
 
-        real_url = extracted_url
+# 解析与音频提取的专用线程池：每个平台独立排队，突发请求不会占满其他平台的线程
+worker_pool = BoundedExecutor(
+    {**PARSE_CONCURRENCY, "extract": EXTRACT_AUDIO_CONCURRENCY}, name="parse"
+)
 
-        # 判断链接类型
-        if "xhslink.com" in extracted_url:
-            real_url = XiaohongshuParser.fetch_redirect_url(extracted_url)
-            if not real_url:
-                return ParseResponse(
-                    success=False, message="短链接解析失败，请检查链接是否有效"
-                )
-            print(f"[XHS] Short link redirect: {real_url}")
-        elif "xiaohongshu.com" in extracted_url:
-            real_url = extracted_url
-            print(f"[XHS] Long link: {real_url}")
-        else:
-            return ParseResponse(success=False, message="不支持的链接格式")
+# 每个平台的熔断器：签名失效、登录墙等导致解析持续失败或变慢时快速失败
+platform_breakers = BreakerRegistry(slow_call_seconds=PARSE_BREAKER_SLOW_SECONDS)
 
-        print(f"[XHS] Final URL: {real_url}")
 
-        # 解析视频 - 添加重试机制
-        max_attempts = 3
-        video_info = None
-        last_error = None
+def _gated(platform: str, resolve: Callable) -> Callable:
+    """熔断打开时跳过短链接重定向，直接拒绝（重定向结果不计入熔断统计）"""
+    breaker = platform_breakers.get(platform)
 
-        for attempt in range(max_attempts):
-            try:
-                parser = XiaohongshuParser(real_url)
-                video_info = parser.get_video_info()
-                if video_info and (
-                    video_info.get("videoUrl") or video_info.get("images")
-                ):
-                    break
-                print(f"[XHS] Attempt {attempt + 1} failed, retrying...")
-            except Exception as e:
-                last_error = e
-                print(f"[XHS] Attempt {attempt + 1} error: {e}")
+    @functools.wraps(resolve)
+    def wrapper(url: str) -> str:
+        breaker.raise_if_open()
+        resolved = resolve(url)
+        # 重定向失败时原样返回链接，耗尽预算后不再进入解析
+        check_deadline("redirect")
+        return resolved
 
-        if video_info:
-            return ParseResponse(success=True, message="解析成功", data=video_info)
-        else:
-            error_msg = "解析失败，请检查链接是否有效"
-            if last_error:
-                error_msg += f" ({str(last_error)})"
-            return ParseResponse(success=False, message=error_msg)
+    return wrapper
+
+
+def _guarded(platform: str, parse: Callable) -> Callable:
+    """
+    在平台熔断器保护下解析，异常与上游故障导致的失败（errorKind=upstream）
+    计为失败；链接无效、作品不存在等用户侧失败不计入。
 
+    调用方截止时间耗尽导致的失败不计入熔断统计，转为 DeadlineExceeded。
+    """
+    breaker = platform_breakers.get(platform)
+
+    def failed(result: ParseResponse) -> bool:
+        return result.errorKind == ERROR_UPSTREAM and not deadline_expired()
+
+    @functools.wraps(parse)
+    def wrapper(*args, **kwargs) -> ParseResponse:
+        result = breaker.call(
+            parse,
+            *args,
+            failed=failed,
+            ignore=(DeadlineExceeded, RequestCancelled),
+            **kwargs,
+        )
+        if not result.success:
+            check_deadline("parse")
+        return result
+
+    return wrapper
+
+
+# 平台 -> (短链接重定向, 解析)，均受平台熔断器保护
+PLATFORM_PARSERS = {
+    platform: (_gated(platform, resolve), _guarded(platform, parse))
+    for platform, (resolve, parse) in {
+        "douyin": (_resolve_douyin_url, _parse_douyin_url),
+        "bilibili": (_resolve_bilibili_url, _parse_bilibili_url),
+        "xiaohongshu": (_resolve_xiaohongshu_url, _parse_xiaohongshu_url),
+    }.items()
+}
+
+# 平台日志前缀
+PLATFORM_TAGS = {"douyin": "Douyin", "bilibili": "Bilibili", "xiaohongshu": "XHS"}
+
+
+def _extract_link(text: str) -> str:
+    """从分享文本中提取 URL，提取不到时原样返回"""
+    text = text.strip()
+    return UrlParser.get_url(text) or text
+
+
+def _parse_link(
+    platform: str,
+    text: str,
+    cookie: Optional[str] = None,
+    include: Optional[Union[str, List[str]]] = None,
+) -> ParseResponse:
+    """
+    提取链接、重定向并解析（同步，在线程池中执行）
+
+    Raises:
+        CircuitOpenError: 平台熔断中（由异常处理器返回 503）
+        DeadlineExceeded: 超出请求截止时间（由异常处理器返回 504）
+    """
+    resolve, parse = PLATFORM_PARSERS[platform]
+    try:
+        url = _extract_link(text)
+        print(f"[{PLATFORM_TAGS[platform]}] Extracted URL: {url}")
+        return parse(resolve(url), cookie, resolve_sections(include))
+    except ValueError as e:
+        return ParseResponse(success=False, message=str(e), errorKind=ERROR_INVALID)
+    except CONTROL_EXCEPTIONS:
+        raise
     except Exception as e:
-        print(f"[XHS] Parse error: {e}")
+        print(f"[{PLATFORM_TAGS[platform]}] Parse error: {e}")
         import traceback
 
         traceback.print_exc()
-        return ParseResponse(success=False, message=f"解析出错: {str(e)}")
+        return ParseResponse(
+            success=False, message=f"解析出错: {str(e)}", errorKind=ERROR_UPSTREAM
+        )
 
 
-# ==================== 音频提取 ====================
+def _shape_response(result: ParseResponse, request) -> ParseResponse:
+    """按请求的 fields / compact 裁剪解析结果"""
+    if result.data is not None and (request.fields or request.compact):
+        result.data = shape_result(result.data, request.fields, request.compact)
+    return result
+
+
+# 支持分阶段返回的平台 -> 创建解析器（需提供 get_metadata / get_streams）
+PROGRESSIVE_PARSERS = {
+    "douyin": lambda url, cookie: DouyinParser(url),
+    "bilibili": BilibiliParser,
+}
+
+
+def _parse_link_progressive(platform: str, request: ParseRequest) -> Iterator[bytes]:
+    """
+    分阶段解析（同步生成器，逐行产出 NDJSON）
+
+    先产出 phase=meta（标题、封面、作者、统计），再产出 phase=streams
+    （videoUrl、videoStreams、audioStream 等）；不支持分阶段的平台只产出一行
+    phase=full。最后一行带 done=true，elapsed 为自请求开始的秒数。
+    include 不含 streams 和 audio 时只产出 meta；fields / compact 分别作用于每个阶段。
+    """
+    started = time.monotonic()
+    resolve, parse = PLATFORM_PARSERS[platform]
+    breaker = platform_breakers.get(platform)
+    cookie = request.cookie
+    sections = resolve_sections(request.include)
+    need_streams = bool(sections & {"streams", "audio"})
+    phase = "meta"
+
+    def line(result: ParseResponse, done: bool = False) -> str:
+        result = _shape_response(result, request)
+        item = {"phase": phase, **result.dict(exclude_none=True)}
+        item["elapsed"] = round(time.monotonic() - started, 3)
+        if done:
+            item["done"] = True
+        return ndjson_line(item)
 
+    try:
+        url = resolve(_extract_link(request.url))
+        if platform not in PROGRESSIVE_PARSERS:
+            phase = "full"
+            yield line(parse(url, cookie, sections), done=True)
+            return
+
+        parser = PROGRESSIVE_PARSERS[platform](url, cookie)
+
+        def failed(data) -> bool:
+            # 只有上游故障计入熔断统计
+            return data is None and bool(parser.upstream_error)
+
+        metadata = breaker.call(
+            parser.get_metadata,
+            sections,
+            failed=failed,
+            ignore=(DeadlineExceeded, RequestCancelled),
+        )
+        if metadata is None:
+            yield line(_parse_failure(parser), done=True)
+            return
+        yield line(
+            ParseResponse(success=True, message="解析成功", data=metadata),
+            done=not need_streams,
+        )
+        if not need_streams:
+            return
+
+        phase = "streams"
+        streams = breaker.call(
+            parser.get_streams,
+            sections,
+            failed=failed,
+            ignore=(DeadlineExceeded, RequestCancelled),
+        )
+        if streams is None:
+            yield line(_parse_failure(parser, "获取播放链接失败"), done=True)
+            return
+        yield line(ParseResponse(success=True, message="解析成功", data=streams), done=True)
 
-@app.post("/extract-audio", response_model=ExtractAudioResponse)
-async def extract_audio(request: ExtractAudioRequest):
-    """从视频中提取音频（使用 FFmpeg）"""
-    video_url = request.video_url
-    platform = request.platform
+    except (ValueError, CircuitOpenError, DeadlineExceeded) as e:
+        yield line(ParseResponse(success=False, message=str(e)), done=True)
+    except Exception as e:
+        print(f"[{PLATFORM_TAGS[platform]}] Progressive parse error: {e}")
+        import traceback
 
-    # 查找 FFmpeg - 优先使用打包目录中的 FFmpeg
-    ffmpeg_path = None
-    
-    # 1. 检查打包环境 (PyInstaller)
-    if getattr(sys, "frozen", False):
-        # 打包环境: FFmpeg 在 _internal 目录
-        bundled_ffmpeg = os.path.join(sys._MEIPASS, "ffmpeg.exe")
-        if os.path.exists(bundled_ffmpeg):
-            ffmpeg_path = bundled_ffmpeg
-            print(f"[FFmpeg] 使用打包的 FFmpeg: {ffmpeg_path}")
-    
-    # 2. 检查开发环境 (同目录)
-    if not ffmpeg_path:
-        local_ffmpeg = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ffmpeg.exe")
-        if os.path.exists(local_ffmpeg):
-            ffmpeg_path = local_ffmpeg
-            print(f"[FFmpeg] 使用本地 FFmpeg: {ffmpeg_path}")
-    
-    # 3. 检查系统 PATH
-    if not ffmpeg_path:
-        ffmpeg_path = shutil.which("ffmpeg")
-        if ffmpeg_path:
-            print(f"[FFmpeg] 使用系统 FFmpeg: {ffmpeg_path}")
-    
-    if not ffmpeg_path:
-        return ExtractAudioResponse(
-            success=False, message="FFmpeg 未安装，无法提取音频"
-        )
+        traceback.print_exc()
+        yield line(ParseResponse(success=False, message=f"解析出错: {str(e)}"), done=True)
 
-    temp_dir = None
-    try:
-        temp_dir = tempfile.mkdtemp(prefix="audio_extract_")
-        video_path = os.path.join(temp_dir, "video.mp4")
-        audio_path = os.path.join(temp_dir, "audio.mp3")
 
-        print(f"[ExtractAudio] Downloading video from: {video_url[:60]}...")
+def _progressive_response(platform: str, request: ParseRequest) -> StreamingResponse:
+    """以 NDJSON 分阶段返回解析结果"""
+    return StreamingResponse(
+        worker_pool.iterate(platform, _parse_link_progressive(platform, request)),
+        media_type="application/x-ndjson",
+    )
+
 
-        # 下载视频（带重试机制）
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-            "Referer": (
-                "https://www.xiaohongshu.com/"
-                if platform == "xiaohongshu"
-                else "https://www.douyin.com/"
-            ),
-        }
+# ==================== 批量解析 ====================
 
-        success, result = get_with_retry(
-            url=video_url,
-            headers=headers,
-            stream=True,
-            timeout=60,
-            retries=3,
-            retry_delay=1.0,
-        )
 
-        if not success:
-            return ExtractAudioResponse(
-                success=False, message=f"视频下载失败: {result}"
+class BatchParseRequest(BaseModel):
+    """批量解析请求：urls 与 text 中的链接会合并后去重"""
+
+    urls: Optional[List[str]] = None
+    # 粘贴的原始文本，提取其中全部链接
+    text: Optional[str] = None
+    # B站 Cookie
+    cookie: Optional[str] = None
+    # 需要计算的可选部分、字段投影与精简模式，同 ParseRequest
+    include: Optional[Union[str, List[str]]] = None
+    fields: Optional[Union[str, List[str]]] = None
+    compact: bool = False
+
+
+# 单次批量解析的链接数上限
+PARSE_BATCH_MAX = int(os.environ.get("PARSE_BATCH_MAX", "500"))
+
+
+def _collect_links(request: BatchParseRequest) -> List[str]:
+    """汇总请求中的全部链接（按出现顺序去重）"""
+    links = []
+    for item in (request.urls or []) + ([request.text] if request.text else []):
+        for url in UrlParser.get_urls(item) or ([item.strip()] if item.strip() else []):
+            if url not in links:
+                links.append(url)
+    return links
+
+
+@app.post("/parse/batch")
+async def parse_batch(request: BatchParseRequest):
+    """
+    批量解析 - 以 NDJSON 逐条返回先完成的结果
+
+    每行包含 index（链接在输入中的顺序）、url、platform、canonicalId 及
+    ParseResponse 字段；重定向后规范 ID 重复的链接只解析一次，
+    其余行带 duplicateOf 指向首次出现的 index。最后一行为 {"done": true, ...}。
+    """
+    links = _collect_links(request)
+    if not links:
+        return {"success": False, "message": "未找到链接"}
+    if len(links) > PARSE_BATCH_MAX:
+        return {
+            "success": False,
+            "message": f"链接数量超过上限 {PARSE_BATCH_MAX}",
+        }
+
+    started = time.monotonic()
+    sections = resolve_sections(request.include)
+    # (平台, 规范 ID) -> 首次出现的 index
+    seen = {}
+    print(f"[Parse Batch] 批量解析 {len(links)} 个链接")
+
+    async def parse_one(index: int, url: str) -> dict:
+        item_started = time.monotonic()
+        item = {"index": index, "url": url, "platform": UrlParser.detect_platform(url)}
+        platform = item["platform"]
+        if platform is None:
+            item.update({"success": False, "message": "不支持的链接格式"})
+            return item
+
+        resolve, parse = PLATFORM_PARSERS[platform]
+        try:
+            async with worker_pool.slot(platform):
+                try:
+                    real_url = await worker_pool.call(resolve, url)
+                except (ValueError, CircuitOpenError, DeadlineExceeded) as e:
+                    item.update({"success": False, "message": str(e)})
+                    return item
+                except Exception as e:
+                    item.update({"success": False, "message": f"解析出错: {str(e)}"})
+                    return item
+
+                canonical_id = (
+                    UrlParser.get_canonical_id(real_url, platform) or real_url
+                )
+                item["canonicalId"] = canonical_id
+                key = (platform, canonical_id)
+                if key in seen:
+                    item.update(
+                        {"success": True, "message": "重复链接", "duplicateOf": seen[key]}
+                    )
+                    return item
+                seen[key] = index
+
+                try:
+                    result = await worker_pool.call(
+                        parse, real_url, request.cookie, sections
+                    )
+                except (CircuitOpenError, DeadlineExceeded) as e:
+                    result = ParseResponse(success=False, message=str(e))
+                except Exception as e:
+                    print(f"[Parse Batch] {url} error: {e}")
+                    result = ParseResponse(
+                        success=False, message=f"解析出错: {str(e)}"
+                    )
+        except DeadlineExceeded as e:
+            # 排队期间截止时间耗尽
+            item.update({"success": False, "message": str(e)})
+            return item
+
+        item.update(_shape_response(result, request).dict(exclude_none=True))
+        item["elapsed"] = round(time.monotonic() - item_started, 3)
+        return item
+
+    async def results():
+        tasks = [asyncio.ensure_future(parse_one(i, url)) for i, url in enumerate(links)]
+        succeeded = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                item = await next_done
+                succeeded += bool(item["success"] and "duplicateOf" not in item)
+                yield ndjson_line(item)
+            yield ndjson_line(
+                {
+                    "done": True,
+                    "total": len(links),
+                    "unique": len(seen),
+                    "succeeded": succeeded,
+                    "elapsed": round(time.monotonic() - started, 3),
+                }
             )
+        finally:
+            # 客户端断开时取消尚未开始的解析
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
 
-        resp = result
-        resp.raise_for_status()
 
-        with open(video_path, "wb") as f:
-            for chunk in resp.iter_content(chunk_size=8192):
+# ==================== 音频提取 ====================
+
+
+def _extract_audio_file(resp: requests.Response, ffmpeg_path: str) -> bytes:
+    """
+    下载视频并使用 FFmpeg 提取音频（同步，在线程池中执行）
+
+    临时目录由本函数创建并清理。客户端断开时下载循环与 FFmpeg 立即中止，
+    不再把已无人接收的视频下载完、转码完。
+
+    Raises:
+        RequestCancelled: 客户端已断开
+        DeadlineExceeded: 请求截止时间已耗尽
+        RuntimeError: FFmpeg 提取失败
+    """
+    temp_dir = tempfile.mkdtemp(prefix="audio_extract_")
+    try:
+        video_path = os.path.join(temp_dir, "video.mp4")
+        audio_path = os.path.join(temp_dir, "audio.mp3")
+
+        with resp, open(video_path, "wb") as f:
+            for chunk in resp.iter_content(chunk_size=64 * 1024):
+                check_cancelled("download")
+                check_deadline("download")
                 f.write(chunk)
 
         video_size = os.path.getsize(video_path)
@@ -395,25 +943,96 @@ async def extract_audio(request: ExtractAudioRequest):
         ]
 
         print(f"[ExtractAudio] Running FFmpeg...")
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
+        result = run_ffmpeg(cmd, timeout=120)
 
         if result.returncode != 0:
             print(f"[ExtractAudio] FFmpeg error: {result.stderr}")
-            return ExtractAudioResponse(
-                success=False, message=f"FFmpeg 提取失败: {result.stderr[:200]}"
-            )
+            raise RuntimeError(f"FFmpeg 提取失败: {result.stderr[:200]}")
 
         if not os.path.exists(audio_path):
-            return ExtractAudioResponse(
-                success=False, message="音频提取失败，未生成音频文件"
-            )
+            raise RuntimeError("音频提取失败，未生成音频文件")
 
         audio_size = os.path.getsize(audio_path)
         print(f"[ExtractAudio] Audio extracted: {audio_size / 1024:.1f}KB")
 
         with open(audio_path, "rb") as f:
-            audio_data = f.read()
+            return f.read()
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+@app.post("/extract-audio", response_model=ExtractAudioResponse)
+async def extract_audio(request: ExtractAudioRequest):
+    """从视频中提取音频（使用 FFmpeg）"""
+    video_url = request.video_url
+    platform = request.platform
+
+    # 已有兼容的转写结果时，无需下载和提取
+    if request.media_id and request.asr_engine:
+        cached = await run_in_threadpool(
+            transcript_store.lookup,
+            request.asr_engine,
+            request.asr_params,
+            platform=platform,
+            media_id=request.media_id,
+        )
+        if cached:
+            print(f"[ExtractAudio] 命中转写缓存: {platform}/{request.media_id}")
+            return ExtractAudioResponse(
+                success=True, message="命中转写缓存", transcript=cached["text"]
+            )
+
+    ffmpeg_path = find_ffmpeg()
+    if not ffmpeg_path:
+        return ExtractAudioResponse(
+            success=False, message="FFmpeg 未安装，无法提取音频"
+        )
+
+    print(f"[ExtractAudio] Downloading video from: {video_url[:60]}...")
+
+    # 下载视频（带重试机制）
+    headers = {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+        "Referer": (
+            "https://www.xiaohongshu.com/"
+            if platform == "xiaohongshu"
+            else "https://www.douyin.com/"
+        ),
+    }
+
+    try:
+        if request.backup_urls:
+            # 有备用 CDN 时按延迟排序并对冲请求，不再对单个地址重试
+            resp = await async_hedged_get(
+                rank_urls([video_url, *request.backup_urls]),
+                headers=headers,
+                stream=True,
+                timeout=60,
+            )
+        else:
+            success, result = await async_get_with_retry(
+                url=video_url,
+                headers=headers,
+                stream=True,
+                timeout=60,
+                retries=3,
+                retry_delay=1.0,
+            )
 
+            if not success:
+                return ExtractAudioResponse(
+                    success=False, message=f"视频下载失败: {result}"
+                )
+            resp = result
+
+        if resp.status_code >= 400:
+            resp.close()
+        resp.raise_for_status()
+
+        audio_data = await worker_pool.run(
+            "extract", _extract_audio_file, resp, ffmpeg_path
+        )
+        audio_size = len(audio_data)
         audio_base64 = base64.b64encode(audio_data).decode("utf-8")
         estimated_duration = int(audio_size * 8 / 64000)
 
@@ -423,22 +1042,23 @@ async def extract_audio(request: ExtractAudioRequest):
             audio_base64=audio_base64,
             audio_size=audio_size,
             duration=estimated_duration,
+            audio_hash=audio_hash(audio_data),
         )
 
     except requests.exceptions.Timeout:
         return ExtractAudioResponse(success=False, message="视频下载超时")
+    except (DeadlineExceeded, RequestCancelled):
+        raise
+    except subprocess.TimeoutExpired:
+        return ExtractAudioResponse(success=False, message="FFmpeg 提取超时")
+    except RuntimeError as e:
+        return ExtractAudioResponse(success=False, message=str(e))
     except Exception as e:
         print(f"[ExtractAudio] Error: {e}")
         import traceback
 
         traceback.print_exc()
         return ExtractAudioResponse(success=False, message=f"音频提取失败: {str(e)}")
-    finally:
-        if temp_dir and os.path.exists(temp_dir):
-            try:
-                shutil.rmtree(temp_dir)
-            except:
-                pass
 
 
 # ==================== API 代理 ====================
@@ -451,15 +1071,161 @@ class ProxyRequest(BaseModel):
     method: str = "GET"
     headers: Optional[dict] = None
     body: Optional[str] = None
+    # 启用结果缓存（仅 /proxy/doubao）
+    cache: bool = False
+    # 原始透传（仅 /proxy/bilibili、/proxy/tencent）：上游状态码与响应体原样返回，
+    # 信封字段放在 X-Proxy-* 响应头中
+    raw: bool = False
+
+
+# 音频块缓存（未启用时为 None）
+audio_cache = (
+    BlockCache(
+        AUDIO_CACHE_DIR,
+        block_size=AUDIO_CACHE_BLOCK_KB * 1024,
+        max_bytes=AUDIO_CACHE_MAX_MB * 1024 * 1024,
+    )
+    if AUDIO_CACHE_MAX_MB > 0
+    else None
+)
 
 
-from fastapi import Query
-from fastapi.responses import StreamingResponse
+async def _proxy_audio_cached(
+    url: str,
+    mirrors: List[str],
+    headers: dict,
+    range_header: Optional[str],
+    platform: str = "",
+):
+    """
+    通过块缓存代理音频（缓存键取自平台与 url，回源时按 mirrors 对冲请求）
+
+    Returns:
+        StreamingResponse / Response；无法确定资源总大小时返回 None（走普通代理）
+    """
+    key = media_key(url, platform)
+
+    def fetch(start: int, end: Optional[int]) -> requests.Response:
+        range_headers = dict(headers)
+        range_headers["Range"] = f"bytes={start}-{end if end is not None else ''}"
+        resp = hedged_get(mirrors, headers=range_headers, stream=True, timeout=30)
+        if resp.status_code >= 400:
+            resp.close()
+        resp.raise_for_status()
+        return resp
+
+    resp = None
+    meta = audio_cache.get_meta(key)
+    if meta is None:
+        # 首次访问：从客户端起点所在的块开始回源，同时获取总大小
+        probe_start = 0
+        try:
+            byte_range = parse_range_header(range_header)
+        except RangeNotSatisfiable:
+            byte_range = None
+        if byte_range:
+            probe_start = byte_range[0] - byte_range[0] % audio_cache.block_size
+        elif is_suffix_range(range_header):
+            # 后缀范围（播放器读取末尾的 moov / ID3）：先用 1 字节请求获取总大小，
+            # 再从末尾所在的块回源，避免从头下载整个文件
+            probe = await run_in_threadpool(fetch, 0, 0)
+            probe.close()
+        else:
+            probe = resp = await run_in_threadpool(fetch, probe_start, None)
+
+        total = response_total(probe)
+        if not total:
+            probe.close()
+            return None
+        meta = await run_in_threadpool(
+            audio_cache.set_meta,
+            key,
+            total,
+            probe.headers.get("Content-Type", "audio/mpeg"),
+        )
+
+    total = meta["total"]
+    try:
+        byte_range = parse_range_header(range_header, total)
+    except RangeNotSatisfiable:
+        if resp is not None:
+            resp.close()
+        return Response(
+            status_code=416,
+            headers={
+                "Content-Range": f"bytes */{total}",
+                "Access-Control-Allow-Origin": "*",
+            },
+        )
+
+    start, end = byte_range if byte_range else (0, total - 1)
+    response_headers = {
+        "Accept-Ranges": "bytes",
+        "Access-Control-Allow-Origin": "*",
+        "Content-Length": str(end - start + 1),
+    }
+    if byte_range:
+        response_headers["Content-Range"] = format_content_range(start, end, total)
+
+    return StreamingResponse(
+        iter_cached_range(
+            audio_cache, key, fetch, start, end, total, resp=resp, tag="Proxy Audio"
+        ),
+        status_code=206 if byte_range else 200,
+        media_type=meta["contentType"],
+        headers=response_headers,
+    )
+
+
+async def _proxy_audio_remux(
+    url: str, mirrors: List[str], headers: dict, codecs: Optional[str]
+):
+    """通过 FFmpeg 转封装代理 DASH 音频"""
+    ffmpeg_path = find_ffmpeg()
+    if not ffmpeg_path:
+        return _audio_error("FFmpeg 未安装，无法转封装音频", 503)
+
+    codec = detect_audio_codec(url, codecs)
+    print(f"[Proxy Audio] Remux ({codec}): {url[:80]}...")
+
+    resp = await async_hedged_get(mirrors, headers=headers, stream=True, timeout=30)
+    if resp.status_code >= 400:
+        resp.close()
+    resp.raise_for_status()
+
+    return StreamingResponse(
+        iter_ffmpeg(
+            remux_command(ffmpeg_path, codec),
+            iter_upstream(resp, tag="Proxy Audio"),
+            tag="Proxy Audio",
+        ),
+        media_type="audio/aac",
+        headers={
+            "Accept-Ranges": "none",
+            "Access-Control-Allow-Origin": "*",
+            "Cache-Control": "no-cache",
+        },
+    )
 
 
 @app.get("/proxy-audio")
-async def proxy_audio(url: str = Query(...), platform: str = Query("bilibili")):
-    """音频代理 - 解决跨域问题"""
+async def proxy_audio(
+    request: Request,
+    url: str = Query(...),
+    platform: str = Query("bilibili"),
+    remux: bool = Query(False),
+    codecs: Optional[str] = Query(None),
+    backup: Optional[List[str]] = Query(None),
+):
+    """
+    音频代理 - 解决跨域问题，支持 Range 请求（拖动进度条）
+
+    remux=true 时通过 FFmpeg 将 DASH m4s 音频实时转为 ADTS 流，边下边播，
+    此模式不支持 Range；codecs 为解析结果中音频流的编码（可选）。
+    backup 可重复传入备用 CDN 地址（音频流的 backupUrls），回源时按观测延迟
+    排序，首字节过慢时对冲请求下一个地址。
+    """
+    mirrors = rank_urls([url, *(backup or [])])
     try:
         # 根据平台设置请求头
         if platform == "bilibili":
@@ -483,42 +1249,190 @@ async def proxy_audio(url: str = Query(...), platform: str = Query("bilibili")):
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
             }
 
-        print(f"[Proxy Audio] Platform: {platform}, URL: {url[:80]}...")
+        if remux:
+            return await _proxy_audio_remux(url, mirrors, headers, codecs)
+
+        range_header = request.headers.get("range")
+
+        print(
+            f"[Proxy Audio] Platform: {platform}, Range: {range_header or '-'}, URL: {url[:80]}..."
+        )
 
-        # 请求音频
-        resp = requests.get(url, headers=headers, stream=True, timeout=30)
+        # 优先走块缓存，已缓存的范围不再回源
+        if audio_cache is not None:
+            cached_response = await _proxy_audio_cached(
+                url, mirrors, headers, range_header, platform
+            )
+            if cached_response is not None:
+                return cached_response
+
+        # 透传 Range 头，拖动进度条时只拉取需要的部分
+        if range_header:
+            headers["Range"] = range_header
+
+        # 请求音频（在线程中执行，避免阻塞事件循环）
+        resp = await async_hedged_get(mirrors, headers=headers, stream=True, timeout=30)
+
+        if resp.status_code == 416:
+            resp.close()
+            return Response(
+                status_code=416,
+                headers={
+                    "Content-Range": resp.headers.get("Content-Range", "bytes */*"),
+                    "Access-Control-Allow-Origin": "*",
+                },
+            )
+        if resp.status_code >= 400:
+            resp.close()
         resp.raise_for_status()
 
         # 获取内容类型
         content_type = resp.headers.get("Content-Type", "audio/mpeg")
         content_length = resp.headers.get("Content-Length")
 
-        # 返回流式响应
-        def generate():
-            for chunk in resp.iter_content(chunk_size=8192):
-                yield chunk
-
         response_headers = {
             "Accept-Ranges": "bytes",
             "Access-Control-Allow-Origin": "*",
         }
-        if content_length:
+        status_code = 200
+        skip, limit = 0, None
+
+        if resp.status_code == 206:
+            # 上游支持 Range，直接透传
+            status_code = 206
+            if resp.headers.get("Content-Range"):
+                response_headers["Content-Range"] = resp.headers["Content-Range"]
+            if content_length:
+                response_headers["Content-Length"] = content_length
+        elif range_header:
+            # 上游忽略了 Range，返回了完整内容：在本地跳过/截断
+            total = int(content_length) if content_length else None
+            try:
+                byte_range = parse_range_header(range_header, total)
+            except RangeNotSatisfiable:
+                resp.close()
+                return Response(
+                    status_code=416,
+                    headers={
+                        "Content-Range": f"bytes */{total}",
+                        "Access-Control-Allow-Origin": "*",
+                    },
+                )
+
+            if byte_range and byte_range[1] is not None:
+                start, end = byte_range
+                status_code = 206
+                skip, limit = start, end - start + 1
+                response_headers["Content-Range"] = format_content_range(
+                    start, end, total
+                )
+                response_headers["Content-Length"] = str(limit)
+                print(f"[Proxy Audio] 上游不支持 Range，本地截取 {start}-{end}")
+            elif content_length:
+                response_headers["Content-Length"] = content_length
+        elif content_length:
             response_headers["Content-Length"] = content_length
 
+        # 返回流式响应
         return StreamingResponse(
-            generate(), media_type=content_type, headers=response_headers
+            iter_upstream(resp, skip=skip, limit=limit, tag="Proxy Audio"),
+            status_code=status_code,
+            media_type=content_type,
+            headers=response_headers,
         )
 
+    except (CircuitOpenError, DeadlineExceeded, RequestCancelled):
+        # 交给 503 / 504 / 499 处理器
+        raise
+    except requests.exceptions.HTTPError as e:
+        # 上游 4xx（含 416）原样返回状态码，5xx 返回 502
+        status = e.response.status_code if e.response is not None else 502
+        print(f"[Proxy Audio] Upstream status {status}: {url[:80]}...")
+        return _audio_error(
+            f"上游返回 {status}", status if 400 <= status < 500 else 502
+        )
     except requests.exceptions.Timeout:
-        return {"success": False, "message": "音频请求超时"}
+        return _audio_error("音频请求超时", 504)
+    except requests.exceptions.RequestException as e:
+        print(f"[Proxy Audio] Error: {e}")
+        return _audio_error(str(e), 502)
     except Exception as e:
         print(f"[Proxy Audio] Error: {e}")
-        return {"success": False, "message": str(e)}
+        return _audio_error(str(e), 500)
 
 
-@app.post("/proxy/bilibili")
-async def proxy_bilibili(request: ProxyRequest):
-    """B站 API 代理"""
+def _audio_error(message: str, status_code: int) -> FastJSONResponse:
+    """音频代理的错误响应：使用真实的错误状态码，媒体客户端不会把它当作音频"""
+    return FastJSONResponse(
+        {"success": False, "message": message},
+        status_code=status_code,
+        headers={"Access-Control-Allow-Origin": "*"},
+    )
+
+
+# 原始透传时保留的上游响应头
+RAW_PASSTHROUGH_HEADERS = (
+    "content-type",
+    "content-encoding",
+    "content-length",
+    "etag",
+    "last-modified",
+    "cache-control",
+)
+
+
+async def _proxy_raw(
+    method: str,
+    url: str,
+    headers: dict,
+    body: Optional[bytes],
+    timeout: int,
+    tag: str,
+    with_cookies: bool = False,
+) -> Response:
+    """
+    原始透传：不解析上游 JSON，状态码与响应体字节（含压缩编码）原样流式返回
+
+    代理信封字段放在响应头中：X-Proxy-Success、X-Proxy-Status，
+    with_cookies 时附带 X-Proxy-Cookies（JSON）。请求失败时返回 502 与 JSON 信封。
+    """
+    success, result = await async_request_with_retry(
+        method=method,
+        url=url,
+        headers=headers,
+        data=body,
+        timeout=timeout,
+        retries=3,
+        retry_delay=1.0,
+        stream=True,
+    )
+    if not success:
+        print(f"[{tag}] Failed: {result}")
+        return FastJSONResponse(
+            {"success": False, "message": result},
+            status_code=502,
+            headers={"X-Proxy-Success": "false"},
+        )
+
+    response_headers = {
+        name: result.headers[name]
+        for name in RAW_PASSTHROUGH_HEADERS
+        if name in result.headers
+    }
+    response_headers["X-Proxy-Success"] = "true"
+    response_headers["X-Proxy-Status"] = str(result.status_code)
+    if with_cookies:
+        response_headers["X-Proxy-Cookies"] = json.dumps(dict(result.cookies))
+
+    return StreamingResponse(
+        iter_upstream(result, decode=False, tag=tag),
+        status_code=result.status_code,
+        headers=response_headers,
+    )
+
+
+def _bilibili_proxy_headers(request: ProxyRequest) -> dict:
+    """B站代理请求头（默认头 + 调用方提供的头）"""
     headers = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
         "Referer": "https://www.bilibili.com",
@@ -527,9 +1441,89 @@ async def proxy_bilibili(request: ProxyRequest):
     }
     if request.headers:
         headers.update(request.headers)
+    return headers
+
+
+def _tencent_proxy_headers(request: ProxyRequest) -> dict:
+    """腾讯云代理请求头"""
+    headers = {
+        "Content-Type": "application/json; charset=utf-8",
+    }
+    if request.headers:
+        headers.update(request.headers)
+    return headers
+
+
+# B站代理 GET 缓存 TTL（秒）：按接口路径前缀匹配第一条规则，未列出的接口不缓存
+BILIBILI_CACHE_TTL = (
+    # 扫码登录（二维码生成/轮询）必须实时
+    ("/x/passport-login/", 0),
+    # 登录状态与当前用户信息
+    ("/x/web-interface/nav", 30),
+    ("/x/web-interface/view", 300),
+    ("/x/space/acc/info", 300),
+    ("/x/relation/stat", 60),
+)
+
+# 参与 Cookie 身份哈希的字段（登录凭证）
+BILIBILI_IDENTITY_COOKIES = ("SESSDATA", "DedeUserID")
+
+# 条目: {"envelope", "freshUntil", "etag", "lastModified"}
+bilibili_cache = LRUCache(BILIBILI_CACHE_SIZE) if BILIBILI_CACHE_SIZE > 0 else None
+
 
+def _bilibili_cache_ttl(url: str) -> float:
+    """按接口路径返回缓存 TTL，0 表示不缓存"""
+    path = urllib.parse.urlsplit(url).path
+    for prefix, ttl in BILIBILI_CACHE_TTL:
+        if path.startswith(prefix):
+            return ttl
+    return 0
+
+
+def _bilibili_envelope(result: requests.Response) -> dict:
+    return {
+        "success": True,
+        "status": result.status_code,
+        "data": (
+            json_loads(result.content)
+            if result.headers.get("content-type", "").startswith("application/json")
+            else result.text
+        ),
+        "cookies": dict(result.cookies),
+    }
+
+
+async def _proxy_bilibili_call(request: ProxyRequest) -> dict:
+    """
+    请求B站接口，返回 JSON 信封
+
+    GET 请求按 BILIBILI_CACHE_TTL 缓存（键为 URL + Cookie 身份哈希），命中时
+    附加 cached=true。过期条目若带 ETag / Last-Modified，则发条件请求，
+    上游返回 304 时续期并返回缓存内容（revalidated=true）。
+    """
     method = request.method.upper()
-    success, result = request_with_retry(
+    headers = _bilibili_proxy_headers(request)
+
+    cache_key = None
+    entry = None
+    ttl = _bilibili_cache_ttl(request.url) if method == "GET" else 0
+    if ttl and bilibili_cache is not None:
+        cookie = next(
+            (value for name, value in headers.items() if name.lower() == "cookie"),
+            None,
+        )
+        cache_key = proxy_cache_key(request.url, cookie, BILIBILI_IDENTITY_COOKIES)
+        entry = bilibili_cache.get(cache_key)
+        if entry is not None:
+            if entry["freshUntil"] > time.monotonic():
+                return {**entry["envelope"], "cached": True}
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["lastModified"]:
+                headers["If-Modified-Since"] = entry["lastModified"]
+
+    success, result = await async_request_with_retry(
         method=method,
         url=request.url,
         headers=headers,
@@ -539,79 +1533,861 @@ async def proxy_bilibili(request: ProxyRequest):
         retry_delay=1.0,
     )
 
+    if not success:
+        print(f"[Proxy Bilibili] Failed: {result}")
+        return {"success": False, "message": result}
+
+    if entry is not None and result.status_code == 304:
+        bilibili_cache.set(
+            cache_key, {**entry, "freshUntil": time.monotonic() + ttl}
+        )
+        return {**entry["envelope"], "cached": True, "revalidated": True}
+
+    envelope = _bilibili_envelope(result)
+    cache_control = result.headers.get("cache-control", "").lower()
+    if cache_key and result.status_code == 200 and "no-store" not in cache_control:
+        etag = result.headers.get("etag")
+        last_modified = result.headers.get("last-modified")
+        bilibili_cache.set(
+            cache_key,
+            {
+                "envelope": envelope,
+                "freshUntil": time.monotonic() + ttl,
+                "etag": etag,
+                "lastModified": last_modified,
+            },
+            # 没有校验器的条目过期后无法复用，直接淘汰
+            ttl=None if etag or last_modified else ttl,
+        )
+    return envelope
+
+
+async def _proxy_tencent_call(request: ProxyRequest) -> dict:
+    """请求腾讯云接口，返回 JSON 信封"""
+    success, result = await async_post_with_retry(
+        url=request.url,
+        headers=_tencent_proxy_headers(request),
+        data=request.body.encode("utf-8") if request.body else None,
+        timeout=30,
+        retries=3,
+        retry_delay=1.0,
+    )
+
     if success:
+        print(f"[Proxy Tencent] Response status: {result.status_code}")
         return {
             "success": True,
             "status": result.status_code,
-            "data": (
-                result.json()
-                if result.headers.get("content-type", "").startswith("application/json")
-                else result.text
-            ),
-            "cookies": dict(result.cookies),
+            "data": json_loads(result.content),
         }
     else:
-        print(f"[Proxy Bilibili] Failed: {result}")
+        print(f"[Proxy Tencent] Failed: {result}")
         return {"success": False, "message": result}
 
 
+@app.post("/proxy/bilibili")
+async def proxy_bilibili(request: ProxyRequest, response: Response):
+    """
+    B站 API 代理
+
+    raw=true 时原始透传上游响应（见 _proxy_raw），否则返回 JSON 信封。
+    GET 请求按接口缓存（见 _proxy_bilibili_call），响应头 X-Cache 标明
+    HIT / REVALIDATED / MISS。
+    """
+    if request.raw:
+        method = request.method.upper()
+        return await _proxy_raw(
+            method,
+            request.url,
+            _bilibili_proxy_headers(request),
+            request.body if method == "POST" else None,
+            timeout=15,
+            tag="Proxy Bilibili",
+            with_cookies=True,
+        )
+    result = await _proxy_bilibili_call(request)
+    if result.get("revalidated"):
+        response.headers["X-Cache"] = "REVALIDATED"
+    elif result.get("cached"):
+        response.headers["X-Cache"] = "HIT"
+    elif result["success"]:
+        cacheable = (
+            request.method.upper() == "GET"
+            and bilibili_cache is not None
+            and _bilibili_cache_ttl(request.url) > 0
+        )
+        response.headers["X-Cache"] = "MISS" if cacheable else "BYPASS"
+    return result
+
+
 @app.post("/proxy/tencent")
 async def proxy_tencent(request: ProxyRequest):
-    """腾讯云 API 代理"""
-    headers = {
-        "Content-Type": "application/json; charset=utf-8",
-    }
-    if request.headers:
-        headers.update(request.headers)
-
-    body_data = request.body.encode("utf-8") if request.body else None
+    """
+    腾讯云 API 代理
 
+    raw=true 时原始透传上游响应（见 _proxy_raw），否则返回 JSON 信封。
+    """
+    headers = _tencent_proxy_headers(request)
     print(f"[Proxy Tencent] URL: {request.url}")
     print(f"[Proxy Tencent] Headers: {list(headers.keys())}")
 
-    success, result = post_with_retry(
-        url=request.url,
-        headers=headers,
-        data=body_data,
-        timeout=30,
+    if request.raw:
+        return await _proxy_raw(
+            "POST",
+            request.url,
+            headers,
+            request.body.encode("utf-8") if request.body else None,
+            timeout=30,
+            tag="Proxy Tencent",
+        )
+    return await _proxy_tencent_call(request)
+
+
+# 豆包 AI 结果缓存
+doubao_cache = ResponseCache(
+    max_entries=DOUBAO_CACHE_SIZE,
+    disk_path=(
+        os.path.join(DOUBAO_CACHE_DIR, "doubao_cache.db") if DOUBAO_CACHE_DIR else None
+    ),
+)
+
+
+# 豆包 AI 按 API Key 的并发与 token 速率限制
+doubao_limiter = KeyedLimiter(DOUBAO_MAX_CONCURRENCY, DOUBAO_TOKENS_PER_MINUTE)
+
+
+async def _doubao_complete(
+    url: str,
+    headers: Optional[dict],
+    body: Optional[str],
+    cache_key: Optional[str] = None,
+    read_cache: bool = True,
+) -> dict:
+    """
+    调用豆包 chat/completions，返回代理格式的结果
+
+    Args:
+        url: 上游接口地址
+        headers: 额外请求头（含 Authorization）
+        body: JSON 请求体
+        cache_key: 结果缓存键，None 表示不使用缓存
+        read_cache: 是否读取缓存（False 时只写入）
+    """
+    if cache_key and read_cache:
+        cached = await run_in_threadpool(doubao_cache.get, cache_key)
+        if cached is not None:
+            print(f"[Proxy Doubao] 命中结果缓存: {cache_key[:12]}")
+            return {"success": True, "cached": True, **cached}
+
+    request_headers = {
+        "Content-Type": "application/json",
+    }
+    if headers:
+        request_headers.update(headers)
+
+    success, result = await async_post_with_retry(
+        url=url,
+        headers=request_headers,
+        data=body.encode("utf-8") if body else None,
+        timeout=60,
         retries=3,
         retry_delay=1.0,
     )
 
-    if success:
-        print(f"[Proxy Tencent] Response status: {result.status_code}")
-        return {"success": True, "status": result.status_code, "data": result.json()}
-    else:
-        print(f"[Proxy Tencent] Failed: {result}")
+    if not success:
+        print(f"[Proxy Doubao] Failed: {result}")
         return {"success": False, "message": result}
 
+    data = json_loads(result.content)
+    if cache_key and result.status_code == 200:
+        await run_in_threadpool(
+            doubao_cache.set, cache_key, {"status": result.status_code, "data": data}
+        )
+    return {"success": True, "status": result.status_code, "data": data}
+
 
 @app.post("/proxy/doubao")
-async def proxy_doubao(request: ProxyRequest):
-    """豆包 AI API 代理"""
+async def proxy_doubao(request: ProxyRequest, http_request: Request, response: Response):
+    """
+    豆包 AI API 代理
+
+    请求体 cache=true 时启用结果缓存（按 model、messages、temperature、max_tokens
+    计算缓存键）。请求头 Cache-Control: no-cache 跳过读取缓存，no-store 既不读也不写。
+    响应头 X-Cache 标明 HIT / MISS / BYPASS。
+    """
+    cache_key = None
+    cache_control = http_request.headers.get("cache-control", "").lower()
+    if request.cache and "no-store" not in cache_control:
+        cache_key = chat_cache_key(request.url, request.body)
+
+    result = await _doubao_complete(
+        request.url,
+        request.headers,
+        request.body,
+        cache_key=cache_key,
+        read_cache="no-cache" not in cache_control,
+    )
+
+    if result.get("cached"):
+        response.headers["X-Cache"] = "HIT"
+    elif result["success"]:
+        response.headers["X-Cache"] = "MISS" if cache_key else "BYPASS"
+    return result
+
+
+# 批量代理的并发上限
+PROXY_BATCH_CONCURRENCY = int(os.environ.get("PROXY_BATCH_CONCURRENCY", "8"))
+
+
+class BatchProxyEntry(ProxyRequest):
+    """批量代理中的单个请求"""
+
+    # 目标代理：bilibili / tencent / doubao
+    proxy: str = "bilibili"
+    # 调用方自定义标识，原样返回
+    id: Optional[str] = None
+
+
+class BatchProxyRequest(BaseModel):
+    """批量代理请求"""
+
+    requests: List[BatchProxyEntry]
+    # 并发数（不超过 PROXY_BATCH_CONCURRENCY）
+    concurrency: Optional[int] = None
+    # 按完成顺序以 NDJSON 流式返回
+    stream: bool = False
+
+
+async def _proxy_batch_call(entry: BatchProxyEntry) -> dict:
+    """按 proxy 字段分发到对应代理，返回 JSON 信封"""
+    if entry.raw:
+        return {"success": False, "message": "批量代理不支持 raw 透传"}
+    if entry.proxy == "bilibili":
+        return await _proxy_bilibili_call(entry)
+    if entry.proxy == "tencent":
+        return await _proxy_tencent_call(entry)
+    if entry.proxy == "doubao":
+        return await _doubao_complete(
+            entry.url,
+            entry.headers,
+            entry.body,
+            cache_key=chat_cache_key(entry.url, entry.body) if entry.cache else None,
+        )
+    return {"success": False, "message": f"不支持的代理类型: {entry.proxy}"}
+
+
+@app.post("/proxy/batch")
+async def proxy_batch(request: BatchProxyRequest):
+    """
+    批量 API 代理 - 一次调用并发执行多个 /proxy/bilibili、/proxy/tencent、
+    /proxy/doubao 请求（复用上游连接池）
+
+    stream=false 时按输入顺序返回全部结果；stream=true 时按完成顺序逐行输出
+    NDJSON，最后一行为 {"done": true}。每项结果为对应代理的返回格式，
+    附加 index、id、proxy 与 elapsed。
+    """
+    if not request.requests:
+        return {"success": False, "message": "未提供请求"}
+
+    started = time.monotonic()
+    concurrency = min(
+        request.concurrency or PROXY_BATCH_CONCURRENCY, PROXY_BATCH_CONCURRENCY
+    )
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run_entry(index: int, entry: BatchProxyEntry) -> dict:
+        async with semaphore:
+            entry_started = time.monotonic()
+            try:
+                result = await _proxy_batch_call(entry)
+            except Exception as e:
+                print(f"[Proxy Batch] #{index} 失败: {e}")
+                result = {"success": False, "message": str(e)}
+        return {
+            "index": index,
+            "id": entry.id or str(index),
+            "proxy": entry.proxy,
+            **result,
+            "elapsed": round(time.monotonic() - entry_started, 3),
+        }
+
+    print(f"[Proxy Batch] {len(request.requests)} 个请求，并发 {concurrency}")
+
+    if not request.stream:
+        items = await asyncio.gather(
+            *[run_entry(i, e) for i, e in enumerate(request.requests)]
+        )
+        return {
+            "success": all(item["success"] for item in items),
+            "elapsed": round(time.monotonic() - started, 3),
+            "results": items,
+        }
+
+    async def results():
+        tasks = [
+            asyncio.ensure_future(run_entry(i, e))
+            for i, e in enumerate(request.requests)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                item = await next_done
+                yield ndjson_line(item)
+            yield ndjson_line(
+                {"done": True, "elapsed": round(time.monotonic() - started, 3)}
+            )
+        finally:
+            # 客户端断开时取消尚未完成的请求
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+# 默认系统提示词（与前端 aiRewrite.js 保持一致）
+DEFAULT_REWRITE_SYSTEM_PROMPT = "你是一个专业的文案改写助手，擅长将视频文案改写成不同风格。请直接输出改写后的文案，不要添加任何解释或前缀。"
+
+
+class RewriteVariant(BaseModel):
+    """单个改写风格配置"""
+
+    id: Optional[str] = None
+    # 风格提示词，与原文拼接为用户消息
+    prompt: Optional[str] = None
+    system: Optional[str] = None
+    # 完整消息列表（指定后忽略 prompt / system）
+    messages: Optional[List[dict]] = None
+    model: Optional[str] = None
+    temperature: Optional[float] = None
+    max_tokens: Optional[int] = None
+
+
+class RewriteBatchRequest(BaseModel):
+    """多风格并发改写请求"""
+
+    url: str
+    headers: Optional[dict] = None
+    transcript: str
+    variants: List[RewriteVariant]
+    model: str = "doubao-seed-1-6-251015"
+    system: Optional[str] = None
+    temperature: float = 0.7
+    max_tokens: int = 2000
+    cache: bool = False
+    # 以 NDJSON 逐条返回先完成的结果；False 时全部完成后按输入顺序返回
+    stream: bool = True
+
+
+def _chat_content(result: dict) -> Optional[str]:
+    """从 chat/completions 结果中取出回复内容"""
+    try:
+        return result["data"]["choices"][0]["message"]["content"]
+    except (KeyError, IndexError, TypeError):
+        return None
+
+
+async def _doubao_chat(
+    url: str,
+    headers: Optional[dict],
+    messages: List[dict],
+    model: str,
+    temperature: float,
+    max_tokens: int,
+    cache: bool = False,
+) -> dict:
+    """
+    在按 API Key 限流的前提下完成一次对话，返回回复内容与耗时
+
+    Returns:
+        {"success", "content", "cached", "elapsed", "usage"}，失败时带 message 与 data
+    """
+    body = json.dumps(
+        {
+            "model": model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+        },
+        ensure_ascii=False,
+    )
+    api_key = (headers or {}).get("Authorization", "")
+    tokens = estimate_tokens(json.dumps(messages, ensure_ascii=False)) + max_tokens
+    started = time.monotonic()
+
+    try:
+        async with doubao_limiter.limit(api_key, tokens):
+            result = await _doubao_complete(
+                url,
+                headers,
+                body,
+                cache_key=chat_cache_key(url, body) if cache else None,
+            )
+    except Exception as e:
+        print(f"[Proxy Doubao] Error: {e}")
+        result = {"success": False, "message": str(e)}
+
+    content = _chat_content(result) if result["success"] else None
+    item = {
+        "success": content is not None,
+        "content": content,
+        "cached": bool(result.get("cached")),
+        "elapsed": round(time.monotonic() - started, 3),
+    }
+    if content is None:
+        item["message"] = result.get("message") or f"上游返回 {result.get('status')}"
+        item["data"] = result.get("data")
+    else:
+        item["usage"] = result["data"].get("usage")
+    return item
+
+
+@app.post("/proxy/doubao/batch")
+async def proxy_doubao_batch(request: RewriteBatchRequest):
+    """多风格并发改写 - 同一份文案按多个风格同时改写"""
+    if not request.variants:
+        return {"success": False, "message": "未指定改写风格"}
+
+    started = time.monotonic()
+
+    async def run_variant(index: int, variant: RewriteVariant) -> dict:
+        messages = variant.messages or [
+            {
+                "role": "system",
+                "content": variant.system or request.system or DEFAULT_REWRITE_SYSTEM_PROMPT,
+            },
+            {
+                "role": "user",
+                "content": (
+                    f"{variant.prompt}\n\n{request.transcript}"
+                    if variant.prompt
+                    else request.transcript
+                ),
+            },
+        ]
+        result = await _doubao_chat(
+            request.url,
+            request.headers,
+            messages,
+            model=variant.model or request.model,
+            temperature=(
+                variant.temperature
+                if variant.temperature is not None
+                else request.temperature
+            ),
+            max_tokens=variant.max_tokens or request.max_tokens,
+            cache=request.cache,
+        )
+        return {"index": index, "id": variant.id or str(index), **result}
+
+    print(f"[Proxy Doubao Batch] 并发改写 {len(request.variants)} 个风格")
+
+    if not request.stream:
+        items = await asyncio.gather(
+            *[run_variant(i, v) for i, v in enumerate(request.variants)]
+        )
+        return {
+            "success": any(item["success"] for item in items),
+            "elapsed": round(time.monotonic() - started, 3),
+            "results": items,
+        }
+
+    async def results():
+        tasks = [
+            asyncio.ensure_future(run_variant(i, v))
+            for i, v in enumerate(request.variants)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                item = await next_done
+                yield ndjson_line(item)
+            yield ndjson_line(
+                {"done": True, "elapsed": round(time.monotonic() - started, 3)}
+            )
+        finally:
+            # 客户端断开时取消尚未完成的改写
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+# 长文案合并润色提示词
+DEFAULT_MERGE_PROMPT = "以下是一篇长文案分段改写后的结果，请将它们合并润色为一篇连贯完整的文案，去除段落衔接处的重复，保留全部内容："
+
+
+class LongRewriteRequest(BaseModel):
+    """长文案分段改写请求"""
+
+    url: str
+    headers: Optional[dict] = None
+    transcript: str
+    # 改写风格提示词
+    prompt: Optional[str] = None
+    system: Optional[str] = None
+    model: str = "doubao-seed-1-6-251015"
+    temperature: float = 0.7
+    # 每段输入的 token 上限（估算值）
+    chunk_tokens: int = 1500
+    # 每段输出的 max_tokens
+    max_tokens: int = 2000
+    # 是否对拼接结果再做一次合并润色
+    merge: bool = False
+    merge_prompt: Optional[str] = None
+    merge_max_tokens: int = 4000
+    cache: bool = False
+
+
+@app.post("/proxy/doubao/long")
+async def proxy_doubao_long(request: LongRewriteRequest):
+    """
+    长文案改写 - 按句子边界分段、并发改写后拼接
+
+    超出模型上下文的文案按 chunk_tokens 切分，各段在 API Key 并发限制内
+    同时改写，按原顺序拼接；merge=true 时再做一次合并润色。
+    """
+    started = time.monotonic()
+    chunks = chunk_text(request.transcript, request.chunk_tokens)
+    if not chunks:
+        return {"success": False, "message": "文案为空"}
+
+    system = request.system or DEFAULT_REWRITE_SYSTEM_PROMPT
+    total = len(chunks)
+    print(f"[Proxy Doubao Long] 文案分为 {total} 段并发改写")
+
+    async def rewrite_chunk(index: int, chunk: str) -> dict:
+        user_content = chunk
+        if total > 1:
+            user_content = (
+                f"（这是一篇长文案的第 {index + 1}/{total} 段，只改写这一段）\n\n{chunk}"
+            )
+        if request.prompt:
+            user_content = f"{request.prompt}\n\n{user_content}"
+        result = await _doubao_chat(
+            request.url,
+            request.headers,
+            [
+                {"role": "system", "content": system},
+                {"role": "user", "content": user_content},
+            ],
+            model=request.model,
+            temperature=request.temperature,
+            max_tokens=request.max_tokens,
+            cache=request.cache,
+        )
+        return {"index": index, "tokens": estimate_tokens(chunk), **result}
+
+    results = await asyncio.gather(
+        *[rewrite_chunk(i, chunk) for i, chunk in enumerate(chunks)]
+    )
+    failed = [item for item in results if not item["success"]]
+    if failed:
+        return {
+            "success": False,
+            "message": f"{len(failed)}/{total} 段改写失败: {failed[0]['message']}",
+            "elapsed": round(time.monotonic() - started, 3),
+            "chunks": results,
+        }
+
+    content = "\n\n".join(item["content"].strip() for item in results)
+    merge_result = None
+    if request.merge and total > 1:
+        merge_result = await _doubao_chat(
+            request.url,
+            request.headers,
+            [
+                {"role": "system", "content": system},
+                {
+                    "role": "user",
+                    "content": f"{request.merge_prompt or DEFAULT_MERGE_PROMPT}\n\n{content}",
+                },
+            ],
+            model=request.model,
+            temperature=request.temperature,
+            max_tokens=request.merge_max_tokens,
+            cache=request.cache,
+        )
+        # 合并失败时退回拼接结果
+        if merge_result["success"]:
+            content = merge_result["content"]
+
+    return {
+        "success": True,
+        "content": content,
+        "elapsed": round(time.monotonic() - started, 3),
+        "chunks": results,
+        "merge": merge_result,
+    }
+
+
+@app.post("/proxy/doubao/stream")
+async def proxy_doubao_stream(request: ProxyRequest):
+    """
+    豆包 AI API 流式代理 - 逐块透传上游的 SSE 事件
+
+    请求体中未指定 stream 时自动设为 true；客户端断开时关闭上游连接，终止生成。
+    """
     headers = {
         "Content-Type": "application/json",
+        "Accept": "text/event-stream",
     }
     if request.headers:
         headers.update(request.headers)
 
-    body_data = request.body.encode("utf-8") if request.body else None
-
-    success, result = post_with_retry(
+    body = request.body or "{}"
+    try:
+        payload = json_loads(body)
+        if isinstance(payload, dict) and "stream" not in payload:
+            payload["stream"] = True
+            body = json.dumps(payload, ensure_ascii=False)
+    except ValueError:
+        pass
+
+    success, result = await async_post_with_retry(
         url=request.url,
         headers=headers,
-        data=body_data,
+        data=body.encode("utf-8"),
         timeout=60,
         retries=3,
         retry_delay=1.0,
+        stream=True,
     )
 
-    if success:
-        return {"success": True, "status": result.status_code, "data": result.json()}
-    else:
-        print(f"[Proxy Doubao] Failed: {result}")
+    if not success:
+        print(f"[Proxy Doubao Stream] Failed: {result}")
         return {"success": False, "message": result}
 
+    resp = result
+    if resp.status_code != 200:
+        # 上游报错时返回的是普通 JSON，读取完整内容后按代理格式返回
+        try:
+            error_text = await run_in_threadpool(lambda: resp.text)
+        finally:
+            resp.close()
+        print(f"[Proxy Doubao Stream] Upstream status {resp.status_code}: {error_text[:200]}")
+        try:
+            error_data = json_loads(error_text)
+        except ValueError:
+            error_data = error_text
+        return {
+            "success": False,
+            "status": resp.status_code,
+            "message": f"上游返回 {resp.status_code}",
+            "data": error_data,
+        }
+
+    return StreamingResponse(
+        iter_upstream(resp, chunk_size=None, tag="Proxy Doubao Stream"),
+        media_type=resp.headers.get("Content-Type", "text/event-stream"),
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+# ==================== 语音识别 ====================
+
+
+class AsrChunk(BaseModel):
+    """音频分段"""
+
+    audio_base64: Optional[str] = None
+    audio_url: Optional[str] = None
+
+
+class TencentAsrRequest(BaseModel):
+    """腾讯云录音文件识别请求"""
+
+    secret_id: str
+    secret_key: str
+    region: str = "ap-shanghai"
+    engine: str = "16k_zh"
+    res_text_format: int = 1
+    # 单段音频：已提取的 Base64 数据，或可公网访问的音频 URL
+    audio_base64: Optional[str] = None
+    audio_url: Optional[str] = None
+    # 多段音频：并发提交，结果按顺序合并
+    chunks: Optional[List[AsrChunk]] = None
+    concurrency: int = 4
+    # 以 SSE 推送识别进度
+    stream: bool = False
+    # 自定义接口地址（本地替身服务）
+    endpoint: Optional[str] = None
+    # 转写缓存：平台 + 规范媒体 ID（见 utils.transcript_store.canonical_media_id）
+    platform: Optional[str] = None
+    media_id: Optional[str] = None
+    use_cache: bool = True
+
+
+@app.post("/asr/tencent")
+async def asr_tencent(request: TencentAsrRequest):
+    """腾讯云录音文件识别 - 服务端签名、提交、轮询并合并结果"""
+    if request.chunks:
+        chunks = [c.model_dump() for c in request.chunks]
+    elif request.audio_base64 or request.audio_url:
+        chunks = [
+            {"audio_base64": request.audio_base64, "audio_url": request.audio_url}
+        ]
+    else:
+        return {"success": False, "message": "缺少音频数据"}
+
+    client = TencentAsrClient(
+        request.secret_id,
+        request.secret_key,
+        region=request.region,
+        endpoint=request.endpoint or TENCENT_ASR_ENDPOINT or None,
+    )
+    started = time.monotonic()
+    engine_params = {"engine": request.engine, "res_text_format": request.res_text_format}
+
+    def lookup_cache() -> tuple:
+        """查询转写缓存，返回 (命中记录, 音频哈希)"""
+        cached = transcript_store.lookup(
+            "tencent",
+            engine_params,
+            platform=request.platform,
+            media_id=request.media_id,
+        )
+        if cached:
+            return cached, None
+
+        # 全部为 Base64 数据时按音频内容哈希查询
+        content_hash = None
+        if all(c.get("audio_base64") for c in chunks):
+            digest = hashlib.sha256()
+            for c in chunks:
+                digest.update(base64.b64decode(c["audio_base64"]))
+            content_hash = digest.hexdigest()
+            cached = transcript_store.lookup(
+                "tencent", engine_params, audio_hash=content_hash
+            )
+        return cached, content_hash
+
+    def recognize(on_progress=None) -> dict:
+        content_hash = None
+        try:
+            if request.use_cache:
+                cached, content_hash = lookup_cache()
+                if cached:
+                    print(f"[ASR Tencent] 命中转写缓存: #{cached['id']}")
+                    return {
+                        "success": True,
+                        "message": "命中转写缓存",
+                        "cached": True,
+                        "elapsed": round(time.monotonic() - started, 3),
+                        "text": cached["text"],
+                        "chunks": [],
+                    }
+
+            print(
+                f"[ASR Tencent] 提交 {len(chunks)} 段音频, 并发 {request.concurrency}"
+            )
+            result = client.recognize(
+                chunks,
+                engine=request.engine,
+                res_text_format=request.res_text_format,
+                concurrency=request.concurrency,
+                on_progress=on_progress,
+            )
+        except TencentAsrError as e:
+            print(f"[ASR Tencent] Failed: {e}")
+            return {"success": False, "message": str(e)}
+        except Exception as e:
+            print(f"[ASR Tencent] Error: {e}")
+            import traceback
+
+            traceback.print_exc()
+            return {"success": False, "message": f"识别出错: {str(e)}"}
+
+        elapsed = round(time.monotonic() - started, 3)
+        print(f"[ASR Tencent] 识别完成, 耗时 {elapsed}s")
+
+        if request.use_cache and result["text"]:
+            transcript_store.save(
+                result["text"],
+                "tencent",
+                engine_params,
+                platform=request.platform,
+                media_id=request.media_id,
+                audio_hash=content_hash,
+            )
+
+        return {
+            "success": True,
+            "message": "识别成功",
+            "cached": False,
+            "elapsed": elapsed,
+            **result,
+        }
+
+    if not request.stream:
+        return await run_in_threadpool(recognize)
+
+    # SSE 模式：工作线程中的进度回调转发到事件循环
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+
+    def on_progress(event: dict):
+        loop.call_soon_threadsafe(queue.put_nowait, ("progress", event))
+
+    def worker():
+        result = recognize(on_progress)
+        loop.call_soon_threadsafe(
+            queue.put_nowait, ("result" if result["success"] else "error", result)
+        )
+
+    async def events():
+        asyncio.ensure_future(run_in_threadpool(worker))
+        while True:
+            name, data = await queue.get()
+            yield sse_event(name, data)
+            if name != "progress":
+                break
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/transcripts/lookup")
+async def lookup_transcript(request: TranscriptRequest):
+    """查询转写缓存 - 在下载、提取音频之前调用"""
+    if not (request.platform and request.media_id) and not request.audio_hash:
+        return {"success": False, "message": "需要 platform + media_id 或 audio_hash"}
+
+    cached = await run_in_threadpool(
+        transcript_store.lookup,
+        request.engine,
+        request.params,
+        platform=request.platform,
+        media_id=request.media_id,
+        audio_hash=request.audio_hash,
+    )
+    if cached:
+        return {"success": True, "hit": True, "data": cached}
+    return {"success": True, "hit": False}
+
+
+@app.post("/transcripts")
+async def save_transcript(request: TranscriptRequest):
+    """保存转写结果（前端自行完成识别时调用）"""
+    if not request.text:
+        return {"success": False, "message": "转写文本为空"}
+    if not (request.platform and request.media_id) and not request.audio_hash:
+        return {"success": False, "message": "需要 platform + media_id 或 audio_hash"}
+
+    record_id = await run_in_threadpool(
+        transcript_store.save,
+        request.text,
+        request.engine,
+        request.params,
+        platform=request.platform,
+        media_id=request.media_id,
+        audio_hash=request.audio_hash,
+    )
+    return {"success": True, "id": record_id}
+
 
 # ==================== 主程序 ====================
 
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+腾讯云 ASR 本地替身服务
+用于在不消耗腾讯云额度的情况下测试 /asr/tencent 的提交、轮询与合并流程
+
+用法:
+    python mock_asr_server.py [--port 3722] [--polls 3] [--secret-key KEY]
+
+    TENCENT_ASR_ENDPOINT=http://127.0.0.1:3722 python main.py
+    或在 /asr/tencent 请求体中指定 "endpoint": "http://127.0.0.1:3722"
+"""
+
+import json
+import argparse
+import itertools
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils import tc3_sign
+
+# TaskId -> 任务信息
+TASKS = {}
+TASK_IDS = itertools.count(1000)
+LOCK = threading.Lock()
+
+
+class MockAsrHandler(BaseHTTPRequestHandler):
+    """模拟 CreateRecTask / DescribeTaskStatus"""
+
+    # 任务完成前需要轮询的次数
+    polls_to_finish = 3
+    # 配置后校验 TC3 签名
+    secret_key = None
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = self.rfile.read(length).decode("utf-8")
+        action = self.headers.get("X-TC-Action", "")
+
+        error = self._check_signature(action, payload)
+        if error:
+            self._reply({"Error": {"Code": "AuthFailure.SignatureFailure", "Message": error}})
+            return
+
+        params = json.loads(payload or "{}")
+        if action == "CreateRecTask":
+            self._reply(self._create_task(params))
+        elif action == "DescribeTaskStatus":
+            self._reply(self._describe_task(params))
+        else:
+            self._reply(
+                {"Error": {"Code": "InvalidAction", "Message": f"未知接口: {action}"}}
+            )
+
+    def _check_signature(self, action: str, payload: str):
+        if not self.secret_key:
+            return None
+        authorization = self.headers.get("Authorization", "")
+        try:
+            secret_id = authorization.split("Credential=")[1].split("/")[0]
+            timestamp = int(self.headers.get("X-TC-Timestamp", "0"))
+        except (IndexError, ValueError):
+            return "Authorization 格式错误"
+        expected = tc3_sign(
+            secret_id,
+            self.secret_key,
+            self.headers.get("Host", ""),
+            action,
+            payload,
+            timestamp,
+        )
+        return None if expected == authorization else "签名校验失败"
+
+    def _create_task(self, params: dict) -> dict:
+        size = params.get("DataLen") or len(params.get("Url", ""))
+        with LOCK:
+            task_id = next(TASK_IDS)
+            TASKS[task_id] = {"polls": 0, "size": size}
+        print(f"[Mock ASR] CreateRecTask -> {task_id} ({size} bytes)")
+        return {"Data": {"TaskId": task_id}, "RequestId": f"mock-{task_id}"}
+
+    def _describe_task(self, params: dict) -> dict:
+        task_id = params.get("TaskId")
+        with LOCK:
+            task = TASKS.get(task_id)
+            if task is None:
+                return {"Error": {"Code": "InvalidParameter", "Message": "任务不存在"}}
+            task["polls"] += 1
+            polls = task["polls"]
+
+        if polls >= self.polls_to_finish:
+            status = 2
+        else:
+            status = 0 if polls == 1 else 1
+
+        data = {"TaskId": task_id, "Status": status, "ErrorMsg": ""}
+        if status == 2:
+            data["Result"] = (
+                f"[0:0.000,0:5.000] 任务 {task_id} 识别结果（{task['size']} 字节）\n"
+            )
+        return {"Data": data, "RequestId": f"mock-{task_id}-{polls}"}
+
+    def _reply(self, response: dict):
+        body = json.dumps({"Response": response}, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="腾讯云 ASR 本地替身服务")
+    parser.add_argument("--port", type=int, default=3722)
+    parser.add_argument("--polls", type=int, default=3, help="任务完成前的轮询次数")
+    parser.add_argument("--secret-key", default=None, help="校验 TC3 签名使用的 SecretKey")
+    args = parser.parse_args()
+
+    MockAsrHandler.polls_to_finish = args.polls
+    MockAsrHandler.secret_key = args.secret_key
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), MockAsrHandler)
+    print(f"[Mock ASR] 监听 http://127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[Mock ASR] 已停止")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,5 +3,26 @@
 from .douyin import DouyinParser
 from .bilibili import BilibiliParser
 from .xiaohongshu import XiaohongshuParser
+from .sections import SECTIONS, resolve_sections
+from .types import (
+    VideoStream,
+    AudioStream,
+    DouyinVideoInfo,
+    BilibiliVideoInfo,
+    XiaohongshuVideoInfo,
+    VideoInfo,
+)
 
-__all__ = ["DouyinParser", "BilibiliParser", "XiaohongshuParser"]
+__all__ = [
+    "DouyinParser",
+    "BilibiliParser",
+    "XiaohongshuParser",
+    "SECTIONS",
+    "resolve_sections",
+    "VideoStream",
+    "AudioStream",
+    "DouyinVideoInfo",
+    "BilibiliVideoInfo",
+    "XiaohongshuVideoInfo",
+    "VideoInfo",
+]
@@ -6,17 +6,29 @@ import time
 import hashlib
 import urllib.parse
 from datetime import datetime
-from typing import Optional
+from typing import Iterable, List, Optional
 from urllib.parse import urlparse
 
-import requests
-
-from utils import UrlParser
+from utils import (
+    UrlParser,
+    order_mirrors,
+    effective_timeout,
+    session_get,
+    CONTROL_EXCEPTIONS,
+    DeadlineExceeded,
+    RequestCancelled,
+)
+from .sections import resolve_sections
+from .types import AudioStream, BilibiliVideoInfo, VideoStream
 
 
 # B站 Cookie 配置（登录后获取，支持高清视频）
 BILIBILI_COOKIE = os.environ.get("BILIBILI_COOKIE", "")
 
+# 风控、限流与服务端错误的接口返回码：计入平台熔断统计
+# （视频不存在、不可见、审核中等由链接本身导致的错误码不计入）
+UPSTREAM_ERROR_CODES = {-351, -352, -412, -500, -502, -503, -504, -509, -799}
+
 # WBI 签名算法的混淆表
 MIXIN_KEY_ENC_TAB = [
     46,
@@ -106,13 +118,13 @@ class BilibiliParser:
 
         try:
             print("[Bilibili] 正在获取设备标识 Cookie...")
-            resp = requests.get(
+            resp = session_get(
                 "https://www.bilibili.com",
                 headers={
                     "User-Agent": cls.USER_AGENT,
                     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
                 },
-                timeout=10,
+                timeout=effective_timeout("https://www.bilibili.com", 10, "fetch"),
             )
 
             cookies_dict = {}
@@ -125,12 +137,16 @@ class BilibiliParser:
 
             cls._device_cookies_cache = device_cookie
             return device_cookie
+        except (DeadlineExceeded, RequestCancelled):
+            raise
         except Exception as e:
             print(f"[Bilibili] 获取设备 Cookie 失败: {e}")
             return ""
 
     def __init__(self, url: str, cookie: str = None):
         self.url = url
+        # 网络错误、上游 5xx 或风控导致的失败原因（视频不存在等不记录）
+        self.upstream_error: Optional[str] = None
 
         # 合并设备 Cookie 和用户 Cookie
         device_cookie = self._get_device_cookies()
@@ -195,10 +211,11 @@ class BilibiliParser:
             return self.wbi_keys
 
         try:
-            resp = requests.get(
-                "https://api.bilibili.com/x/web-interface/nav",
+            url = "https://api.bilibili.com/x/web-interface/nav"
+            resp = session_get(
+                url,
                 headers=self.headers,
-                timeout=10,
+                timeout=effective_timeout(url, 10, "sign"),
             )
             data = resp.json()
 
@@ -219,6 +236,8 @@ class BilibiliParser:
                 print(
                     f"[Bilibili] WBI keys 无效: img_key长度={len(img_key)}, sub_key长度={len(sub_key)}"
                 )
+        except (DeadlineExceeded, RequestCancelled):
+            raise
         except Exception as e:
             print(f"[Bilibili] 获取WBI密钥失败: {e}")
 
@@ -275,10 +294,11 @@ class BilibiliParser:
             return False
 
         try:
-            resp = requests.get(
-                f"https://api.bilibili.com/x/web-interface/view?bvid={self.bvid}",
+            url = f"https://api.bilibili.com/x/web-interface/view?bvid={self.bvid}"
+            resp = session_get(
+                url,
                 headers=self.headers,
-                timeout=10,
+                timeout=effective_timeout(url, 10, "fetch"),
             )
             data = resp.json()
 
@@ -290,11 +310,21 @@ class BilibiliParser:
                 return True
             else:
                 print(f"[Bilibili] 获取视频信息失败: {data.get('message')}")
+                self._record_api_error(data)
+        except CONTROL_EXCEPTIONS:
+            raise
         except Exception as e:
             print(f"[Bilibili] 获取视频信息异常: {e}")
+            self.upstream_error = str(e)
 
         return False
 
+    def _record_api_error(self, data: dict):
+        """接口返回风控 / 服务端错误码时记录为上游错误"""
+        code = data.get("code")
+        if code in UPSTREAM_ERROR_CODES:
+            self.upstream_error = f"{code} {data.get('message', '')}"
+
     def _get_play_url(self) -> Optional[dict]:
         """通过WBI签名API获取播放链接"""
         if not self.aid or not self.cid:
@@ -319,7 +349,11 @@ class BilibiliParser:
 
             print(f"[Bilibili] 请求播放链接: {url[:100]}...")
 
-            resp = requests.get(url, headers=self.headers, timeout=10)
+            resp = session_get(
+                url,
+                headers=self.headers,
+                timeout=effective_timeout(url, 10, "fetch"),
+            )
             data = resp.json()
 
             print(f"[Bilibili] API响应码: {data.get('code')}")
@@ -349,21 +383,56 @@ class BilibiliParser:
                 return play_data
             else:
                 print(f"[Bilibili] 获取播放链接失败: {data.get('message')}")
+                self._record_api_error(data)
+        except CONTROL_EXCEPTIONS:
+            raise
         except Exception as e:
             print(f"[Bilibili] 获取播放链接异常: {e}")
+            self.upstream_error = str(e)
             import traceback
 
             traceback.print_exc()
 
         return None
 
-    def get_video_info(self) -> Optional[dict]:
-        """获取完整视频信息"""
-        if not self._get_video_info_api():
+    def get_video_info(
+        self, include: Optional[Iterable[str]] = None
+    ) -> Optional[BilibiliVideoInfo]:
+        """
+        获取完整视频信息
+
+        Args:
+            include: 需要计算的可选部分（streams/audio/subtitles/pages），
+                None 表示全部；不需要 streams 和 audio 时不请求 playurl
+        """
+        info = self.get_metadata(include)
+        if info is None:
             return None
 
-        play_data = self._get_play_url()
+        streams = self.get_streams(include)
+        if streams is None:
+            return None
+        info.update(streams)
+
+        print(
+            f"[Bilibili] 解析完成: 视频流{len(info.get('videoStreams', []))}个, 音频流{'1个' if info.get('audioStream') else '0个'}"
+        )
+        if "acceptDescription" in info:
+            print(f"[Bilibili] 支持清晰度: {info['acceptDescription']}")
+        return info
+
+    def get_metadata(
+        self, include: Optional[Iterable[str]] = None
+    ) -> Optional[BilibiliVideoInfo]:
+        """
+        获取视频元数据（标题、封面、作者、统计、分P、字幕等）
+
+        只请求 view 接口，不包含视频/音频流，流信息见 get_streams。
+        """
+        if not self.video_data and not self._get_video_info_api():
+            return None
 
+        sections = resolve_sections(include)
         try:
             # 基本信息
             title = self.video_data.get("title", "")
@@ -429,7 +498,7 @@ class BilibiliParser:
             rights = self.video_data.get("rights", {})
 
             # 分P信息
-            pages = self.video_data.get("pages", [])
+            pages = self.video_data.get("pages", []) if "pages" in sections else []
             pages_info = []
             for page in pages:
                 pages_info.append(
@@ -444,7 +513,9 @@ class BilibiliParser:
                 )
 
             # 字幕信息
-            subtitle_data = self.video_data.get("subtitle", {})
+            subtitle_data = (
+                self.video_data.get("subtitle", {}) if "subtitles" in sections else {}
+            )
             subtitles = []
             for sub in subtitle_data.get("list", []):
                 subtitles.append(
@@ -471,17 +542,125 @@ class BilibiliParser:
                     "intro": ugc_season.get("intro", ""),
                 }
 
+            # 格式化发布时间
+            create_time = (
+                datetime.fromtimestamp(pubdate).strftime("%Y-%m-%d %H:%M:%S")
+                if pubdate
+                else ""
+            )
+
+            metadata: BilibiliVideoInfo = {
+                # 基础信息
+                "bvid": bvid,
+                "aid": self.aid,
+                "cid": self.cid,
+                "title": title,
+                "desc": desc,
+                "cover": cover,
+                "duration": duration,
+                "platform": "bilibili",
+                # 作者信息
+                "author": author,
+                "authorId": author_id,
+                "authorAvatar": author_avatar,
+                # 统计数据（格式化）
+                "views": views,
+                "likes": likes,
+                "comments": comments,
+                "danmaku": danmaku,
+                "coin": coin,
+                "favorite": favorite,
+                "shares": shares,
+                # 统计数据（原始数值）
+                "stat": {
+                    "view": view_count,
+                    "like": like_count,
+                    "reply": reply_count,
+                    "danmaku": danmaku_count,
+                    "coin": coin_count,
+                    "favorite": favorite_count,
+                    "share": share_count,
+                },
+                # 时间信息
+                "createTime": create_time,
+                "pubdate": pubdate,
+                "ctime": ctime,
+                # 分区信息
+                "tid": tid,
+                "tidV2": tid_v2,
+                "tname": tname,
+                "tnameV2": tname_v2,
+                # 视频尺寸
+                "dimension": {
+                    "width": width,
+                    "height": height,
+                    "rotate": rotate,
+                },
+                # 其他信息
+                "copyright": copyright_type,
+                "videosCount": videos_count,
+                "state": state,
+                "dynamic": dynamic,
+                "missionId": mission_id,
+                "seasonId": season_id,
+                # 权限信息
+                "rights": rights,
+                # 合集信息
+                "ugcSeason": season_info,
+                # 下载请求头
+                "downloadHeaders": {
+                    "Referer": "https://www.bilibili.com/",
+                    "Origin": "https://www.bilibili.com",
+                    "User-Agent": self.USER_AGENT,
+                },
+            }
+            if "pages" in sections:
+                # 分P信息
+                metadata["pages"] = pages_info
+            if "subtitles" in sections:
+                # 字幕信息
+                metadata["subtitles"] = subtitles
+            return metadata
+
+        except Exception as e:
+            print(f"[Bilibili] 获取视频信息错误: {e}")
+            import traceback
+
+            traceback.print_exc()
+            return None
+
+    def get_streams(
+        self, include: Optional[Iterable[str]] = None
+    ) -> Optional[BilibiliVideoInfo]:
+        """
+        获取视频/音频流（需先获取元数据）
+
+        请求 WBI 签名的 playurl 接口，返回 videoUrl、videoStreams、清晰度列表
+        （streams）以及 audioUrl、audioStream（audio）；两者都不需要时不请求接口。
+        """
+        sections = resolve_sections(include)
+        if not sections & {"streams", "audio"}:
+            return {}
+
+        if not self.video_data and not self._get_video_info_api():
+            return None
+
+        play_data = self._get_play_url()
+
+        try:
+            duration = self.video_data.get("duration", 0)
+
             # 视频/音频流
             video_url = ""
             audio_url = ""
-            video_streams = []
-            audio_stream = None
+            video_streams: List[VideoStream] = []
+            audio_stream: Optional[AudioStream] = None
 
             if play_data:
                 dash = play_data.get("dash", {})
 
                 # 视频流
-                videos = dash.get("video", []) or []
+                videos = (dash.get("video", []) or []) if "streams" in sections else []
                 if videos:
                     video_url = videos[0].get("baseUrl", "") or videos[0].get(
                         "base_url", ""
@@ -562,6 +741,8 @@ class BilibiliParser:
                 all_audios = audios + dolby_audio
                 if flac_audio:
                     all_audios.append(flac_audio)
+                if "audio" not in sections:
+                    all_audios = []
 
                 if all_audios:
                     best_audio = max(
@@ -579,8 +760,10 @@ class BilibiliParser:
                     bandwidth = best_audio.get("bandwidth", 0)
 
                     audio_stream = {
+                        "id": best_audio.get("id", 0),
                         "url": audio_url,
                         "backupUrls": backup_urls,
+                        "codecs": best_audio.get("codecs", ""),
                         "title": "",
                         "author": "",
                         "duration": duration,
@@ -588,104 +771,28 @@ class BilibiliParser:
                         "uri": "",
                     }
 
-            # 格式化发布时间
-            create_time = (
-                datetime.fromtimestamp(pubdate).strftime("%Y-%m-%d %H:%M:%S")
-                if pubdate
-                else ""
-            )
-
             # 支持的清晰度列表
             accept_quality = play_data.get("accept_quality", []) if play_data else []
             accept_description = (
                 play_data.get("accept_description", []) if play_data else []
             )
 
-            print(
-                f"[Bilibili] 解析完成: 视频流{len(video_streams)}个, 音频流{'1个' if audio_stream else '0个'}"
-            )
-            print(f"[Bilibili] 支持清晰度: {accept_description}")
-
-            return {
-                # 基础信息
-                "bvid": bvid,
-                "aid": self.aid,
-                "cid": self.cid,
-                "title": title,
-                "desc": desc,
-                "cover": cover,
-                "videoUrl": video_url,
-                "audioUrl": audio_url,
-                "duration": duration,
-                "platform": "bilibili",
-                # 视频/音频流
-                "videoStreams": video_streams,
-                "audioStream": audio_stream,
-                # 作者信息
-                "author": author,
-                "authorId": author_id,
-                "authorAvatar": author_avatar,
-                # 统计数据（格式化）
-                "views": views,
-                "likes": likes,
-                "comments": comments,
-                "danmaku": danmaku,
-                "coin": coin,
-                "favorite": favorite,
-                "shares": shares,
-                # 统计数据（原始数值）
-                "stat": {
-                    "view": view_count,
-                    "like": like_count,
-                    "reply": reply_count,
-                    "danmaku": danmaku_count,
-                    "coin": coin_count,
-                    "favorite": favorite_count,
-                    "share": share_count,
-                },
-                # 时间信息
-                "createTime": create_time,
-                "pubdate": pubdate,
-                "ctime": ctime,
-                # 分区信息
-                "tid": tid,
-                "tidV2": tid_v2,
-                "tname": tname,
-                "tnameV2": tname_v2,
-                # 视频尺寸
-                "dimension": {
-                    "width": width,
-                    "height": height,
-                    "rotate": rotate,
-                },
-                # 其他信息
-                "copyright": copyright_type,
-                "videosCount": videos_count,
-                "state": state,
-                "dynamic": dynamic,
-                "missionId": mission_id,
-                "seasonId": season_id,
-                # 权限信息
-                "rights": rights,
-                # 分P信息
-                "pages": pages_info,
-                # 字幕信息
-                "subtitles": subtitles,
-                # 合集信息
-                "ugcSeason": season_info,
-                # 清晰度信息
-                "acceptQuality": accept_quality,
-                "acceptDescription": accept_description,
-                # 下载请求头
-                "downloadHeaders": {
-                    "Referer": "https://www.bilibili.com/",
-                    "Origin": "https://www.bilibili.com",
-                    "User-Agent": self.USER_AGENT,
-                },
-            }
+            streams: BilibiliVideoInfo = {}
+            if "streams" in sections:
+                streams.update(
+                    {
+                        "videoUrl": video_url,
+                        "videoStreams": video_streams,
+                        "acceptQuality": accept_quality,
+                        "acceptDescription": accept_description,
+                    }
+                )
+            if "audio" in sections:
+                streams.update({"audioUrl": audio_url, "audioStream": audio_stream})
+            return order_mirrors(streams)
 
         except Exception as e:
-            print(f"[Bilibili] 获取视频信息错误: {e}")
+            print(f"[Bilibili] 获取播放链接错误: {e}")
             import traceback
 
             traceback.print_exc()
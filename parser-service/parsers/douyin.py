@@ -2,11 +2,25 @@
 
 import copy
 from datetime import datetime
-from typing import Optional
+from typing import Iterable, List, Optional
 
-import requests
+from utils import (
+    BogusUtils,
+    UrlParser,
+    order_mirrors,
+    rank_urls,
+    check_deadline,
+    effective_timeout,
+    session_get,
+    CONTROL_EXCEPTIONS,
+)
+from .sections import resolve_sections
+from .types import AudioStream, DouyinVideoInfo, VideoStream
 
-from utils import BogusUtils, UrlParser
+
+def _default_url(url_list: List[str]) -> str:
+    """默认镜像：有第三个地址时优先使用（与原有选择一致），未观测延迟时保持该选择"""
+    return url_list[2] if len(url_list) > 2 else url_list[0]
 
 
 class DouyinParser:
@@ -32,6 +46,8 @@ class DouyinParser:
         self.aweme_id = UrlParser.get_video_id(url)
         self.data = None
         self.is_note = "/note/" in url
+        # 网络错误、上游 5xx 或风控导致的失败原因（作品不存在等不记录）
+        self.upstream_error: Optional[str] = None
 
     @staticmethod
     def fetch_redirect_url(url: str) -> Optional[str]:
@@ -54,49 +70,96 @@ class DouyinParser:
             f"ttwid={self.ttwid}; UIFID_TEMP=973a3fd64dcc46a3490fd9b60d4a8e663b34df4ccc4bbcf97643172fb712d8b085a6744acabbffda742bf60a364e4bd6ba5522889cc6f6598b4ea0b83bec2c70bac5163dec36cdb8fb58ea1ae00a413d; s_v_web_id=verify_lzhq5z5k_lbhbXlzb_o9V2_4SQt_8VKz_WZhdN8ARwLk5; home_can_add_dy_2_desktop=%220%22; dy_swidth=1536; dy_sheight=864; stream_recommend_feed_params=%22%7B%5C%22cookie_enabled%5C%22%3Atrue%2C%5C%22screen_width%5C%22%3A1536%2C%5C%22screen_height%5C%22%3A864%2C%5C%22browser_online%5C%22%3Atrue%2C%5C%22cpu_core_num%5C%22%3A8%2C%5C%22device_memory%5C%22%3A8%2C%5C%22downlink%5C%22%3A10%2C%5C%22effective_type%5C%22%3A%5C%224g%5C%22%2C%5C%22round_trip_time%5C%22%3A50%7D%22; csrf_session_id=c25ac0fd3e72f260d4d666d4e5b59401; IsDouyinActive=false"
         )
 
+        check_deadline("sign")
         abogus = self.utils.get_abogus(play_url, self.utils.user_agent)
         url = f"{play_url}&a_bogus={abogus}"
 
         try:
-            response = requests.get(url, headers=headers, verify=False, timeout=10)
+            response = session_get(
+                url,
+                headers=headers,
+                verify=False,
+                timeout=effective_timeout(url, 10, "fetch"),
+            )
+            if response.status_code >= 500:
+                self.upstream_error = f"HTTP {response.status_code}"
+                return None
             if response.text:
                 self.data = response.json()
 
                 return self.data
+            # 签名（a_bogus）被拒绝时接口返回空内容
+            self.upstream_error = "接口返回空内容"
+        except CONTROL_EXCEPTIONS:
+            raise
         except Exception as e:
             print(f"[Douyin] Parse error: {e}")
+            self.upstream_error = str(e)
 
         return None
 
-    def get_video_info(self) -> Optional[dict]:
-        """获取完整视频信息"""
+    def get_video_info(
+        self, include: Optional[Iterable[str]] = None
+    ) -> Optional[DouyinVideoInfo]:
+        """
+        获取完整视频信息
+
+        Args:
+            include: 需要计算的可选部分（streams/audio/music），None 表示全部
+        """
+        info = self.get_metadata(include)
+        if info is None:
+            return None
+        info.update(self.get_streams(include))
+        return info
+
+    def _get_detail(self) -> Optional[dict]:
+        """获取作品详情（未解析时先请求接口）"""
         if not self.data:
             self.parse()
 
         if not self.data or "aweme_detail" not in self.data:
             return None
+        return self.data.get("aweme_detail", {})
+
+    def get_streams(self, include: Optional[Iterable[str]] = None) -> DouyinVideoInfo:
+        """获取视频 URL、多清晰度视频流与音频流（按 include 跳过未请求的部分）"""
+        sections = resolve_sections(include)
+        detail = self._get_detail() or {}
+        video_data = detail.get("video", {})
+        music = detail.get("music", {})
+
+        streams: DouyinVideoInfo = {}
+        if "streams" in sections:
+            # 获取视频 URL
+            streams["videoUrl"] = self._get_video_url(video_data)
+            # 获取视频流列表（多清晰度）
+            streams["videoStreams"] = self._get_video_streams(video_data)
+        if "audio" in sections:
+            # 获取音频流
+            streams["audioStream"] = self._get_audio_stream(video_data, music)
+        return order_mirrors(streams)
+
+    def get_metadata(
+        self, include: Optional[Iterable[str]] = None
+    ) -> Optional[DouyinVideoInfo]:
+        """获取作品元数据（标题、封面、作者、统计等，不含视频/音频流）"""
+        sections = resolve_sections(include)
+        detail = self._get_detail()
+        if detail is None:
+            return None
 
-        detail = self.data.get("aweme_detail", {})
         video_data = detail.get("video", {})
         author = detail.get("author", {})
         statistics = detail.get("statistics", {})
         music = detail.get("music", {})
 
-        # 获取视频 URL
-        video_url = self._get_video_url(video_data)
-
         # 获取封面 URL
         cover_url = self._get_cover_url(video_data, detail)
 
         # 获取图片列表（图文笔记）
         images = self._get_images(detail)
 
-        # 获取视频流列表（多清晰度）
-        video_streams = self._get_video_streams(video_data)
-
-        # 获取音频流
-        audio_stream = self._get_audio_stream(video_data, music)
-
         # 格式化统计数据
         def format_count(count):
             if count is None:
@@ -140,19 +203,15 @@ class DouyinParser:
             f"[Douyin] 统计数据 - 播放: {play_count}, 点赞: {statistics.get('digg_count', 0)}, 评论: {statistics.get('comment_count', 0)}"
         )
 
-        return {
+        metadata: DouyinVideoInfo = {
             "awemeId": self.aweme_id,
             "title": detail.get("desc", ""),
             "cover": cover_url,
-            "videoUrl": video_url,
             "duration": duration_sec,
             "durationMs": duration_ms,
             "platform": "douyin",
             "isNote": self.is_note or len(images) > 0,
             "images": images,
-            # 视频流和音频流
-            "videoStreams": video_streams,
-            "audioStream": audio_stream,
             # 作者信息
             "author": author.get("nickname", ""),
             "authorId": author.get("uid", ""),
@@ -186,9 +245,11 @@ class DouyinParser:
             "gameInfo": self._get_game_info(detail),
             # 合集信息
             "mixInfo": self._get_mix_info(detail),
-            # 音乐信息
-            "musicInfo": self._get_music_info(music),
         }
+        if "music" in sections:
+            # 音乐信息
+            metadata["musicInfo"] = self._get_music_info(music)
+        return metadata
 
     def _get_video_url(self, video_data: dict) -> Optional[str]:
         """获取视频 URL"""
@@ -196,10 +257,9 @@ class DouyinParser:
         bit_rate = video_data.get("bit_rate")
         if bit_rate and len(bit_rate) > 0:
             play_addr_list = bit_rate[0].get("play_addr", {}).get("url_list", [])
-            if len(play_addr_list) > 2:
-                return play_addr_list[2]
-            elif len(play_addr_list) > 0:
-                return play_addr_list[0]
+            if play_addr_list:
+                # 选择观测延迟最低的 CDN，未观测过时使用默认镜像
+                return rank_urls([_default_url(play_addr_list), *play_addr_list])[0]
 
         # 方式2: 从 play_addr 直接获取
         play_addr = video_data.get("play_addr", {}).get("url_list", [])
@@ -265,7 +325,7 @@ class DouyinParser:
             }
         return None
 
-    def _get_video_streams(self, video_data: dict) -> list:
+    def _get_video_streams(self, video_data: dict) -> List[VideoStream]:
         """获取多清晰度视频流"""
         streams = []
 
@@ -344,7 +404,7 @@ class DouyinParser:
             if not url_list:
                 continue
 
-            video_url = url_list[2] if len(url_list) > 2 else url_list[0]
+            video_url = _default_url(url_list)
 
             width = play_addr.get("width", 0) or br.get("width", 0)
             height = play_addr.get("height", 0) or br.get("height", 0)
@@ -378,7 +438,7 @@ class DouyinParser:
             play_addr = video_data.get("play_addr") or {}
             url_list = play_addr.get("url_list") or []
             if url_list:
-                video_url = url_list[2] if len(url_list) > 2 else url_list[0]
+                video_url = _default_url(url_list)
                 streams.append(
                     {
                         "id": 0,
@@ -413,7 +473,7 @@ class DouyinParser:
 
         return unique_streams
 
-    def _get_audio_stream(self, video_data: dict, music: dict) -> Optional[dict]:
+    def _get_audio_stream(self, video_data: dict, music: dict) -> Optional[AudioStream]:
         """获取音频流"""
         # 方式1：从 music 字段获取独立音频流
         if music and isinstance(music, dict):
@@ -444,7 +504,7 @@ class DouyinParser:
                 play_addr = br.get("play_addr") or {}
                 url_list = play_addr.get("url_list") or []
                 if url_list:
-                    video_url = url_list[2] if len(url_list) > 2 else url_list[0]
+                    video_url = _default_url(url_list)
                     return {
                         "url": video_url,
                         "backupUrls": url_list,
@@ -0,0 +1,35 @@
+"""解析结果的可选部分（include 参数）"""
+
+from typing import FrozenSet, Iterable, Optional, Union
+
+# 可按需计算的部分：
+#   streams   - 视频 URL 与多清晰度视频流（B站需请求 playurl）
+#   audio     - 音频流（B站需请求 playurl）
+#   subtitles - 字幕列表（B站）
+#   pages     - 分P列表（B站）
+#   music     - 背景音乐信息（抖音）
+SECTIONS: FrozenSet[str] = frozenset(
+    {"streams", "audio", "subtitles", "pages", "music"}
+)
+
+
+def resolve_sections(
+    include: Optional[Union[str, Iterable[str]]] = None,
+) -> FrozenSet[str]:
+    """
+    规范化 include 参数
+
+    Args:
+        include: 逗号分隔的字符串或列表；None 表示全部
+
+    Returns:
+        需要计算的部分集合（未知名称会被忽略）
+    """
+    if include is None:
+        return SECTIONS
+    if isinstance(include, str):
+        include = [include]
+    names = set()
+    for item in include:
+        names.update(name.strip().lower() for name in item.split(","))
+    return SECTIONS & names
@@ -0,0 +1,167 @@
+"""
+解析结果类型定义
+
+各解析器 get_video_info 返回的字典结构。使用 TypedDict 只做静态类型标注，
+运行时仍是普通 dict，不产生额外的校验与转换开销。total=False 是因为
+include / fields 可能省略部分字段。
+"""
+
+from typing import Any, Dict, List, Optional, TypedDict, Union
+
+
+class VideoStream(TypedDict, total=False):
+    """单个清晰度的视频流"""
+
+    id: Union[int, str]
+    name: str
+    short: str
+    url: str
+    backupUrls: List[str]
+    bitrate: int
+    width: int
+    height: int
+    codecs: str
+    size: str
+    sizeBytes: int
+    priority: int
+
+
+class AudioStream(TypedDict, total=False):
+    """音频流（抖音/小红书可能是视频内嵌音轨，isVideoAudio 为 True）"""
+
+    id: int
+    url: str
+    backupUrls: List[str]
+    codecs: str
+    title: str
+    author: str
+    duration: int
+    bitrate: int
+    uri: str
+    isVideoAudio: bool
+
+
+class Hashtag(TypedDict):
+    id: str
+    name: str
+
+
+class DouyinVideoInfo(TypedDict, total=False):
+    """抖音解析结果"""
+
+    awemeId: str
+    title: str
+    cover: Optional[str]
+    videoUrl: Optional[str]
+    duration: int
+    durationMs: int
+    platform: str
+    isNote: bool
+    images: List[str]
+    videoStreams: List[VideoStream]
+    audioStream: Optional[AudioStream]
+    author: str
+    authorId: str
+    authorAvatar: str
+    authorSignature: str
+    authorWorks: str
+    views: str
+    viewsRaw: int
+    likes: str
+    comments: str
+    shares: str
+    collects: str
+    createTime: str
+    createTimeRaw: int
+    dimension: str
+    width: int
+    height: int
+    hashtags: List[Hashtag]
+    allowDownload: bool
+    allowDuet: bool
+    allowStitch: bool
+    allowShare: bool
+    gameInfo: Optional[Dict[str, Any]]
+    mixInfo: Optional[Dict[str, Any]]
+    musicInfo: Optional[Dict[str, Any]]
+
+
+class BilibiliVideoInfo(TypedDict, total=False):
+    """B站解析结果"""
+
+    bvid: str
+    aid: int
+    cid: int
+    title: str
+    desc: str
+    cover: str
+    videoUrl: str
+    audioUrl: str
+    duration: int
+    platform: str
+    videoStreams: List[VideoStream]
+    audioStream: Optional[AudioStream]
+    author: str
+    authorId: str
+    authorAvatar: str
+    views: str
+    likes: str
+    comments: str
+    danmaku: str
+    coin: str
+    favorite: str
+    shares: str
+    stat: Dict[str, int]
+    createTime: str
+    pubdate: int
+    ctime: int
+    tid: int
+    tidV2: int
+    tname: str
+    tnameV2: str
+    dimension: Dict[str, int]
+    copyright: int
+    videosCount: int
+    state: int
+    dynamic: str
+    missionId: int
+    seasonId: int
+    rights: Dict[str, Any]
+    pages: List[Dict[str, Any]]
+    subtitles: List[Dict[str, Any]]
+    ugcSeason: Optional[Dict[str, Any]]
+    acceptQuality: List[int]
+    acceptDescription: List[str]
+    downloadHeaders: Dict[str, str]
+
+
+class XiaohongshuVideoInfo(TypedDict, total=False):
+    """小红书解析结果"""
+
+    noteId: str
+    title: str
+    desc: str
+    cover: str
+    videoUrl: str
+    duration: int
+    platform: str
+    isNote: bool
+    isVideo: bool
+    images: List[str]
+    videoStreams: List[VideoStream]
+    audioStream: Optional[AudioStream]
+    author: str
+    authorId: str
+    authorAvatar: str
+    likes: str
+    comments: str
+    collects: str
+    shares: str
+    createTime: str
+    hashtags: List[Hashtag]
+    dimension: str
+    width: int
+    height: int
+
+
+VideoInfo = Union[DouyinVideoInfo, BilibiliVideoInfo, XiaohongshuVideoInfo]
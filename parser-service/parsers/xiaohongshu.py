@@ -5,13 +5,21 @@ import re
 import json
 import urllib.parse
 from datetime import datetime
-from typing import Optional
+from typing import Iterable, Optional
 from urllib.parse import urlparse, parse_qs
 
 import requests
 from bs4 import BeautifulSoup
 
-from utils import UrlParser
+from utils import (
+    UrlParser,
+    order_mirrors,
+    effective_timeout,
+    session_get,
+    CONTROL_EXCEPTIONS,
+)
+from .sections import resolve_sections
+from .types import XiaohongshuVideoInfo
 
 
 # 小红书 Cookie 配置（需要登录后获取）
@@ -57,6 +65,8 @@ class XiaohongshuParser:
             self.headers["Cookie"] = self.cookie
         self.data = None
         self.note_id = self._get_note_id(url)
+        # 网络错误、上游 5xx 导致的失败原因（笔记不存在、需要登录等不记录）
+        self.upstream_error: Optional[str] = None
 
     def _normalize_url(self, url: str) -> str:
         """统一 URL 格式"""
@@ -104,7 +114,13 @@ class XiaohongshuParser:
     def parse(self) -> bool:
         """解析页面数据"""
         try:
-            resp = requests.get(self.url, headers=self.headers, timeout=10)
+            resp = session_get(
+                self.url,
+                headers=self.headers,
+                timeout=effective_timeout(self.url, 10, "fetch"),
+            )
+            if resp.status_code >= 500:
+                self.upstream_error = f"HTTP {resp.status_code}"
             resp.raise_for_status()
             html_content = resp.text
 
@@ -137,15 +153,31 @@ class XiaohongshuParser:
             print(f"[XHS] Failed to find __INITIAL_STATE__ in page")
             return False
 
+        except CONTROL_EXCEPTIONS:
+            raise
         except Exception as e:
             print(f"[XHS] Parse error: {e}")
+            if isinstance(e, requests.RequestException) and not isinstance(
+                e, requests.HTTPError
+            ):
+                # 网络错误（4xx 由笔记本身导致，不计入）
+                self.upstream_error = str(e)
             import traceback
 
             traceback.print_exc()
             return False
 
-    def get_video_info(self) -> Optional[dict]:
-        """获取完整视频信息"""
+    def get_video_info(
+        self, include: Optional[Iterable[str]] = None
+    ) -> Optional[XiaohongshuVideoInfo]:
+        """
+        获取完整视频信息
+
+        Args:
+            include: 需要返回的可选部分（streams/audio），None 表示全部；
+                流信息与页面数据一起返回，不涉及额外请求
+        """
+        sections = resolve_sections(include)
         if not self.data:
             if not self.parse():
                 return None
@@ -335,7 +367,7 @@ class XiaohongshuParser:
             height = video_streams[0].get("height", 0) if video_streams else 0
             dimension = f"{width}x{height}" if width and height else ""
 
-            return {
+            info: XiaohongshuVideoInfo = {
                 "noteId": first_note_id,
                 "title": title or desc[:50] if desc else "无标题",
                 "desc": desc,
@@ -362,6 +394,11 @@ class XiaohongshuParser:
                 "width": width,
                 "height": height,
             }
+            if "streams" not in sections:
+                del info["videoUrl"], info["videoStreams"]
+            if "audio" not in sections:
+                del info["audioStream"]
+            return order_mirrors(info)
 
         except Exception as e:
             print(f"[XHS] Get video info error: {e}")
@@ -23,19 +23,10 @@ def detect_platform(url: str) -> Optional[str]:
     Returns:
         平台名称: douyin/bilibili/xiaohongshu/None
     """
-    url_lower = url.lower()
-    
-    if "douyin.com" in url_lower or "v.douyin.com" in url_lower:
-        return "douyin"
-    elif "bilibili.com" in url_lower or "b23.tv" in url_lower:
-        return "bilibili"
-    elif "xiaohongshu.com" in url_lower or "xhslink.com" in url_lower:
-        return "xiaohongshu"
-    
-    return None
+    return UrlParser.detect_platform(url)
 
 
-def test_parse(url: str, cookie: str = None) -> dict:
+def parse_url(url: str, cookie: str = None) -> dict:
     """
     测试解析单个链接
     
@@ -215,7 +206,7 @@ def interactive_mode():
                 print(f"JSON输出: {'开启' if show_json else '关闭'}")
                 continue
             
-            result = test_parse(url)
+            result = parse_url(url)
             print_result(result)
             
             if show_json and result["success"]:
@@ -243,7 +234,7 @@ def main():
     success_count = 0
     for i, url in enumerate(args, 1):
         print(f"\n--- 测试 {i}/{len(args)} ---")
-        result = test_parse(url)
+        result = parse_url(url)
         print_result(result)
         if result["success"]:
             success_count += 1
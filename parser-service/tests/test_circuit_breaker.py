@@ -0,0 +1,135 @@
+"""熔断器状态转换"""
+
+import pytest
+
+from utils import circuit_breaker
+from utils.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    BreakerRegistry,
+    CircuitBreaker,
+    CircuitOpenError,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", fake)
+    return fake
+
+
+def make_breaker(**options) -> CircuitBreaker:
+    options = {"window": 60, "min_calls": 4, "failure_rate": 0.5, "reset_timeout": 30, **options}
+    return CircuitBreaker("test", **options)
+
+
+def test_stays_closed_below_min_calls(clock):
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.record(False)
+    assert breaker.state == CLOSED
+    breaker.before_call()
+
+
+def test_trips_on_failure_rate(clock):
+    breaker = make_breaker()
+    breaker.record(True)
+    breaker.record(True)
+    breaker.record(False)
+    assert breaker.state == CLOSED
+    breaker.record(False)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError) as info:
+        breaker.before_call()
+    assert info.value.retry_after == pytest.approx(30)
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_trips_on_slow_calls(clock):
+    breaker = make_breaker(slow_call_seconds=2.0, slow_call_rate=0.75)
+    for _ in range(3):
+        breaker.record(True, elapsed=5.0)
+    breaker.record(True, elapsed=0.1)
+    assert breaker.state == OPEN
+
+
+def test_old_calls_leave_window(clock):
+    breaker = make_breaker()
+    breaker.record(False)
+    breaker.record(False)
+    clock.now += 61
+    breaker.record(True)
+    breaker.record(True)
+    breaker.record(False)
+    assert breaker.state == CLOSED
+
+
+def test_half_open_probe_success_closes(clock):
+    breaker = make_breaker(min_calls=1)
+    breaker.record(False)
+    assert breaker.state == OPEN
+    clock.now += 30
+    assert breaker.state == HALF_OPEN
+    breaker.before_call()
+    # 探测名额已被占用
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record(True)
+    assert breaker.state == CLOSED
+
+
+def test_half_open_probe_failure_reopens(clock):
+    breaker = make_breaker(min_calls=1)
+    breaker.record(False)
+    clock.now += 30
+    breaker.before_call()
+    breaker.record(False)
+    assert breaker.state == OPEN
+    assert breaker.stats()["trips"] == 2
+
+
+def test_cancel_releases_probe(clock):
+    breaker = make_breaker(min_calls=1)
+    breaker.record(False)
+    clock.now += 30
+    breaker.before_call()
+    breaker.cancel()
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+
+
+def test_call_uses_failed_and_ignore(clock):
+    breaker = make_breaker(min_calls=3, failure_rate=0.6)
+    assert breaker.call(lambda: "ok") == "ok"
+
+    with pytest.raises(TimeoutError):
+        breaker.call(_raise, TimeoutError, ignore=(TimeoutError,))
+    # 被忽略的异常不计入统计
+    assert breaker.stats()["calls"] == 1
+
+    breaker.call(lambda: {"success": False}, failed=lambda r: not r["success"])
+    assert breaker.state == CLOSED
+    with pytest.raises(ValueError):
+        breaker.call(_raise, ValueError)
+    assert breaker.state == OPEN
+
+
+def test_registry_reuses_breakers():
+    registry = BreakerRegistry(min_calls=1)
+    assert registry.get("a") is registry.get("a")
+    assert registry.get("a") is not registry.get("b")
+    assert registry.get("a").min_calls == 1
+
+
+def _raise(exc_type):
+    raise exc_type("boom")
@@ -0,0 +1,83 @@
+"""重试判断：状态码、Retry-After、异常类型与请求方法"""
+
+import io
+import time
+import itertools
+from email.utils import formatdate
+
+import pytest
+import requests
+
+from utils.http_client import RetryPolicy, _next_delay, parse_retry_after
+
+_hosts = itertools.count()
+
+
+def unique_url() -> str:
+    # 每个用例使用独立主机，避免共享主机的重试预算
+    return f"http://retry-{next(_hosts)}.test/api"
+
+
+def make_response(status: int, retry_after=None) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    response.raw = io.BytesIO()
+    if retry_after is not None:
+        response.headers["Retry-After"] = retry_after
+    return response
+
+
+def test_parse_retry_after():
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("5") == 5.0
+    assert parse_retry_after("soon") is None
+    date = formatdate(timeval=time.time() + 20, usegmt=True)
+    assert 15 <= parse_retry_after(date) <= 20
+
+
+def test_retry_after_overrides_backoff():
+    policy = RetryPolicy()
+    delay = _next_delay(policy, 0, "GET", unique_url(), True, make_response(503, "2"))
+    assert delay == 2.0
+
+
+def test_retry_after_above_limit_gives_up():
+    policy = RetryPolicy(max_retry_after=30)
+    delay = _next_delay(policy, 0, "GET", unique_url(), True, make_response(429, "60"))
+    assert delay is None
+
+
+def test_retry_status_without_retry_after_uses_backoff():
+    policy = RetryPolicy(backoff_base=1.0)
+    for attempt in range(2):
+        delay = _next_delay(
+            policy, attempt, "GET", unique_url(), True, make_response(502)
+        )
+        assert 0 <= delay <= 2**attempt
+
+
+def test_non_retry_status_and_last_attempt():
+    policy = RetryPolicy(retries=3)
+    url = unique_url()
+    assert _next_delay(policy, 0, "GET", url, True, make_response(404)) is None
+    assert _next_delay(policy, 0, "GET", url, True, make_response(200)) is None
+    assert _next_delay(policy, 2, "GET", url, True, make_response(503, "1")) is None
+
+
+@pytest.mark.parametrize(
+    "method, error, retried",
+    [
+        ("GET", requests.exceptions.ReadTimeout(), True),
+        ("GET", requests.exceptions.ConnectionError(), True),
+        # 请求已发出：POST 不重试，避免重复生成
+        ("POST", requests.exceptions.ReadTimeout(), False),
+        ("POST", requests.exceptions.ChunkedEncodingError(), False),
+        # 连接阶段失败：POST 也可以重试
+        ("POST", requests.exceptions.ConnectTimeout(), True),
+        # 不可重试的错误（字符串）
+        ("GET", "Invalid URL", False),
+    ],
+)
+def test_exception_retry_by_method(method, error, retried):
+    delay = _next_delay(RetryPolicy(), 0, method, unique_url(), False, error)
+    assert (delay is not None) == retried
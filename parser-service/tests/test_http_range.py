@@ -0,0 +1,73 @@
+"""Range / Content-Range 解析与生成"""
+
+import pytest
+
+from utils.http_range import (
+    RangeNotSatisfiable,
+    format_content_range,
+    is_suffix_range,
+    parse_content_range,
+    parse_range_header,
+)
+
+
+@pytest.mark.parametrize(
+    "value, total, expected",
+    [
+        ("bytes=0-1023", None, (0, 1023)),
+        ("bytes=1024-", None, (1024, None)),
+        ("bytes=1024-", 4096, (1024, 4095)),
+        ("bytes=0-99999", 4096, (0, 4095)),
+        ("bytes=-500", 1000, (500, 999)),
+        ("bytes=-2000", 1000, (0, 999)),
+        ("BYTES = 10 - 20", None, (10, 20)),
+        # 多范围时取第一个
+        ("bytes=0-9,20-29", None, (0, 9)),
+    ],
+)
+def test_parse_range_header(value, total, expected):
+    assert parse_range_header(value, total) == expected
+
+
+@pytest.mark.parametrize(
+    "value, total",
+    [
+        (None, None),
+        ("", 1000),
+        ("items=0-9", 1000),
+        ("bytes=abc", 1000),
+        # 终点小于起点按完整内容处理
+        ("bytes=20-10", 1000),
+        # 后缀范围在总大小未知时无法确定起点
+        ("bytes=-500", None),
+    ],
+)
+def test_parse_range_header_full_content(value, total):
+    assert parse_range_header(value, total) is None
+
+
+@pytest.mark.parametrize("value", ["bytes=1000-", "bytes=5000-6000", "bytes=-0"])
+def test_parse_range_header_not_satisfiable(value):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range_header(value, 1000)
+
+
+def test_is_suffix_range():
+    assert is_suffix_range("bytes=-500")
+    assert not is_suffix_range("bytes=0-500")
+    assert not is_suffix_range("bytes=500-")
+    assert not is_suffix_range("bytes=-")
+    assert not is_suffix_range(None)
+
+
+def test_parse_content_range():
+    assert parse_content_range("bytes 0-1023/4096") == (0, 1023, 4096)
+    assert parse_content_range("bytes 0-1023/*") == (0, 1023, None)
+    assert parse_content_range("bytes */4096") is None
+    assert parse_content_range(None) is None
+
+
+def test_format_content_range_round_trip():
+    assert format_content_range(0, 1023, 4096) == "bytes 0-1023/4096"
+    assert format_content_range(10, 20) == "bytes 10-20/*"
+    assert parse_content_range(format_content_range(5, 9, 10)) == (5, 9, 10)
@@ -0,0 +1,58 @@
+"""fields 投影与精简模式"""
+
+from utils.projection import compact, parse_fields, project, shape_result
+
+INFO = {
+    "title": "标题",
+    "views": "1.2万",
+    "viewsRaw": 12000,
+    "createTime": "2024-01-01",
+    "createTimeRaw": 1704067200,
+    "cover": None,
+    "stat": {"view": 12000, "like": 300},
+    "videoStreams": [
+        {"url": "https://a/1.mp4", "backupUrls": ["https://b/1.mp4"], "size": "1MB", "priority": 1},
+        {"url": "https://a/2.mp4", "backupUrls": [], "size": None},
+    ],
+    "audioStream": {"url": "https://a/a.m4s", "backupUrls": ["https://b/a.m4s"]},
+}
+
+
+def test_parse_fields():
+    assert parse_fields(None) is None
+    assert parse_fields("") is None
+    assert parse_fields(" , ") is None
+    assert parse_fields("title, stat.view") == ["title", "stat.view"]
+    assert parse_fields(["title,cover", " stat "]) == ["title", "cover", "stat"]
+
+
+def test_project_nested_and_lists():
+    result = project(INFO, "title,stat.view,videoStreams.url,missing.field")
+    assert result == {
+        "title": "标题",
+        "stat": {"view": 12000},
+        "videoStreams": [{"url": "https://a/1.mp4"}, {"url": "https://a/2.mp4"}],
+    }
+
+
+def test_project_without_fields_returns_data():
+    assert project(INFO, None) is INFO
+    assert project(INFO, "") is INFO
+
+
+def test_compact_drops_duplicates_and_none():
+    result = compact(INFO)
+    assert "views" not in result and result["viewsRaw"] == 12000
+    assert "createTime" not in result
+    assert "cover" not in result
+    assert result["videoStreams"] == [{"url": "https://a/1.mp4"}, {"url": "https://a/2.mp4"}]
+    # 音频流保留备用地址
+    assert result["audioStream"]["backupUrls"] == ["https://b/a.m4s"]
+    # 不修改原数据
+    assert INFO["views"] == "1.2万"
+
+
+def test_shape_result_keeps_formatted_field_without_raw():
+    # 只保留格式化字段时，精简模式不能把它去掉
+    assert shape_result(INFO, "views", compact_mode=True) == {"views": "1.2万"}
+    assert shape_result(None, "title") is None
@@ -0,0 +1,45 @@
+"""token 估算与按句子分段"""
+
+from utils.text_chunker import chunk_text, estimate_tokens, split_sentences
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    # 中日韩字符 1 字 1 token
+    assert estimate_tokens("中文字幕") == 4
+    # 其余字符约 4 个 1 token（向上取整）
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("abcde") == 2
+    assert estimate_tokens("中abcd") == 2
+
+
+def test_split_sentences_keeps_text():
+    text = "第一句。第二句！Third one. Fourth?\n最后"
+    sentences = split_sentences(text)
+    assert "".join(sentences) == text
+    assert sentences[:3] == ["第一句。", "第二句！", "Third one."]
+    assert sentences[-1] == "最后"
+
+
+def test_chunk_text_respects_limit_and_boundaries():
+    text = "这是一个句子。" * 50
+    chunks = chunk_text(text, max_tokens=20)
+    assert "".join(chunks) == text
+    for chunk in chunks:
+        assert estimate_tokens(chunk) <= 20
+        # 只在句末切分
+        assert chunk.endswith("。")
+
+
+def test_chunk_text_splits_long_sentence():
+    # 单句超出上限时先按逗号切分，仍超出时按字符数硬切
+    text = "很长的从句" * 10 + "，" + "没有任何标点的超长内容" * 10 + "。"
+    chunks = chunk_text(text, max_tokens=30)
+    assert "".join(chunks) == text
+    assert all(estimate_tokens(chunk) <= 30 for chunk in chunks)
+
+
+def test_chunk_text_short_and_blank():
+    assert chunk_text("短文本。", max_tokens=100) == ["短文本。"]
+    assert chunk_text("", max_tokens=100) == []
+    assert chunk_text("   \n  ", max_tokens=100) == []
@@ -2,7 +2,99 @@
 
 from .bogus import BogusUtils
 from .url_parser import UrlParser
-from .http_client import request_with_retry, post_with_retry, get_with_retry
+from .http_client import (
+    request_with_retry,
+    post_with_retry,
+    get_with_retry,
+    async_request_with_retry,
+    async_post_with_retry,
+    async_get_with_retry,
+    get_session,
+    session_get,
+    CONTROL_EXCEPTIONS,
+    RetryPolicy,
+    parse_retry_after,
+    host_breakers,
+)
+from .deadline import (
+    DEADLINE_HEADER,
+    DeadlineExceeded,
+    DeadlineMiddleware,
+    deadline_scope,
+    deadline_expired,
+    check_deadline,
+    remaining as deadline_remaining,
+    effective_timeout,
+    host_latency,
+    LATENCY_HOOKS,
+)
+from .cancellation import (
+    RequestCancelled,
+    DisconnectMiddleware,
+    check_cancelled,
+    is_cancelled,
+    cancellable_sleep,
+    cancel_stats,
+)
+from .priority import (
+    PRIORITY_HEADER,
+    PrioritySemaphore,
+    PriorityMiddleware,
+    current_priority,
+    priority_scope,
+    priority_stats,
+)
+from .executor import BoundedExecutor
+from .admission import ALL_KEYS, AdmissionMiddleware, admission_stats
+from .circuit_breaker import CircuitBreaker, CircuitOpenError, BreakerRegistry
+from .mirror import (
+    mirror_stats,
+    rank_urls,
+    order_mirrors,
+    hedged_get,
+    async_hedged_get,
+)
+from .http_range import (
+    RangeNotSatisfiable,
+    parse_range_header,
+    is_suffix_range,
+    parse_content_range,
+    format_content_range,
+)
+from .streaming import iter_upstream, sse_event
+from .block_cache import (
+    BlockCache,
+    media_key,
+    response_total,
+    iter_cached_range,
+)
+from .ffmpeg import (
+    find_ffmpeg,
+    detect_audio_codec,
+    remux_command,
+    run_ffmpeg,
+    iter_ffmpeg,
+)
+from .tencent_asr import TencentAsrClient, TencentAsrError, tc3_sign
+from .transcript_store import TranscriptStore, audio_hash, canonical_media_id
+from .response_cache import (
+    LRUCache,
+    DiskCache,
+    ResponseCache,
+    chat_cache_key,
+    proxy_cache_key,
+)
+from .rate_limit import TokenBucket, KeyedLimiter
+from .text_chunker import estimate_tokens, split_sentences, chunk_text
+from .projection import project, compact, shape_result
+from .fast_json import (
+    FastJSONResponse,
+    FastJSONRoute,
+    dumps as json_dumps,
+    loads as json_loads,
+    ndjson_line,
+)
+from .compression import CompressionMiddleware, negotiate_encoding
 
 __all__ = [
     "BogusUtils",
@@ -10,4 +102,89 @@ __all__ = [
     "request_with_retry",
     "post_with_retry",
     "get_with_retry",
+    "async_request_with_retry",
+    "async_post_with_retry",
+    "async_get_with_retry",
+    "get_session",
+    "session_get",
+    "CONTROL_EXCEPTIONS",
+    "RetryPolicy",
+    "parse_retry_after",
+    "host_breakers",
+    "DEADLINE_HEADER",
+    "DeadlineExceeded",
+    "DeadlineMiddleware",
+    "deadline_scope",
+    "deadline_expired",
+    "check_deadline",
+    "deadline_remaining",
+    "effective_timeout",
+    "host_latency",
+    "LATENCY_HOOKS",
+    "RequestCancelled",
+    "DisconnectMiddleware",
+    "check_cancelled",
+    "is_cancelled",
+    "cancellable_sleep",
+    "cancel_stats",
+    "PRIORITY_HEADER",
+    "PrioritySemaphore",
+    "PriorityMiddleware",
+    "current_priority",
+    "priority_scope",
+    "priority_stats",
+    "BoundedExecutor",
+    "ALL_KEYS",
+    "AdmissionMiddleware",
+    "admission_stats",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "BreakerRegistry",
+    "mirror_stats",
+    "rank_urls",
+    "order_mirrors",
+    "hedged_get",
+    "async_hedged_get",
+    "RangeNotSatisfiable",
+    "parse_range_header",
+    "is_suffix_range",
+    "parse_content_range",
+    "format_content_range",
+    "iter_upstream",
+    "sse_event",
+    "BlockCache",
+    "media_key",
+    "response_total",
+    "iter_cached_range",
+    "find_ffmpeg",
+    "detect_audio_codec",
+    "remux_command",
+    "run_ffmpeg",
+    "iter_ffmpeg",
+    "TencentAsrClient",
+    "TencentAsrError",
+    "tc3_sign",
+    "TranscriptStore",
+    "audio_hash",
+    "canonical_media_id",
+    "LRUCache",
+    "DiskCache",
+    "ResponseCache",
+    "chat_cache_key",
+    "proxy_cache_key",
+    "TokenBucket",
+    "KeyedLimiter",
+    "estimate_tokens",
+    "split_sentences",
+    "chunk_text",
+    "project",
+    "compact",
+    "shape_result",
+    "FastJSONResponse",
+    "FastJSONRoute",
+    "json_dumps",
+    "json_loads",
+    "ndjson_line",
+    "CompressionMiddleware",
+    "negotiate_encoding",
 ]
@@ -0,0 +1,157 @@
+"""
+准入控制 - 过载时快速拒绝，而不是让请求在队列中堆积
+
+按以下信号判断是否接收新请求（后台请求只能使用 ADMISSION_BACKGROUND_SHARE
+比例的容量，过载时先被拒绝）：
+
+    进行中的请求数超过上限        503
+    线程池排队数超过上限          429
+    排队最久的请求等待时间超过上限 503
+
+排队信号按请求的目标键（平台 / 工作类型）与优先级计算：某个平台的积压不会
+拒绝其他平台的请求，交互式请求也不受排在其后的后台请求影响；批量请求的多项
+工作只计为一个请求。没有目标键的路由只检查进行中的请求数。
+
+拒绝时返回 Retry-After。健康检查与指标接口不受限制。
+"""
+
+import os
+import itertools
+import threading
+import contextvars
+from collections import Counter
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .fast_json import FastJSONResponse
+from .priority import BACKGROUND, current_priority
+
+# 进行中的请求数上限（0 表示不限制）
+ADMISSION_MAX_IN_FLIGHT = int(os.environ.get("ADMISSION_MAX_IN_FLIGHT", "256"))
+# 线程池排队数上限（0 表示不限制）
+ADMISSION_MAX_QUEUE = int(os.environ.get("ADMISSION_MAX_QUEUE", "64"))
+# 排队等待时间上限（秒，0 表示不限制）
+ADMISSION_MAX_QUEUE_WAIT = float(os.environ.get("ADMISSION_MAX_QUEUE_WAIT", "10"))
+# 后台请求可使用的容量比例
+ADMISSION_BACKGROUND_SHARE = float(os.environ.get("ADMISSION_BACKGROUND_SHARE", "0.5"))
+
+# 全部键（跨平台的路由，如批量解析）
+ALL_KEYS = "*"
+
+# 当前请求的编号，排队统计据此将同一请求的多项工作计为一个请求
+_request_id: contextvars.ContextVar = contextvars.ContextVar(
+    "admission_request_id", default=None
+)
+_request_ids = itertools.count()
+
+
+def current_request() -> Optional[int]:
+    return _request_id.get()
+
+
+class AdmissionStats:
+    """进行中的请求数与准入结果计数（线程安全）"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected: Counter = Counter()
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "inFlight": self.in_flight,
+                "admitted": self.admitted,
+                "rejected": dict(self.rejected),
+            }
+
+
+admission_stats = AdmissionStats()
+
+
+class AdmissionMiddleware:
+    """
+    Args:
+        app: ASGI 应用
+        load: 按 (键, 优先级) 返回负载 (排队请求数, 最久等待秒数) 的函数，
+            如 BoundedExecutor.load（键为 None 表示全部键）
+        route_keys: 路径 -> 目标键（ALL_KEYS 表示全部键），未列出的路径不检查排队
+        max_in_flight: 进行中的请求数上限
+        max_queue: 排队数上限
+        max_queue_wait: 排队等待时间上限（秒）
+        background_share: 后台请求可使用的容量比例
+        exempt_paths: 不受限制的路径
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        load: Optional[Callable[[Optional[str], str], Tuple[int, float]]] = None,
+        route_keys: Optional[Dict[str, str]] = None,
+        max_in_flight: int = ADMISSION_MAX_IN_FLIGHT,
+        max_queue: int = ADMISSION_MAX_QUEUE,
+        max_queue_wait: float = ADMISSION_MAX_QUEUE_WAIT,
+        background_share: float = ADMISSION_BACKGROUND_SHARE,
+        exempt_paths: Iterable[str] = ("/health", "/metrics"),
+    ):
+        self.app = app
+        self.load = load
+        self.route_keys = dict(route_keys or {})
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.max_queue_wait = max_queue_wait
+        self.background_share = background_share
+        self.exempt_paths = set(exempt_paths)
+        self.counters = admission_stats
+
+    def _check(self, path: str) -> Optional[Tuple[int, str, float]]:
+        """判断是否拒绝，返回 (状态码, 原因, 建议重试秒数)，接收时返回 None"""
+        priority = current_priority()
+        share = self.background_share if priority == BACKGROUND else 1.0
+
+        if self.max_in_flight and self.counters.in_flight >= self.max_in_flight * share:
+            return 503, "in_flight", 1.0
+
+        key = self.route_keys.get(path)
+        if self.load is None or key is None:
+            return None
+        queued, oldest_wait = self.load(None if key == ALL_KEYS else key, priority)
+        if self.max_queue and queued >= self.max_queue * share:
+            return 429, "queue", max(1.0, oldest_wait)
+        if self.max_queue_wait and oldest_wait >= self.max_queue_wait * share:
+            return 503, "latency", oldest_wait
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        with self.counters.lock:
+            rejection = self._check(scope["path"])
+            if rejection is None:
+                self.counters.in_flight += 1
+                self.counters.admitted += 1
+            else:
+                self.counters.rejected[rejection[1]] += 1
+
+        if rejection is not None:
+            status_code, reason, retry_after = rejection
+            print(f"[Admission] 拒绝 {scope['path']}: {reason}")
+            response = FastJSONResponse(
+                {"success": False, "message": "服务繁忙，请稍后重试", "reason": reason},
+                status_code=status_code,
+                headers={"Retry-After": str(max(1, round(retry_after)))},
+            )
+            await response(scope, receive, send)
+            return
+
+        token = _request_id.set(next(_request_ids))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_id.reset(token)
+            with self.counters.lock:
+                self.counters.in_flight -= 1
@@ -0,0 +1,396 @@
+"""
+音频块缓存 - 按固定大小分块的稀疏磁盘缓存
+
+同一媒体的签名 URL 每次解析都会变化，但媒体内容不变，因此以平台、CDN 主域名
+与去掉签名参数后的 URL 路径作为媒体标识。代理的流被切分为固定大小的块写入
+磁盘，已缓存的范围直接从本地读取，只有缺失的范围才回源拉取，总大小超出预算
+时按 LRU 淘汰，媒体的最后一个块被淘汰时一并删除其元信息与目录。
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import threading
+from collections import Counter, OrderedDict
+from typing import AsyncIterator, Callable, Iterator, Optional
+from urllib.parse import urlparse, parse_qsl
+
+import requests
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+
+from .http_range import parse_content_range
+from .cancellation import cancel_stats, is_cancelled
+
+# 参与媒体标识的查询参数（其余均视为签名/时效参数）
+IDENTITY_PARAMS = {"video_id", "file_id", "item_id", "ratio"}
+
+
+def host_family(host: str) -> str:
+    """CDN 主域名（同一平台的各镜像节点共用，如 xxx.bilivideo.com -> bilivideo.com）"""
+    labels = (host or "").lower().split(".")
+    return ".".join(labels[-2:])
+
+
+def media_key(url: str, platform: str = "") -> str:
+    """
+    生成稳定的媒体标识
+
+    忽略 CDN 节点与签名参数（deadline、upsig、x-expires 等），只保留平台、
+    CDN 主域名、路径和少数标识媒体本身的查询参数，不同平台 / CDN 的同名
+    路径不会互相命中。
+    """
+    parsed = urlparse(url)
+    params = sorted(
+        (k, v) for k, v in parse_qsl(parsed.query) if k.lower() in IDENTITY_PARAMS
+    )
+    identity = (
+        f"{platform}|{host_family(parsed.hostname)}|{parsed.path}?"
+        + "&".join(f"{k}={v}" for k, v in params)
+    )
+    return hashlib.sha1(identity.encode("utf-8")).hexdigest()
+
+
+def response_offset(resp: requests.Response) -> int:
+    """上游响应体在完整资源中的起始偏移"""
+    if resp.status_code == 206:
+        content_range = parse_content_range(resp.headers.get("Content-Range"))
+        if content_range:
+            return content_range[0]
+    return 0
+
+
+def response_total(resp: requests.Response) -> Optional[int]:
+    """从上游响应中获取资源总大小，未知时返回 None"""
+    if resp.status_code == 206:
+        content_range = parse_content_range(resp.headers.get("Content-Range"))
+        return content_range[2] if content_range else None
+    content_length = resp.headers.get("Content-Length")
+    return int(content_length) if content_length else None
+
+
+class BlockCache:
+    """固定大小分块的磁盘缓存（线程安全）"""
+
+    def __init__(
+        self,
+        cache_dir: str,
+        block_size: int = 256 * 1024,
+        max_bytes: int = 1024 * 1024 * 1024,
+    ):
+        self.cache_dir = cache_dir
+        self.block_size = block_size
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # (key, index) -> 块大小，按访问顺序排列（最旧的在前）
+        self._blocks = OrderedDict()
+        # key -> 已缓存的块数
+        self._key_blocks = Counter()
+        self._metas = {}
+        self._total_bytes = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _key_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def _block_path(self, key: str, index: int) -> str:
+        return os.path.join(self.cache_dir, key, f"{index}.blk")
+
+    def _load_index(self):
+        """启动时扫描缓存目录，按修改时间恢复 LRU 顺序"""
+        entries = []
+        for key in os.listdir(self.cache_dir):
+            key_dir = self._key_dir(key)
+            if not os.path.isdir(key_dir):
+                continue
+            try:
+                with open(os.path.join(key_dir, "meta.json"), "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                meta = None
+            if not meta or meta.get("blockSize") != self.block_size:
+                # 元信息缺失或块大小配置变更，旧缓存无法复用
+                shutil.rmtree(key_dir, ignore_errors=True)
+                continue
+            blocks = []
+            for name in os.listdir(key_dir):
+                if not name.endswith(".blk"):
+                    continue
+                path = os.path.join(key_dir, name)
+                try:
+                    stat = os.stat(path)
+                    blocks.append((stat.st_mtime, key, int(name[:-4]), stat.st_size))
+                except (OSError, ValueError):
+                    continue
+            if not blocks:
+                # 只有元信息、没有任何块（回源中断等），直接清理
+                self._remove_key_files(key)
+                continue
+            self._metas[key] = meta
+            entries.extend(blocks)
+
+        for _, key, index, size in sorted(entries):
+            self._blocks[(key, index)] = size
+            self._key_blocks[key] += 1
+            self._total_bytes += size
+
+        print(
+            f"[Block Cache] 已加载 {len(self._blocks)} 个缓存块, "
+            f"{self._total_bytes / 1024 / 1024:.1f}MB / {self.max_bytes / 1024 / 1024:.0f}MB"
+        )
+        with self._lock:
+            self._evict()
+
+    def get_meta(self, key: str) -> Optional[dict]:
+        """获取媒体元信息（总大小、内容类型）"""
+        with self._lock:
+            return self._metas.get(key)
+
+    def set_meta(self, key: str, total: int, content_type: str) -> dict:
+        """保存媒体元信息"""
+        meta = {
+            "total": total,
+            "contentType": content_type,
+            "blockSize": self.block_size,
+        }
+        os.makedirs(self._key_dir(key), exist_ok=True)
+        tmp_path = os.path.join(self._key_dir(key), f"meta.json.{threading.get_ident()}")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(self._key_dir(key), "meta.json"))
+        with self._lock:
+            self._metas[key] = meta
+        return meta
+
+    def has_block(self, key: str, index: int) -> bool:
+        with self._lock:
+            return (key, index) in self._blocks
+
+    def get_block(self, key: str, index: int) -> Optional[bytes]:
+        """读取缓存块，命中时更新 LRU 顺序"""
+        with self._lock:
+            if (key, index) not in self._blocks:
+                return None
+            self._blocks.move_to_end((key, index))
+
+        path = self._block_path(key, index)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+            return data
+        except OSError:
+            with self._lock:
+                self._forget_block(key, index)
+            return None
+
+    def put_block(self, key: str, index: int, data: bytes):
+        """写入缓存块（先写临时文件再原子替换），超出预算时淘汰最久未用的块"""
+        if len(data) > self.max_bytes:
+            return
+
+        os.makedirs(self._key_dir(key), exist_ok=True)
+        path = self._block_path(key, index)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[Block Cache] 写入缓存块失败: {e}")
+            return
+
+        with self._lock:
+            old_size = self._blocks.pop((key, index), None)
+            if old_size is not None:
+                self._total_bytes -= old_size
+            else:
+                self._key_blocks[key] += 1
+            self._blocks[(key, index)] = len(data)
+            self._total_bytes += len(data)
+            self._evict()
+
+    def _forget_block(self, key: str, index: int):
+        """从索引中移除块，媒体的最后一个块被移除时一并删除元信息与目录（需持有锁）"""
+        size = self._blocks.pop((key, index), None)
+        if size is None:
+            return
+        self._total_bytes -= size
+        self._key_blocks[key] -= 1
+        if self._key_blocks[key] <= 0:
+            del self._key_blocks[key]
+            self._metas.pop(key, None)
+            self._remove_key_files(key)
+
+    def _remove_key_files(self, key: str):
+        """删除媒体的元信息与（已空的）目录"""
+        key_dir = self._key_dir(key)
+        try:
+            os.remove(os.path.join(key_dir, "meta.json"))
+        except OSError:
+            pass
+        try:
+            os.rmdir(key_dir)
+        except OSError:
+            # 目录中仍有其他文件（如并发写入的临时文件）
+            pass
+
+    def _evict(self):
+        """淘汰最久未使用的块直到满足预算（需持有锁）"""
+        while self._total_bytes > self.max_bytes and self._blocks:
+            key, index = next(iter(self._blocks))
+            try:
+                os.remove(self._block_path(key, index))
+            except OSError:
+                pass
+            self._forget_block(key, index)
+
+    def stats(self) -> dict:
+        """缓存统计"""
+        with self._lock:
+            return {
+                "blocks": len(self._blocks),
+                "bytes": self._total_bytes,
+                "maxBytes": self.max_bytes,
+                "blockSize": self.block_size,
+            }
+
+
+class BlockWriter:
+    """将上游数据流切分为完整的块写入缓存，不完整的块直接丢弃"""
+
+    def __init__(self, cache: BlockCache, key: str, offset: int, total: int):
+        block_size = cache.block_size
+        self.cache = cache
+        self.key = key
+        self.total = total
+        # 起点不在块边界时，丢弃到下一个块边界为止的数据
+        self._skip = (-offset) % block_size
+        self.index = (offset + self._skip) // block_size
+        self.buffer = bytearray()
+
+    @property
+    def pending(self) -> int:
+        """当前块中已缓冲但尚未写入的字节数"""
+        return len(self.buffer)
+
+    def write(self, data: bytes):
+        """
+        缓冲数据并写入已完整的块（阻塞磁盘 IO，在线程池中调用）
+
+        到达资源末尾时立即写入最后一个（不满一块的）块，不依赖后续调用，
+        客户端收完数据随即断开时也不会丢失。
+        """
+        if self._skip:
+            if len(data) <= self._skip:
+                self._skip -= len(data)
+                return
+            data = data[self._skip :]
+            self._skip = 0
+
+        block_size = self.cache.block_size
+        self.buffer += data
+        while len(self.buffer) >= block_size:
+            self.cache.put_block(self.key, self.index, bytes(self.buffer[:block_size]))
+            del self.buffer[:block_size]
+            self.index += 1
+
+        if self.buffer and self.index * block_size + len(self.buffer) == self.total:
+            self.cache.put_block(self.key, self.index, bytes(self.buffer))
+            self.buffer.clear()
+
+
+def _read_and_cache(resp: requests.Response, writer: BlockWriter) -> Iterator[bytes]:
+    """读取上游数据并写入缓存块：读与写在同一个工作线程中执行，不阻塞事件循环"""
+    for data in resp.iter_content(64 * 1024):
+        writer.write(data)
+        yield data
+
+
+async def iter_cached_range(
+    cache: BlockCache,
+    key: str,
+    fetch: Callable[[int, Optional[int]], requests.Response],
+    start: int,
+    end: int,
+    total: int,
+    resp: Optional[requests.Response] = None,
+    tag: str = "Block Cache",
+) -> AsyncIterator[bytes]:
+    """
+    输出 [start, end] 范围的数据：已缓存的块从本地读取，缺失的连续块一次性回源
+
+    Args:
+        cache: 块缓存
+        key: 媒体标识
+        fetch: 回源函数 fetch(start, end)，返回以 stream=True 发起的响应
+        start: 起始字节（包含）
+        end: 结束字节（包含）
+        total: 资源总大小
+        resp: 已发起的上游响应（首次访问时复用，避免重复请求）
+        tag: 日志前缀
+    """
+    block_size = cache.block_size
+    pos = start
+    hits = misses = 0
+
+    try:
+        while pos <= end:
+            index = pos // block_size
+
+            if resp is None:
+                block = await run_in_threadpool(cache.get_block, key, index)
+                if block is not None:
+                    chunk = block[pos - index * block_size : end + 1 - index * block_size]
+                    if not chunk:
+                        break
+                    hits += 1
+                    pos += len(chunk)
+                    yield chunk
+                    continue
+
+                # 合并连续缺失的块为一次回源请求
+                last = end // block_size
+                run_end = index
+                while run_end < last and not cache.has_block(key, run_end + 1):
+                    run_end += 1
+                fetch_end = min((run_end + 1) * block_size, total) - 1
+                resp = await run_in_threadpool(fetch, index * block_size, fetch_end)
+
+            misses += 1
+            offset = response_offset(resp)
+            if offset > pos:
+                raise RuntimeError(f"上游返回的范围起点 {offset} 超过请求位置 {pos}")
+
+            writer = BlockWriter(cache, key, offset, total)
+            progressed = False
+            try:
+                async for data in iterate_in_threadpool(
+                    _read_and_cache(resp, writer)
+                ):
+                    chunk = data[max(pos - offset, 0) : max(end + 1 - offset, 0)]
+                    offset += len(data)
+                    if chunk:
+                        progressed = True
+                        pos += len(chunk)
+                        yield chunk
+                    # 已满足请求且当前块已写完整，停止读取
+                    if pos > end and writer.pending == 0:
+                        break
+            finally:
+                resp.close()
+                resp = None
+
+            if not progressed:
+                raise RuntimeError("上游未返回所需范围的数据")
+    finally:
+        if resp is not None:
+            resp.close()
+        if pos <= end:
+            if is_cancelled():
+                cancel_stats.add("stream")
+            print(f"[{tag}] 传输中断于 {pos}/{end + 1}")
+        else:
+            print(f"[{tag}] 命中 {hits} 块, 回源 {misses} 次")
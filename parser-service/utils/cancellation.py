@@ -0,0 +1,143 @@
+"""
+客户端断开检测与取消
+
+DisconnectMiddleware 在后台监听 http.disconnect：客户端在响应开始前断开时，
+设置当前请求的取消标记并取消路由协程；流式响应传输中断开时同样设置取消标记。
+取消标记保存在 contextvar 中，随 run_in_threadpool / asyncio.to_thread 传递到
+工作线程，下载、FFmpeg、重试与轮询循环通过 check_cancelled() 及时退出并清理
+临时资源。
+"""
+
+import time
+import asyncio
+import threading
+import contextvars
+from collections import Counter
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# 当前请求的取消标记，None 表示不在请求上下文中
+_cancel_event: contextvars.ContextVar = contextvars.ContextVar(
+    "request_cancel_event", default=None
+)
+
+
+class RequestCancelled(Exception):
+    """客户端已断开，放弃后续工作"""
+
+    def __init__(self, stage: str = ""):
+        self.stage = stage
+        super().__init__(f"客户端已断开{f'，取消{stage}' if stage else ''}")
+
+
+class CancelStats:
+    """被取消的工作计数（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # 路由 -> 响应开始前断开的请求数
+        self._requests: Counter = Counter()
+        # 阶段（download / ffmpeg / request / asr / stream）-> 中止次数
+        self._work: Counter = Counter()
+
+    def add_request(self, path: str):
+        with self._lock:
+            self._requests[path] += 1
+
+    def add(self, stage: str):
+        with self._lock:
+            self._work[stage] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"requests": dict(self._requests), "work": dict(self._work)}
+
+
+cancel_stats = CancelStats()
+
+
+def is_cancelled() -> bool:
+    event = _cancel_event.get()
+    return event is not None and event.is_set()
+
+
+def check_cancelled(stage: str = ""):
+    """客户端已断开时抛出 RequestCancelled（并计入取消统计）"""
+    if is_cancelled():
+        cancel_stats.add(stage or "other")
+        raise RequestCancelled(stage)
+
+
+def cancellable_sleep(seconds: float, stage: str = ""):
+    """等待指定时间，客户端断开时立即抛出 RequestCancelled"""
+    event = _cancel_event.get()
+    if event is None:
+        time.sleep(seconds)
+    else:
+        event.wait(seconds)
+    check_cancelled(stage)
+
+
+class DisconnectMiddleware:
+    """
+    监听客户端断开，取消仍在进行的工作
+
+    后台任务持续读取 receive 并转交给应用；收到 http.disconnect 且响应尚未
+    完成时设置取消标记，响应尚未开始时还会取消路由协程。
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        event = threading.Event()
+        token = _cancel_event.set(event)
+        messages: "asyncio.Queue[Message]" = asyncio.Queue()
+        state = {"started": False, "complete": False}
+
+        async def wrapped_receive() -> Message:
+            message = await messages.get()
+            if message["type"] == "http.disconnect":
+                # 之后的 receive 调用同样返回断开消息
+                messages.put_nowait(message)
+            return message
+
+        async def wrapped_send(message: Message):
+            if message["type"] == "http.response.start":
+                state["started"] = True
+            elif message["type"] == "http.response.body" and not message.get(
+                "more_body", False
+            ):
+                state["complete"] = True
+            await send(message)
+
+        app_task = asyncio.ensure_future(self.app(scope, wrapped_receive, wrapped_send))
+
+        async def listen():
+            while True:
+                message = await receive()
+                messages.put_nowait(message)
+                if message["type"] != "http.disconnect":
+                    continue
+                if not state["complete"]:
+                    event.set()
+                if not state["started"]:
+                    cancel_stats.add_request(scope["path"])
+                    print(f"[Disconnect] 客户端已断开，取消请求: {scope['path']}")
+                    app_task.cancel()
+                return
+
+        listener = asyncio.ensure_future(listen())
+        try:
+            await app_task
+        except asyncio.CancelledError:
+            # 由客户端断开引起的取消不再向外传播（无需发送响应）
+            if not (app_task.cancelled() and event.is_set()):
+                raise
+        finally:
+            listener.cancel()
+            _cancel_event.reset(token)
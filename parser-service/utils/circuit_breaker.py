@@ -0,0 +1,228 @@
+"""
+熔断器 - 上游持续失败或变慢时快速失败
+
+状态：
+    closed    正常放行，统计滑动窗口内的失败率与慢调用率
+    open      直接抛出 CircuitOpenError，reset_timeout 后进入 half_open
+    half_open 只放行少量探测请求，成功则恢复 closed，失败则重新 open
+"""
+
+import os
+import time
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+
+# 默认参数（可通过环境变量调整）
+CIRCUIT_WINDOW = float(os.environ.get("CIRCUIT_WINDOW", "60"))
+CIRCUIT_MIN_CALLS = int(os.environ.get("CIRCUIT_MIN_CALLS", "10"))
+CIRCUIT_FAILURE_RATE = float(os.environ.get("CIRCUIT_FAILURE_RATE", "0.5"))
+CIRCUIT_SLOW_CALL_RATE = float(os.environ.get("CIRCUIT_SLOW_CALL_RATE", "0.8"))
+CIRCUIT_RESET_TIMEOUT = float(os.environ.get("CIRCUIT_RESET_TIMEOUT", "30"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开，请求被直接拒绝"""
+
+    def __init__(self, name: str, retry_after: float):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(f"{name} 暂时不可用（熔断中），请 {retry_after:.0f} 秒后重试")
+
+
+class CircuitBreaker:
+    """
+    Args:
+        name: 名称（平台名或主机名）
+        window: 统计窗口（秒）
+        min_calls: 窗口内调用数达到该值才判断是否熔断
+        failure_rate: 失败率阈值
+        slow_call_seconds: 超过该耗时记为慢调用，None 表示不统计
+        slow_call_rate: 慢调用率阈值
+        reset_timeout: 打开后多久进入半开状态（秒）
+        half_open_calls: 半开状态允许的并发探测数
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: float = CIRCUIT_WINDOW,
+        min_calls: int = CIRCUIT_MIN_CALLS,
+        failure_rate: float = CIRCUIT_FAILURE_RATE,
+        slow_call_seconds: Optional[float] = None,
+        slow_call_rate: float = CIRCUIT_SLOW_CALL_RATE,
+        reset_timeout: float = CIRCUIT_RESET_TIMEOUT,
+        half_open_calls: int = 1,
+    ):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.reset_timeout = reset_timeout
+        self.half_open_calls = half_open_calls
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        # (时间, 是否失败, 是否慢调用)
+        self._calls = deque()
+        self.rejected = 0
+        self.trips = 0
+
+    def _prune(self, now: float):
+        while self._calls and self._calls[0][0] < now - self.window:
+            self._calls.popleft()
+
+    def _update_state(self, now: float):
+        if self._state == OPEN and now - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+            self._probes = 0
+
+    def _trip(self, now: float, reason: str):
+        self._state = OPEN
+        self._opened_at = now
+        self._calls.clear()
+        self.trips += 1
+        print(f"[Circuit] {self.name} 熔断打开: {reason}")
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._update_state(time.monotonic())
+            return self._state
+
+    def before_call(self):
+        """请求前调用，熔断打开（或半开探测名额已满）时抛出 CircuitOpenError"""
+        with self._lock:
+            now = time.monotonic()
+            self._update_state(now)
+            if self._state == CLOSED:
+                return
+            if self._state == HALF_OPEN and self._probes < self.half_open_calls:
+                self._probes += 1
+                return
+            self.rejected += 1
+            retry_after = max(0.0, self.reset_timeout - (now - self._opened_at))
+            raise CircuitOpenError(self.name, retry_after or 1.0)
+
+    def raise_if_open(self):
+        """只检查状态、不占用半开探测名额：熔断打开时抛出 CircuitOpenError"""
+        with self._lock:
+            now = time.monotonic()
+            self._update_state(now)
+            if self._state != OPEN:
+                return
+            self.rejected += 1
+            retry_after = max(0.0, self.reset_timeout - (now - self._opened_at))
+            raise CircuitOpenError(self.name, retry_after or 1.0)
+
+    def cancel(self):
+        """放弃本次调用（如超出请求截止时间）：释放半开探测名额，不计入统计"""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+
+    def record(self, ok: bool, elapsed: float = 0.0):
+        """记录一次调用结果"""
+        slow = self.slow_call_seconds is not None and elapsed >= self.slow_call_seconds
+        with self._lock:
+            now = time.monotonic()
+            if self._state == HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+                if ok and not slow:
+                    self._state = CLOSED
+                    self._calls.clear()
+                    print(f"[Circuit] {self.name} 探测成功，熔断关闭")
+                else:
+                    self._trip(now, "半开探测失败")
+                return
+            if self._state == OPEN:
+                return
+
+            self._calls.append((now, not ok, slow))
+            self._prune(now)
+            total = len(self._calls)
+            if total < self.min_calls:
+                return
+            failures = sum(1 for _, failed, _ in self._calls if failed)
+            slow_calls = sum(1 for _, _, is_slow in self._calls if is_slow)
+            if failures / total >= self.failure_rate:
+                self._trip(now, f"失败率 {failures}/{total}")
+            elif (
+                self.slow_call_seconds is not None
+                and slow_calls / total >= self.slow_call_rate
+            ):
+                self._trip(now, f"慢调用 {slow_calls}/{total}")
+
+    def call(
+        self,
+        fn: Callable,
+        *args,
+        failed: Optional[Callable[[Any], bool]] = None,
+        ignore: Tuple[Type[BaseException], ...] = (),
+        **kwargs,
+    ) -> Any:
+        """
+        在熔断器保护下调用 fn，异常计为失败
+
+        Args:
+            failed: 根据返回值判断是否失败（如解析结果 success=False）
+            ignore: 不计入统计的异常类型（如调用方截止时间耗尽）
+        """
+        self.before_call()
+        started = time.monotonic()
+        try:
+            result = fn(*args, **kwargs)
+        except ignore:
+            self.cancel()
+            raise
+        except Exception:
+            self.record(False, time.monotonic() - started)
+            raise
+        self.record(
+            not (failed is not None and failed(result)), time.monotonic() - started
+        )
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            self._update_state(now)
+            self._prune(now)
+            return {
+                "state": self._state,
+                "calls": len(self._calls),
+                "failures": sum(1 for _, failed, _ in self._calls if failed),
+                "slowCalls": sum(1 for _, _, slow in self._calls if slow),
+                "trips": self.trips,
+                "rejected": self.rejected,
+            }
+
+
+class BreakerRegistry:
+    """按名称（平台 / 主机）懒创建熔断器，参数相同"""
+
+    def __init__(self, **options):
+        self.options = options
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = CircuitBreaker(name, **self.options)
+                self._breakers[name] = breaker
+            return breaker
+
+    def stats(self) -> dict:
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {breaker.name: breaker.stats() for breaker in breakers}
@@ -0,0 +1,138 @@
+"""
+响应压缩中间件 - 按 Accept-Encoding 协商 br / gzip
+
+只压缩一次性返回的完整响应体；流式响应（NDJSON、SSE、音频代理）原样透传，
+避免缓冲导致首字节延迟。SSE 与 NDJSON 按内容类型直接透传，响应头不等待
+第一个事件。brotli 为可选依赖，未安装时只使用 gzip。
+"""
+
+import gzip
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - 可选依赖
+    brotli = None
+
+# 可压缩的内容类型前缀
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "text/",
+)
+# 流式内容类型：不缓冲响应头，也不压缩（避免逐条事件被压缩器积压）
+STREAMING_TYPES = (
+    "text/event-stream",
+    "application/x-ndjson",
+)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    根据 Accept-Encoding 选择压缩算法
+
+    Returns:
+        "br" / "gzip" / None
+    """
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name] = quality
+
+    def allowed(name: str) -> bool:
+        return accepted.get(name, accepted.get("*", 0)) > 0
+
+    if brotli is not None and allowed("br"):
+        return "br"
+    if allowed("gzip"):
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """按指定算法压缩"""
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+class CompressionMiddleware:
+    """
+    Args:
+        app: ASGI 应用
+        minimum_size: 小于该字节数的响应不压缩
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        passthrough = False
+
+        async def send_wrapper(message: Message):
+            nonlocal start_message, passthrough
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                if (
+                    "content-encoding" in headers
+                    or message["status"] == 206
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                    or content_type.startswith(STREAMING_TYPES)
+                ):
+                    passthrough = True
+                    await send(message)
+                else:
+                    # 等到第一个响应体消息再决定是否压缩
+                    start_message = message
+                return
+
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            if start_message is not None:
+                body = message.get("body", b"")
+                more_body = message.get("more_body", False)
+                headers = MutableHeaders(raw=start_message["headers"])
+                if not more_body and len(body) >= self.minimum_size:
+                    body = compress(body, encoding)
+                    headers["Content-Encoding"] = encoding
+                    headers["Content-Length"] = str(len(body))
+                    headers.add_vary_header("Accept-Encoding")
+                    message = {"type": "http.response.body", "body": body}
+                else:
+                    # 流式响应或小响应不压缩
+                    passthrough = True
+                await send(start_message)
+                start_message = None
+
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,184 @@
+"""
+请求截止时间与自适应超时
+
+截止时间：调用方通过请求头 X-Request-Deadline（剩余秒数）传入整体预算，
+保存在 contextvar 中，随 run_in_threadpool / asyncio.to_thread 传递到
+重定向、签名、请求与重试各阶段；预算耗尽时抛出 DeadlineExceeded。
+
+自适应超时：按主机统计最近的响应头到达耗时，样本足够时以
+p99 × ADAPTIVE_TIMEOUT_FACTOR 作为连接超时（不超过调用处的默认值）。
+读取超时不做自适应：同一主机的流式接口几毫秒就返回响应头，非流式的生成
+接口却要数秒，按主机统计的分位数不能代表单个接口的耗时。
+"""
+
+import os
+import time
+import threading
+import contextvars
+import urllib.parse
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Optional, Tuple, Union
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# 请求头中的截止时间（剩余秒数）
+DEADLINE_HEADER = "X-Request-Deadline"
+
+# 自适应超时参数
+ADAPTIVE_TIMEOUT_FACTOR = float(os.environ.get("ADAPTIVE_TIMEOUT_FACTOR", "3"))
+ADAPTIVE_TIMEOUT_MIN = float(os.environ.get("ADAPTIVE_TIMEOUT_MIN", "3"))
+ADAPTIVE_TIMEOUT_SAMPLES = int(os.environ.get("ADAPTIVE_TIMEOUT_SAMPLES", "20"))
+# 每个主机保留的最近样本数
+LATENCY_WINDOW = 200
+
+# 截止时间（time.monotonic() 的绝对值），None 表示不限制
+_deadline: contextvars.ContextVar = contextvars.ContextVar(
+    "request_deadline", default=None
+)
+
+
+class DeadlineExceeded(Exception):
+    """请求超出截止时间"""
+
+    def __init__(self, stage: str = ""):
+        self.stage = stage
+        super().__init__(f"请求超出截止时间{f'（{stage}）' if stage else ''}")
+
+
+def parse_deadline(value: Optional[str]) -> Optional[float]:
+    """解析截止时间请求头（剩余秒数），无效值返回 None"""
+    try:
+        seconds = float(value) if value else None
+    except ValueError:
+        return None
+    return seconds if seconds is not None and seconds > 0 else None
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]):
+    """在当前上下文设置截止时间（已有更早的截止时间时保留较早者）"""
+    deadline = _deadline.get()
+    if seconds is not None:
+        new_deadline = time.monotonic() + seconds
+        deadline = new_deadline if deadline is None else min(deadline, new_deadline)
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+class DeadlineMiddleware:
+    """
+    从请求头读取截止时间，在其范围内处理请求
+
+    Args:
+        app: ASGI 应用
+        default_seconds: 请求未携带截止时间时使用的默认预算，None 表示不限制
+    """
+
+    def __init__(self, app: ASGIApp, default_seconds: Optional[float] = None):
+        self.app = app
+        self.default_seconds = default_seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        seconds = parse_deadline(Headers(scope=scope).get(DEADLINE_HEADER))
+        with deadline_scope(seconds if seconds is not None else self.default_seconds):
+            await self.app(scope, receive, send)
+
+
+def remaining() -> Optional[float]:
+    """剩余预算（秒），未设置截止时间返回 None"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def deadline_expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def check_deadline(stage: str = ""):
+    """预算耗尽时抛出 DeadlineExceeded"""
+    if deadline_expired():
+        raise DeadlineExceeded(stage)
+
+
+class HostLatency:
+    """每个主机最近的响应耗时（线程安全）"""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def record(self, url: str, seconds: float):
+        host = urllib.parse.urlsplit(url).netloc.lower()
+        with self._lock:
+            samples = self._samples.get(host)
+            if samples is None:
+                samples = self._samples[host] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def percentile(self, url: str, p: float) -> Optional[float]:
+        """主机耗时的 p 分位数，样本不足 ADAPTIVE_TIMEOUT_SAMPLES 时返回 None"""
+        host = urllib.parse.urlsplit(url).netloc.lower()
+        with self._lock:
+            samples = sorted(self._samples.get(host) or ())
+        if len(samples) < ADAPTIVE_TIMEOUT_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+    def stats(self) -> dict:
+        with self._lock:
+            hosts = {host: sorted(samples) for host, samples in self._samples.items()}
+        return {
+            host: {
+                "samples": len(samples),
+                "p50": round(samples[len(samples) // 2], 3),
+                "p99": round(
+                    samples[min(len(samples) - 1, int(len(samples) * 0.99))], 3
+                ),
+            }
+            for host, samples in hosts.items()
+            if samples
+        }
+
+
+host_latency = HostLatency()
+
+
+def record_response(response, *args, **kwargs):
+    """requests 的 response 钩子：记录响应头到达耗时"""
+    host_latency.record(response.url, response.elapsed.total_seconds())
+
+
+# 直接使用 requests.get 时传入 hooks=LATENCY_HOOKS 以记录耗时
+LATENCY_HOOKS = {"response": [record_response]}
+
+
+def effective_timeout(
+    url: str, timeout: float, stage: str = ""
+) -> Union[float, Tuple[float, float]]:
+    """
+    计算本次请求的超时（可直接传给 requests 的 timeout 参数）
+
+    读取超时取调用处默认值与剩余预算的较小者；主机样本足够时另以自适应
+    超时作为连接超时，返回 (连接超时, 读取超时)。预算已耗尽时抛出
+    DeadlineExceeded。
+    """
+    left = remaining()
+    if left is not None:
+        if left <= 0:
+            raise DeadlineExceeded(stage)
+        timeout = min(timeout, left)
+    p99 = host_latency.percentile(url, 0.99)
+    if p99 is None:
+        return timeout
+    adaptive = max(ADAPTIVE_TIMEOUT_MIN, p99 * ADAPTIVE_TIMEOUT_FACTOR)
+    return min(timeout, adaptive), timeout
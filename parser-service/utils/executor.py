@@ -0,0 +1,193 @@
+"""
+有界执行器 - 阻塞的解析 / 提取工作使用专用线程池，按平台限制并发
+
+每个键（平台或工作类型）有独立的并发上限，线程池大小为各上限之和，
+某个平台的突发请求只会在自己的队列中排队，不会占满其他平台的线程。
+同一队列中交互式请求排在后台请求之前（见 priority.py）。排队数、运行数与
+排队等待时间可通过 stats() 查看；load() 按键与优先级给出准入控制使用的负载。
+"""
+
+import time
+import asyncio
+import itertools
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, Iterator, Optional, Tuple, TypeVar
+
+from .admission import current_request
+from .deadline import DeadlineExceeded, remaining
+from .priority import INTERACTIVE, PrioritySemaphore, current_priority, priority_stats
+
+T = TypeVar("T")
+
+# 每个键保留的最近等待时间样本数
+WAIT_WINDOW = 200
+
+_EXHAUSTED = object()
+
+
+class _KeyStats:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.max_wait = 0.0
+        self.waits = deque(maxlen=WAIT_WINDOW)
+
+
+class BoundedExecutor:
+    """
+    Args:
+        limits: 键 -> 并发上限
+        name: 线程名前缀
+    """
+
+    def __init__(self, limits: Dict[str, int], name: str = "worker"):
+        self.limits = {key: max(1, limit) for key, limit in limits.items()}
+        self._pool = ThreadPoolExecutor(
+            max_workers=sum(self.limits.values()), thread_name_prefix=name
+        )
+        self._semaphores = {
+            key: PrioritySemaphore(limit) for key, limit in self.limits.items()
+        }
+        self._stats = {key: _KeyStats(limit) for key, limit in self.limits.items()}
+        self._lock = threading.Lock()
+        # 排队中的工作 -> (键, 优先级, 所属请求, 入队时间)
+        self._queued_at: Dict[int, Tuple[str, str, object, float]] = {}
+        self._ticket = itertools.count()
+
+    @asynccontextmanager
+    async def slot(self, key: str):
+        """
+        占用 key 的一个并发名额（排队等待直到有空闲名额）
+
+        Raises:
+            DeadlineExceeded: 排队期间请求截止时间耗尽
+        """
+        semaphore = self._semaphores[key]
+        stats = self._stats[key]
+        queued_at = time.monotonic()
+        ticket = next(self._ticket)
+        # 批量请求的多项工作同属一个请求，不在请求上下文中时单独计数
+        request = current_request()
+        if request is None:
+            request = ("ticket", ticket)
+        with self._lock:
+            stats.queued += 1
+            self._queued_at[ticket] = (key, current_priority(), request, queued_at)
+        try:
+            left = remaining()
+            try:
+                await asyncio.wait_for(semaphore.acquire(), left)
+            except asyncio.TimeoutError:
+                with self._lock:
+                    stats.rejected += 1
+                raise DeadlineExceeded("queue") from None
+        finally:
+            with self._lock:
+                stats.queued -= 1
+                del self._queued_at[ticket]
+
+        wait = time.monotonic() - queued_at
+        priority_stats.record_wait(current_priority(), wait)
+        with self._lock:
+            stats.running += 1
+            stats.waits.append(wait)
+            stats.max_wait = max(stats.max_wait, wait)
+        try:
+            yield
+        finally:
+            with self._lock:
+                stats.running -= 1
+                stats.completed += 1
+            semaphore.release()
+
+    async def call(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        """
+        在线程池中执行 fn（不占用名额，应在 slot() 内调用）
+
+        上下文变量（截止时间、取消标记）会传递到工作线程。协程被取消时，
+        尚未开始的工作直接丢弃；已在运行的工作无法中断，等待其结束后再
+        释放名额，保证线程数不超过上限。
+        """
+        future = self._pool.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            if not future.done():
+                await asyncio.wait([asyncio.wrap_future(future)])
+            raise
+
+    async def run(self, key: str, fn: Callable[..., T], *args, **kwargs) -> T:
+        """占用 key 的名额并在线程池中执行 fn"""
+        async with self.slot(key):
+            return await self.call(fn, *args, **kwargs)
+
+    async def iterate(self, key: str, iterator: Iterator[T]) -> AsyncIterator[T]:
+        """
+        在线程池中逐项迭代同步迭代器
+
+        每取一项占用一次 key 的名额，输出期间不占用：消费较慢的客户端（如逐行
+        读取 NDJSON）不会占着名额，也不会计入排队负载。
+        """
+        try:
+            while True:
+                async with self.slot(key):
+                    item = await self.call(next, iterator, _EXHAUSTED)
+                if item is _EXHAUSTED:
+                    break
+                yield item
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    def load(
+        self, key: Optional[str] = None, priority: Optional[str] = None
+    ) -> Tuple[int, float]:
+        """
+        当前负载：(排队中的请求数, 排队最久的请求已等待的秒数)
+
+        按请求计数（批量请求的多项工作计为一个请求）。key 为 None 时统计全部
+        键；priority 为交互式时只统计交互式请求 —— 后台请求排在其后，不影响
+        交互式请求的等待时间。
+        """
+        with self._lock:
+            entries = [
+                entry
+                for entry in self._queued_at.values()
+                if (key is None or entry[0] == key)
+                and (priority != INTERACTIVE or entry[1] == INTERACTIVE)
+            ]
+        if not entries:
+            return 0, 0.0
+        requests = {entry[2] for entry in entries}
+        oldest = min(entry[3] for entry in entries)
+        return len(requests), time.monotonic() - oldest
+
+    def stats(self) -> dict:
+        with self._lock:
+            result = {}
+            for key, stats in self._stats.items():
+                waits = sorted(stats.waits)
+                result[key] = {
+                    "limit": stats.limit,
+                    "running": stats.running,
+                    "queued": stats.queued,
+                    "queuedByPriority": self._semaphores[key].waiting(),
+                    "completed": stats.completed,
+                    "rejected": stats.rejected,
+                    "waitAvg": round(sum(waits) / len(waits), 3) if waits else 0.0,
+                    "waitP95": (
+                        round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3)
+                        if waits
+                        else 0.0
+                    ),
+                    "waitMax": round(stats.max_wait, 3),
+                }
+            return result
@@ -0,0 +1,99 @@
+"""
+快速 JSON 序列化 - 优先使用 orjson，未安装时回退到标准库 json
+"""
+
+import json
+import asyncio
+import functools
+from typing import Any, Callable
+
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+from starlette.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 可选依赖
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    """处理 JSON 原生不支持的类型"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if isinstance(obj, bytes):
+        return obj.decode("utf-8", errors="replace")
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    """序列化为 UTF-8 JSON 字节（不转义中文、无多余空白）"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        obj, default=_default, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def loads(data: Any) -> Any:
+    """解析 JSON（bytes 或 str）"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def ndjson_line(obj: Any) -> bytes:
+    """序列化为一行 NDJSON"""
+    return dumps(obj) + b"\n"
+
+
+class FastJSONResponse(JSONResponse):
+    """使用 dumps 编码的 JSONResponse"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def _to_response(value: Any, injected: dict) -> Any:
+    if isinstance(value, Response):
+        return value
+    response = FastJSONResponse(value)
+    # 合并 endpoint 通过注入的 Response 参数设置的状态码与响应头
+    for arg in injected.values():
+        if isinstance(arg, Response) and not isinstance(arg, JSONResponse):
+            if arg.status_code:
+                response.status_code = arg.status_code
+            for key, header in arg.headers.items():
+                if key not in ("content-length", "content-type"):
+                    response.headers[key] = header
+    return response
+
+
+def _wrap_endpoint(endpoint: Callable) -> Callable:
+    if asyncio.iscoroutinefunction(endpoint):
+
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            return _to_response(await endpoint(*args, **kwargs), kwargs)
+
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def sync_wrapper(*args, **kwargs):
+        return _to_response(endpoint(*args, **kwargs), kwargs)
+
+    return sync_wrapper
+
+
+class FastJSONRoute(APIRoute):
+    """
+    endpoint 返回 dict / list / BaseModel 时直接编码为 FastJSONResponse
+
+    跳过 FastAPI 默认的 jsonable_encoder 递归转换与 response_model 二次校验，
+    response_model 仍用于生成接口文档。
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, _wrap_endpoint(endpoint), **kwargs)
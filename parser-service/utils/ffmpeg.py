@@ -0,0 +1,208 @@
+"""
+FFmpeg 工具 - 查找 FFmpeg、运行提取命令以及流式转封装
+"""
+
+import os
+import re
+import sys
+import time
+import shutil
+import asyncio
+import subprocess
+from typing import AsyncIterator, List, Optional
+
+from .cancellation import cancel_stats, check_cancelled, is_cancelled
+from .deadline import check_deadline
+
+# B站 DASH 音频流 ID：30250 杜比全景声 (E-AC3)，30251 Hi-Res 无损 (FLAC)，其余为 AAC
+BILIBILI_AUDIO_CODECS = {30250: "eac3", 30251: "flac"}
+
+
+def find_ffmpeg() -> Optional[str]:
+    """查找 FFmpeg - 优先使用打包目录中的 FFmpeg"""
+    # 1. 检查打包环境 (PyInstaller)
+    if getattr(sys, "frozen", False):
+        # 打包环境: FFmpeg 在 _internal 目录
+        bundled_ffmpeg = os.path.join(sys._MEIPASS, "ffmpeg.exe")
+        if os.path.exists(bundled_ffmpeg):
+            print(f"[FFmpeg] 使用打包的 FFmpeg: {bundled_ffmpeg}")
+            return bundled_ffmpeg
+
+    # 2. 检查开发环境 (parser-service 目录)
+    local_ffmpeg = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ffmpeg.exe"
+    )
+    if os.path.exists(local_ffmpeg):
+        print(f"[FFmpeg] 使用本地 FFmpeg: {local_ffmpeg}")
+        return local_ffmpeg
+
+    # 3. 检查系统 PATH
+    ffmpeg_path = shutil.which("ffmpeg")
+    if ffmpeg_path:
+        print(f"[FFmpeg] 使用系统 FFmpeg: {ffmpeg_path}")
+    return ffmpeg_path
+
+
+def detect_audio_codec(url: str, codecs: Optional[str] = None) -> str:
+    """
+    判断音频编码
+
+    Args:
+        url: 音频 URL（B站 DASH 音频文件名中带有音频流 ID，如 xxx-1-30251.m4s）
+        codecs: 解析结果中的 codecs 字段（如 mp4a.40.2 / ec-3 / fLaC）
+
+    Returns:
+        aac / eac3 / flac
+    """
+    if codecs:
+        codecs = codecs.lower()
+        if codecs.startswith(("ec-3", "eac3", "ac-3")):
+            return "eac3"
+        if codecs.startswith("flac"):
+            return "flac"
+        return "aac"
+
+    match = re.search(r"-(\d{5})\.m4s", url)
+    if match:
+        return BILIBILI_AUDIO_CODECS.get(int(match.group(1)), "aac")
+    return "aac"
+
+
+def remux_command(ffmpeg_path: str, codec: str) -> List[str]:
+    """
+    生成将标准输入的音频转为可边下边播的 ADTS 流的命令
+
+    AAC 直接 -c copy 转封装，FLAC / E-AC3 无法放入 ADTS，转码为 AAC。
+    """
+    if codec == "aac":
+        codec_args = ["-c:a", "copy"]
+    else:
+        codec_args = ["-c:a", "aac", "-b:a", "192k", "-ac", "2"]
+
+    return [
+        ffmpeg_path,
+        "-loglevel",
+        "error",
+        "-i",
+        "pipe:0",
+        "-vn",
+        *codec_args,
+        "-flush_packets",
+        "1",
+        "-f",
+        "adts",
+        "pipe:1",
+    ]
+
+
+def run_ffmpeg(
+    cmd: List[str], timeout: Optional[float] = None, poll_interval: float = 0.25
+) -> subprocess.CompletedProcess:
+    """
+    运行 FFmpeg 并等待结束（同步，在线程池中调用）
+
+    与 subprocess.run 不同，等待期间定期检查客户端是否已断开以及请求截止
+    时间，满足任一条件时立即终止 FFmpeg。
+
+    Raises:
+        RequestCancelled: 客户端已断开
+        DeadlineExceeded: 请求截止时间已耗尽
+        subprocess.TimeoutExpired: 超过 timeout
+    """
+    proc = subprocess.Popen(
+        cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+    started = time.monotonic()
+    try:
+        while True:
+            try:
+                stdout, stderr = proc.communicate(timeout=poll_interval)
+                return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
+            except subprocess.TimeoutExpired:
+                pass
+            check_cancelled("ffmpeg")
+            check_deadline("ffmpeg")
+            if timeout is not None and time.monotonic() - started >= timeout:
+                raise subprocess.TimeoutExpired(cmd, timeout)
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.communicate()
+
+
+def _kill(proc: asyncio.subprocess.Process):
+    if proc.returncode is None:
+        try:
+            proc.kill()
+        except ProcessLookupError:
+            # 已退出但尚未回收
+            pass
+
+
+async def iter_ffmpeg(
+    cmd: List[str],
+    source: AsyncIterator[bytes],
+    chunk_size: int = 64 * 1024,
+    tag: str = "FFmpeg",
+) -> AsyncIterator[bytes]:
+    """
+    将 source 的数据送入 FFmpeg 标准输入，并异步输出其标准输出
+
+    使用异步管道，转封装期间不占用线程池线程。客户端断开时终止 FFmpeg 并
+    关闭 source（进而关闭上游连接）；source 出错（上游 HTTP 错误、熔断、
+    截止时间等）时同样终止 FFmpeg，并在输出结束后重新抛出该异常，避免把
+    被截断的流当作成功响应返回。
+    """
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    errors: List[BaseException] = []
+
+    async def pump():
+        try:
+            async for chunk in source:
+                try:
+                    proc.stdin.write(chunk)
+                    await proc.stdin.drain()
+                except OSError:
+                    # FFmpeg 已退出（BrokenPipe）
+                    break
+        except Exception as e:
+            # 上游出错：终止 FFmpeg，由读取循环重新抛出
+            errors.append(e)
+            _kill(proc)
+        finally:
+            try:
+                proc.stdin.close()
+            except OSError:
+                pass
+            await source.aclose()
+
+    pump_task = asyncio.create_task(pump())
+    finished = False
+    try:
+        while True:
+            data = await proc.stdout.read(chunk_size)
+            if not data:
+                break
+            yield data
+        await pump_task
+        if errors:
+            print(f"[{tag}] 上游出错，终止 FFmpeg: {errors[0]}")
+            raise errors[0]
+        finished = True
+    finally:
+        if not finished:
+            _kill(proc)
+            if not errors:
+                if is_cancelled():
+                    cancel_stats.add("ffmpeg")
+                print(f"[{tag}] 客户端已断开，终止 FFmpeg")
+        # pump 被取消后自行关闭 source
+        pump_task.cancel()
+        await proc.wait()
+        if finished and proc.returncode:
+            print(f"[{tag}] FFmpeg 退出码: {proc.returncode}")
@@ -1,10 +1,36 @@
 """
 HTTP 客户端工具 - 带重试机制
+
+重试策略：指数退避 + 随机抖动，429/502/503/504 按状态码重试并遵循
+Retry-After；每个主机的重试次数受令牌桶预算限制，上游整体故障时
+不会因重试而成倍放大请求量。每个主机另有熔断器，连接错误与 5xx 比例
+过高时直接抛出 CircuitOpenError。
 """
 
+import os
 import time
+import random
+import asyncio
+import threading
+import urllib.parse
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from http.cookiejar import DefaultCookiePolicy
+from typing import Optional, Dict, Any, FrozenSet, Tuple
+
 import requests
-from typing import Optional, Dict, Any, Tuple
+from requests.adapters import HTTPAdapter
+
+from .rate_limit import TokenBucket
+from .circuit_breaker import BreakerRegistry, CircuitOpenError
+from .cancellation import RequestCancelled, cancellable_sleep, check_cancelled
+from .deadline import (
+    DeadlineExceeded,
+    deadline_expired,
+    effective_timeout,
+    record_response,
+    remaining,
+)
 
 # 可重试的异常类型
 RETRYABLE_EXCEPTIONS = (
@@ -14,6 +40,216 @@ RETRYABLE_EXCEPTIONS = (
     requests.exceptions.ChunkedEncodingError,
 )
 
+# 请求已发出、上游可能已在处理时的异常：非幂等请求（如 POST 生成）不重试，
+# 避免重复执行
+AFTER_SEND_EXCEPTIONS = (
+    requests.exceptions.ReadTimeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+# 可以安全重发的请求方法
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+# 调用方不应吞掉的异常：熔断、截止时间耗尽、客户端断开
+CONTROL_EXCEPTIONS = (CircuitOpenError, DeadlineExceeded, RequestCancelled)
+
+# 每个主机的重试预算：每秒补充的重试次数与允许的突发量
+HTTP_RETRY_BUDGET_RATE = float(os.environ.get("HTTP_RETRY_BUDGET_RATE", "1"))
+HTTP_RETRY_BUDGET_BURST = float(os.environ.get("HTTP_RETRY_BUDGET_BURST", "10"))
+
+# 主机熔断的慢调用阈值（秒，为空时只按失败率熔断；AI 接口响应本身较慢）
+HTTP_BREAKER_SLOW_SECONDS = os.environ.get("HTTP_BREAKER_SLOW_SECONDS", "")
+
+# 每个上游主机的熔断器
+host_breakers = BreakerRegistry(
+    slow_call_seconds=(
+        float(HTTP_BREAKER_SLOW_SECONDS) if HTTP_BREAKER_SLOW_SECONDS else None
+    )
+)
+
+# 每个主机保持的最大连接数
+HTTP_POOL_MAXSIZE = int(os.environ.get("HTTP_POOL_MAXSIZE", "32"))
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """
+    获取共享连接池的 Session
+
+    复用 TCP/TLS 连接；Cookie 策略拒绝保存任何 Cookie，避免不同调用方
+    （如不同账号的B站 Cookie）通过共享 Session 串用。响应的 Set-Cookie
+    仍可通过 response.cookies 读取。
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+                # 记录各主机响应耗时，用于自适应超时
+                session.hooks["response"].append(record_response)
+                adapter = HTTPAdapter(
+                    pool_connections=HTTP_POOL_MAXSIZE, pool_maxsize=HTTP_POOL_MAXSIZE
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    重试策略
+
+    Args:
+        retries: 最大尝试次数（含首次请求）
+        backoff_base: 首次重试的退避上限（秒），之后每次翻倍
+        backoff_max: 单次退避上限（秒）
+        retry_statuses: 需要重试的 HTTP 状态码
+        max_retry_after: 可接受的 Retry-After 上限（秒），超过时不再重试
+    """
+
+    retries: int = 3
+    backoff_base: float = 1.0
+    backoff_max: float = 10.0
+    retry_statuses: FrozenSet[int] = frozenset({429, 502, 503, 504})
+    max_retry_after: float = 30.0
+
+    def backoff(self, attempt: int) -> float:
+        """第 attempt 次重试前的等待时间（full jitter）"""
+        ceiling = min(self.backoff_max, self.backoff_base * (2**attempt))
+        return random.uniform(0, ceiling)
+
+
+_budgets: Dict[str, TokenBucket] = {}
+_budgets_lock = threading.Lock()
+
+
+def _retry_budget(url: str) -> Optional[TokenBucket]:
+    if HTTP_RETRY_BUDGET_RATE <= 0:
+        return None
+    host = urllib.parse.urlsplit(url).netloc.lower()
+    with _budgets_lock:
+        bucket = _budgets.get(host)
+        if bucket is None:
+            bucket = TokenBucket(HTTP_RETRY_BUDGET_RATE, HTTP_RETRY_BUDGET_BURST)
+            _budgets[host] = bucket
+        return bucket
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After（秒数或 HTTP 日期），返回需要等待的秒数"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _attempt(
+    session: requests.Session, method: str, url: str, **kwargs
+) -> Tuple[bool, Any]:
+    """
+    执行一次请求（受主机熔断器保护）
+
+    Returns:
+        (success, result): 成功时 result 为 Response；可重试的异常返回
+        (False, 异常)；不可重试的异常返回 (False, 错误信息字符串)
+
+    Raises:
+        CircuitOpenError: 该主机熔断中
+        DeadlineExceeded: 请求截止时间已耗尽
+        RequestCancelled: 客户端已断开
+    """
+    check_cancelled("request")
+    if isinstance(kwargs.get("timeout"), (int, float)):
+        kwargs["timeout"] = effective_timeout(url, kwargs["timeout"], "request")
+    breaker = host_breakers.get(urllib.parse.urlsplit(url).netloc.lower())
+    breaker.before_call()
+    started = time.monotonic()
+    try:
+        response = session.request(method=method, url=url, **kwargs)
+    except RETRYABLE_EXCEPTIONS as e:
+        if deadline_expired():
+            # 超时由截止时间引起，不计入主机熔断统计
+            breaker.cancel()
+            raise DeadlineExceeded("request") from e
+        breaker.record(False, time.monotonic() - started)
+        return False, e
+    except Exception as e:
+        breaker.record(True, time.monotonic() - started)
+        return False, str(e)
+    breaker.record(response.status_code < 500, time.monotonic() - started)
+    return True, response
+
+
+def _next_delay(
+    policy: RetryPolicy,
+    attempt: int,
+    method: str,
+    url: str,
+    success: bool,
+    result: Any,
+) -> Optional[float]:
+    """
+    判断是否重试并返回等待时间，None 表示不再重试
+
+    非幂等请求在读取超时等请求已发出的失败后不重试。重试前先从主机的
+    重试预算中扣除一次，预算耗尽时放弃重试。
+    """
+    if attempt >= policy.retries - 1:
+        return None
+
+    if success:
+        if result.status_code not in policy.retry_statuses:
+            return None
+        delay = policy.backoff(attempt)
+        retry_after = parse_retry_after(result.headers.get("Retry-After"))
+        if retry_after is not None:
+            if retry_after > policy.max_retry_after:
+                return None
+            delay = retry_after
+        reason = f"HTTP {result.status_code}"
+    elif isinstance(result, RETRYABLE_EXCEPTIONS):
+        if method not in IDEMPOTENT_METHODS and isinstance(
+            result, AFTER_SEND_EXCEPTIONS
+        ):
+            print(f"[HTTPClient] {method} 请求已发出，{type(result).__name__} 后不重试")
+            return None
+        delay = policy.backoff(attempt)
+        reason = f"{type(result).__name__}: {result}"
+    else:
+        return None
+
+    left = remaining()
+    if left is not None and delay >= left:
+        print(f"[HTTPClient] 剩余预算 {max(left, 0):.2f}s 不足以重试: {reason}")
+        return None
+
+    budget = _retry_budget(url)
+    if budget is not None and not budget.try_acquire():
+        print(f"[HTTPClient] 重试预算已耗尽，放弃重试: {reason}")
+        return None
+
+    print(
+        f"[HTTPClient] Attempt {attempt + 1}/{policy.retries} failed: {reason}，"
+        f"{delay:.2f}s 后重试"
+    )
+    if success:
+        # 释放连接（stream=True 时响应体尚未读取）
+        result.close()
+    return delay
+
+
+def _final(success: bool, result: Any) -> Tuple[bool, Any]:
+    return (True, result) if success else (False, str(result))
+
 
 def request_with_retry(
     method: str,
@@ -24,6 +260,8 @@ def request_with_retry(
     timeout: int = 30,
     retries: int = 3,
     retry_delay: float = 1.0,
+    session: Optional[requests.Session] = None,
+    policy: Optional[RetryPolicy] = None,
     **kwargs,
 ) -> Tuple[bool, Any]:
     """
@@ -36,42 +274,92 @@ def request_with_retry(
         data: 请求体（原始数据）
         json: 请求体（JSON）
         timeout: 超时时间（秒）
-        retries: 最大重试次数
-        retry_delay: 重试间隔（秒）
+        retries: 最大尝试次数（未指定 policy 时使用）
+        retry_delay: 退避基数（秒，未指定 policy 时使用）
+        session: 使用的 Session，默认为共享连接池 get_session()
+        policy: 重试策略，默认 RetryPolicy(retries, retry_delay)
         **kwargs: 其他 requests 参数
 
     Returns:
-        (success, result): success 为 True 时 result 是 Response，False 时是错误信息
+        (success, result): success 为 True 时 result 是 Response（重试用尽时
+        可能是 429/5xx 响应），False 时是错误信息
+
+    Raises:
+        CircuitOpenError: 目标主机熔断中
+        DeadlineExceeded: 请求截止时间已耗尽
     """
-    last_error = None
-
-    for attempt in range(retries):
-        try:
-            response = requests.request(
-                method=method.upper(),
-                url=url,
-                headers=headers,
-                data=data,
-                json=json,
-                timeout=timeout,
-                **kwargs,
-            )
-            return True, response
-
-        except RETRYABLE_EXCEPTIONS as e:
-            last_error = e
-            print(
-                f"[HTTPClient] Attempt {attempt + 1}/{retries} failed: {type(e).__name__}: {e}"
-            )
-            if attempt < retries - 1:
-                time.sleep(retry_delay)
-                continue
-
-        except Exception as e:
-            # 不可重试的错误，直接返回
-            return False, str(e)
-
-    return False, str(last_error)
+    policy = policy or RetryPolicy(retries=retries, backoff_base=retry_delay)
+    session = session or get_session()
+    method = method.upper()
+    kwargs.update(headers=headers, data=data, json=json, timeout=timeout)
+
+    attempt = 0
+    while True:
+        success, result = _attempt(session, method, url, **kwargs)
+        delay = _next_delay(policy, attempt, method, url, success, result)
+        if delay is None:
+            return _final(success, result)
+        cancellable_sleep(delay, "request")
+        attempt += 1
+
+
+async def async_request_with_retry(
+    method: str,
+    url: str,
+    headers: Optional[Dict] = None,
+    data: Any = None,
+    json: Any = None,
+    timeout: int = 30,
+    retries: int = 3,
+    retry_delay: float = 1.0,
+    session: Optional[requests.Session] = None,
+    policy: Optional[RetryPolicy] = None,
+    **kwargs,
+) -> Tuple[bool, Any]:
+    """
+    request_with_retry 的异步版本
+
+    每次请求在线程池中执行，重试间隔使用 asyncio.sleep，不阻塞事件循环。
+    """
+    policy = policy or RetryPolicy(retries=retries, backoff_base=retry_delay)
+    session = session or get_session()
+    method = method.upper()
+    kwargs.update(headers=headers, data=data, json=json, timeout=timeout)
+
+    attempt = 0
+    while True:
+        success, result = await asyncio.to_thread(
+            _attempt, session, method, url, **kwargs
+        )
+        delay = _next_delay(policy, attempt, method, url, success, result)
+        if delay is None:
+            return _final(success, result)
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+def session_get(
+    url: str, session: Optional[requests.Session] = None, **kwargs
+) -> requests.Response:
+    """
+    使用共享 Session 发起单次 GET 请求（不重试）
+
+    与直接调用 requests.get 不同，请求复用连接池、受主机熔断器保护，并记录
+    主机响应耗时（自适应超时）。session 默认为共享 Session，其余参数同
+    requests.get。
+
+    Raises:
+        requests.RequestException: 请求失败
+        CircuitOpenError: 目标主机熔断中
+        DeadlineExceeded: 请求截止时间已耗尽
+        RequestCancelled: 客户端已断开
+    """
+    success, result = _attempt(session or get_session(), "GET", url, **kwargs)
+    if success:
+        return result
+    if isinstance(result, Exception):
+        raise result
+    raise requests.RequestException(result)
 
 
 def post_with_retry(url: str, **kwargs) -> Tuple[bool, Any]:
@@ -82,3 +370,13 @@ def post_with_retry(url: str, **kwargs) -> Tuple[bool, Any]:
 def get_with_retry(url: str, **kwargs) -> Tuple[bool, Any]:
     """带重试的 GET 请求"""
     return request_with_retry("GET", url, **kwargs)
+
+
+async def async_post_with_retry(url: str, **kwargs) -> Tuple[bool, Any]:
+    """带重试的异步 POST 请求"""
+    return await async_request_with_retry("POST", url, **kwargs)
+
+
+async def async_get_with_retry(url: str, **kwargs) -> Tuple[bool, Any]:
+    """带重试的异步 GET 请求"""
+    return await async_request_with_retry("GET", url, **kwargs)
@@ -0,0 +1,93 @@
+"""
+HTTP Range 工具 - 解析/生成 Range 与 Content-Range 头
+"""
+
+import re
+from typing import Optional, Tuple
+
+_RANGE_RE = re.compile(r"^\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*$", re.IGNORECASE)
+_CONTENT_RANGE_RE = re.compile(
+    r"^\s*bytes\s+(\d+)\s*-\s*(\d+)\s*/\s*(\d+|\*)\s*$", re.IGNORECASE
+)
+
+
+class RangeNotSatisfiable(Exception):
+    """请求的范围超出资源大小"""
+
+
+def parse_range_header(
+    value: Optional[str], total: Optional[int] = None
+) -> Optional[Tuple[int, Optional[int]]]:
+    """
+    解析 Range 请求头（仅支持单个范围，多范围时取第一个）
+
+    Args:
+        value: Range 头的值，如 "bytes=0-1023"、"bytes=1024-"、"bytes=-500"
+        total: 资源总大小（未知时为 None）
+
+    Returns:
+        (start, end): end 为包含端点，总大小未知且为开放范围时 end 为 None；
+        无法解析或无法确定起点时返回 None（应按完整内容处理）
+
+    Raises:
+        RangeNotSatisfiable: 起点超出资源总大小
+    """
+    if not value:
+        return None
+
+    match = _RANGE_RE.match(value.split(",")[0])
+    if not match:
+        return None
+
+    start_str, end_str = match.groups()
+
+    if not start_str:
+        # 后缀范围 bytes=-N，需要知道总大小
+        if not end_str or total is None:
+            return None
+        length = int(end_str)
+        if length <= 0:
+            raise RangeNotSatisfiable(value)
+        return max(total - length, 0), total - 1
+
+    start = int(start_str)
+    end = int(end_str) if end_str else None
+
+    if end is not None and end < start:
+        return None
+
+    if total is not None:
+        if start >= total:
+            raise RangeNotSatisfiable(value)
+        end = total - 1 if end is None else min(end, total - 1)
+
+    return start, end
+
+
+def is_suffix_range(value: Optional[str]) -> bool:
+    """是否为后缀范围 bytes=-N（读取末尾 N 字节，需要总大小才能确定起点）"""
+    match = _RANGE_RE.match((value or "").split(",")[0])
+    return bool(match and not match.group(1) and match.group(2))
+
+
+def parse_content_range(
+    value: Optional[str],
+) -> Optional[Tuple[int, int, Optional[int]]]:
+    """
+    解析 Content-Range 响应头
+
+    Returns:
+        (start, end, total): total 未知时为 None；无法解析时返回 None
+    """
+    if not value:
+        return None
+    match = _CONTENT_RANGE_RE.match(value)
+    if not match:
+        return None
+    start, end, total = match.groups()
+    return int(start), int(end), None if total == "*" else int(total)
+
+
+def format_content_range(start: int, end: int, total: Optional[int] = None) -> str:
+    """生成 Content-Range 响应头"""
+    return f"bytes {start}-{end}/{total if total is not None else '*'}"
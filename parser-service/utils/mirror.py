@@ -0,0 +1,255 @@
+"""
+CDN 镜像选择 - 按主机延迟排序 url / backupUrls，首字节过慢时对冲请求备用地址
+
+延迟统计为每个 CDN 主机的响应头到达时间（EWMA），请求失败按惩罚值计入。
+"""
+
+import os
+import time
+import queue
+import asyncio
+import threading
+import contextvars
+import urllib.parse
+from typing import Dict, Iterable, List, Optional
+
+import requests
+
+from .http_client import get_session, session_get
+from .cancellation import RequestCancelled, check_cancelled
+from .deadline import DeadlineExceeded, deadline_expired
+
+# 首个请求超过该时间（秒）仍未返回响应头时，对冲请求下一个镜像
+MIRROR_HEDGE_DELAY = float(os.environ.get("MIRROR_HEDGE_DELAY", "1.0"))
+# 对冲等待的下限（秒）：已知主机按 2 倍 EWMA 等待，但不少于该值
+MIRROR_HEDGE_MIN = float(os.environ.get("MIRROR_HEDGE_MIN", "0.2"))
+# EWMA 平滑系数
+MIRROR_EWMA_ALPHA = float(os.environ.get("MIRROR_EWMA_ALPHA", "0.3"))
+# 请求失败计入的延迟（秒）
+MIRROR_FAILURE_PENALTY = 10.0
+# 等待镜像响应时检查客户端断开的间隔（秒）
+MIRROR_POLL_INTERVAL = 0.25
+
+
+def mirror_host(url: str) -> str:
+    return urllib.parse.urlsplit(url).netloc.lower()
+
+
+class MirrorStats:
+    """每个 CDN 主机的响应延迟 EWMA（线程安全）"""
+
+    def __init__(self, alpha: float = MIRROR_EWMA_ALPHA):
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        # 主机 -> (EWMA 秒数, 样本数)
+        self._hosts: Dict[str, tuple] = {}
+
+    def record(self, url: str, seconds: float):
+        host = mirror_host(url)
+        with self._lock:
+            ewma, samples = self._hosts.get(host, (seconds, 0))
+            self._hosts[host] = (ewma + self.alpha * (seconds - ewma), samples + 1)
+
+    def record_failure(self, url: str):
+        self.record(url, MIRROR_FAILURE_PENALTY)
+
+    def estimate(self, url: str) -> Optional[float]:
+        """主机的 EWMA 延迟，未观测过返回 None"""
+        with self._lock:
+            entry = self._hosts.get(mirror_host(url))
+        return entry[0] if entry else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                host: {"ewma": round(ewma, 3), "samples": samples}
+                for host, (ewma, samples) in self._hosts.items()
+            }
+
+
+mirror_stats = MirrorStats()
+
+
+def rank_urls(urls: Iterable[str]) -> List[str]:
+    """
+    去重并按主机延迟从快到慢排序
+
+    未观测过的主机按 MIRROR_HEDGE_DELAY 估计（排在明显较慢的主机之前），
+    估计相同时保持原顺序。
+    """
+    unique = list(dict.fromkeys(url for url in urls if url))
+
+    def key(url: str) -> float:
+        estimate = mirror_stats.estimate(url)
+        return MIRROR_HEDGE_DELAY if estimate is None else estimate
+
+    return sorted(unique, key=key)
+
+
+def _order_stream(stream: dict, replaced: Dict[str, str]):
+    url = stream.get("url")
+    backups = stream.get("backupUrls") or []
+    if not url or not backups:
+        return
+    # 抖音的 backupUrls 包含主地址，B站/小红书不包含，保持各自的约定
+    inclusive = url in backups
+    ranked = rank_urls([url, *backups])
+    stream["url"] = ranked[0]
+    stream["backupUrls"] = ranked if inclusive else ranked[1:]
+    if ranked[0] != url:
+        replaced[url] = ranked[0]
+
+
+def order_mirrors(info: dict) -> dict:
+    """按观测延迟重排解析结果中视频流/音频流的 url 与 backupUrls（原地修改）"""
+    replaced: Dict[str, str] = {}
+    for stream in info.get("videoStreams") or []:
+        _order_stream(stream, replaced)
+    if info.get("audioStream"):
+        _order_stream(info["audioStream"], replaced)
+    for key in ("videoUrl", "audioUrl"):
+        if info.get(key) in replaced:
+            info[key] = replaced[info[key]]
+    return info
+
+
+def _usable(response: requests.Response) -> bool:
+    return response.status_code < 400 or response.status_code == 416
+
+
+def _hedge_delay(url: str) -> float:
+    estimate = mirror_stats.estimate(url)
+    if estimate is None:
+        return MIRROR_HEDGE_DELAY
+    return min(MIRROR_HEDGE_DELAY, max(MIRROR_HEDGE_MIN, 2 * estimate))
+
+
+def hedged_get(
+    urls: Iterable[str],
+    hedge_delay: Optional[float] = None,
+    session: Optional[requests.Session] = None,
+    **kwargs,
+) -> requests.Response:
+    """
+    依次请求镜像，先返回可用响应的胜出
+
+    先请求 urls[0]；超过对冲等待时间仍未返回响应头，或返回错误时，再请求
+    下一个镜像。胜出后其余请求的响应会被关闭。参数同 requests.get（通常
+    带 stream=True）。
+
+    每个镜像请求都经过 session_get：受主机熔断器保护（熔断中的镜像立即
+    失败并请求下一个）、按主机计算超时并记录响应耗时。各请求线程继承当前
+    上下文（截止时间、取消标记），客户端断开时不再发起新的对冲请求，
+    之后返回的响应直接关闭。
+
+    Returns:
+        第一个可用响应；全部不可用时返回首个错误响应（供调用方 raise_for_status）
+
+    Raises:
+        DeadlineExceeded: 请求截止时间已耗尽
+        RequestCancelled: 客户端已断开
+        全部镜像请求异常时抛出最后一个异常
+    """
+    urls = list(dict.fromkeys(url for url in urls if url))
+    if not urls:
+        raise ValueError("缺少请求地址")
+    session = session or get_session()
+
+    results: "queue.Queue" = queue.Queue()
+    lock = threading.Lock()
+    state = {"done": False}
+
+    def fetch(url: str):
+        started = time.monotonic()
+        try:
+            resp = session_get(url, session=session, **kwargs)
+        except Exception as e:
+            if not isinstance(e, (DeadlineExceeded, RequestCancelled)):
+                mirror_stats.record_failure(url)
+            results.put((url, None, e))
+            return
+        if _usable(resp):
+            mirror_stats.record(url, time.monotonic() - started)
+        else:
+            mirror_stats.record_failure(url)
+        with lock:
+            if state["done"]:
+                # 已有其他镜像胜出，或已放弃等待
+                resp.close()
+                return
+            results.put((url, resp, None))
+
+    def launch(index: int) -> float:
+        """发起第 index 个镜像请求，返回下一次对冲的时间点"""
+        if index > 0:
+            print(f"[Mirror] 对冲请求备用地址: {mirror_host(urls[index])}")
+        context = contextvars.copy_context()
+        threading.Thread(
+            target=context.run, args=(fetch, urls[index]), daemon=True
+        ).start()
+        delay = hedge_delay if hedge_delay is not None else _hedge_delay(urls[0])
+        return time.monotonic() + delay
+
+    hedge_at = launch(0)
+    launched, finished = 1, 0
+    winner: Optional[requests.Response] = None
+    fallback: Optional[requests.Response] = None
+    last_error: Optional[Exception] = None
+
+    try:
+        while finished < launched:
+            check_cancelled("mirror")
+            wait = MIRROR_POLL_INTERVAL
+            if launched < len(urls):
+                wait = max(0.0, min(wait, hedge_at - time.monotonic()))
+            try:
+                url, resp, error = results.get(timeout=wait)
+            except queue.Empty:
+                if launched < len(urls) and time.monotonic() >= hedge_at:
+                    hedge_at = launch(launched)
+                    launched += 1
+                continue
+
+            finished += 1
+            if resp is not None and _usable(resp):
+                winner = resp
+                break
+            if resp is not None:
+                if fallback is None:
+                    fallback = resp
+                else:
+                    resp.close()
+            else:
+                last_error = error
+            # 失败时立即请求下一个镜像
+            if launched < len(urls):
+                hedge_at = launch(launched)
+                launched += 1
+    except BaseException:
+        # 客户端断开或截止时间耗尽，提前放弃
+        if fallback is not None:
+            fallback.close()
+        raise
+    finally:
+        with lock:
+            state["done"] = True
+        # 关闭在胜出之前已返回、但尚未处理的响应
+        while not results.empty():
+            _, resp, _ = results.get_nowait()
+            if resp is not None:
+                resp.close()
+
+    if winner is not None:
+        if fallback is not None:
+            fallback.close()
+        return winner
+    if fallback is not None:
+        return fallback
+    if deadline_expired():
+        raise DeadlineExceeded("mirror") from last_error
+    raise last_error
+
+
+async def async_hedged_get(urls: Iterable[str], **kwargs) -> requests.Response:
+    """hedged_get 的异步版本（在线程中执行）"""
+    return await asyncio.to_thread(hedged_get, list(urls), **kwargs)
@@ -0,0 +1,203 @@
+"""
+优先级调度 - 交互式请求优先于后台任务
+
+调用方通过请求头 X-Priority 指定优先级（interactive / background），未指定时
+按路由决定：批量解析、音频提取等后台路由为 background，其余为 interactive。
+优先级保存在 contextvar 中，PrioritySemaphore 排队时交互式请求排在等待中的
+后台请求之前；后台请求每多等待 PRIORITY_AGING_SECONDS 秒就相当于提升一级，
+不会被持续到来的交互式请求饿死。
+"""
+
+import os
+import time
+import heapq
+import asyncio
+import itertools
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterable, Optional
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# 请求头中的优先级
+PRIORITY_HEADER = "X-Priority"
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+# 优先级 -> 等级（越小越优先）
+PRIORITY_RANKS = {INTERACTIVE: 0, BACKGROUND: 1}
+
+# 后台请求等待多久（秒）后与新到的交互式请求同等优先
+PRIORITY_AGING_SECONDS = float(os.environ.get("PRIORITY_AGING_SECONDS", "10"))
+# 每个优先级保留的最近样本数
+PRIORITY_WINDOW = 500
+
+_priority: contextvars.ContextVar = contextvars.ContextVar(
+    "request_priority", default=INTERACTIVE
+)
+
+
+def parse_priority(value: Optional[str]) -> Optional[str]:
+    """解析优先级请求头，无效值返回 None"""
+    value = (value or "").strip().lower()
+    return value if value in PRIORITY_RANKS else None
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+@contextmanager
+def priority_scope(priority: str):
+    """在当前上下文设置优先级"""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class PriorityStats:
+    """按优先级统计请求耗时与排队等待时间（线程安全）"""
+
+    def __init__(self, window: int = PRIORITY_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._latency: Dict[str, Deque[float]] = {}
+        self._wait: Dict[str, Deque[float]] = {}
+        self._counts: Dict[str, int] = {}
+
+    def _append(self, samples: Dict[str, Deque[float]], priority: str, seconds: float):
+        if priority not in samples:
+            samples[priority] = deque(maxlen=self.window)
+        samples[priority].append(seconds)
+
+    def record_latency(self, priority: str, seconds: float):
+        with self._lock:
+            self._append(self._latency, priority, seconds)
+            self._counts[priority] = self._counts.get(priority, 0) + 1
+
+    def record_wait(self, priority: str, seconds: float):
+        with self._lock:
+            self._append(self._wait, priority, seconds)
+
+    @staticmethod
+    def _summary(samples: Iterable[float]) -> dict:
+        samples = sorted(samples)
+        if not samples:
+            return {"p50": 0.0, "p95": 0.0, "max": 0.0}
+        return {
+            "p50": round(samples[len(samples) // 2], 3),
+            "p95": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+            "max": round(samples[-1], 3),
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                priority: {
+                    "requests": self._counts.get(priority, 0),
+                    "latency": self._summary(self._latency.get(priority, ())),
+                    "queueWait": self._summary(self._wait.get(priority, ())),
+                }
+                for priority in PRIORITY_RANKS
+            }
+
+
+priority_stats = PriorityStats()
+
+
+class PrioritySemaphore:
+    """
+    按优先级唤醒等待者的信号量（asyncio）
+
+    等待者按 入队时间 + 等级 × aging 排序：交互式请求排在已等待不足
+    aging 秒的后台请求之前，等待更久的后台请求则先被唤醒。
+
+    Args:
+        value: 并发名额
+        aging: 每一级优先级相当于的等待秒数
+    """
+
+    def __init__(self, value: int, aging: float = PRIORITY_AGING_SECONDS):
+        self._value = value
+        self.aging = aging
+        self._waiters: list = []
+        self._seq = itertools.count()
+
+    def locked(self) -> bool:
+        return self._value <= 0
+
+    def waiting(self) -> Dict[str, int]:
+        """各优先级的等待数"""
+        counts = {priority: 0 for priority in PRIORITY_RANKS}
+        for _, _, priority, future in self._waiters:
+            if not future.done():
+                counts[priority] += 1
+        return counts
+
+    async def acquire(self, priority: Optional[str] = None) -> bool:
+        priority = priority or current_priority()
+        if self._value > 0 and not any(not w[3].done() for w in self._waiters):
+            self._value -= 1
+            return True
+
+        future = asyncio.get_running_loop().create_future()
+        order = time.monotonic() + PRIORITY_RANKS.get(priority, 0) * self.aging
+        heapq.heappush(self._waiters, (order, next(self._seq), priority, future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 已分配名额但随即被取消：转交给下一个等待者
+                self.release()
+            raise
+        return True
+
+    def release(self):
+        self._value += 1
+        while self._waiters and self._value > 0:
+            _, _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                self._value -= 1
+                future.set_result(True)
+
+    async def __aenter__(self):
+        await self.acquire()
+
+    async def __aexit__(self, *exc):
+        self.release()
+
+
+class PriorityMiddleware:
+    """
+    设置请求优先级并按优先级统计请求耗时
+
+    Args:
+        app: ASGI 应用
+        background_paths: 未指定 X-Priority 时视为后台请求的路径前缀
+    """
+
+    def __init__(self, app: ASGIApp, background_paths: Iterable[str] = ()):
+        self.app = app
+        self.background_paths = tuple(background_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        priority = parse_priority(Headers(scope=scope).get(PRIORITY_HEADER))
+        if priority is None:
+            background = scope["path"].startswith(self.background_paths)
+            priority = BACKGROUND if background else INTERACTIVE
+
+        started = time.monotonic()
+        try:
+            with priority_scope(priority):
+                await self.app(scope, receive, send)
+        finally:
+            priority_stats.record_latency(priority, time.monotonic() - started)
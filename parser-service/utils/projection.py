@@ -0,0 +1,113 @@
+"""
+解析结果裁剪 - fields 投影与精简模式
+"""
+
+from typing import Any, Iterable, List, Optional, Union
+
+# 精简模式：原始值字段存在时，去掉对应的格式化字段
+# (格式化字段, 原始值字段)
+COMPACT_DUPLICATES = (
+    ("views", "viewsRaw"),
+    ("views", "stat"),
+    ("likes", "stat"),
+    ("comments", "stat"),
+    ("danmaku", "stat"),
+    ("coin", "stat"),
+    ("favorite", "stat"),
+    ("shares", "stat"),
+    ("createTime", "createTimeRaw"),
+    ("createTime", "pubdate"),
+    # 抖音/小红书的 "宽x高" 字符串
+    ("dimension", "width"),
+)
+
+# 精简模式下视频流去掉的字段（备用地址、格式化大小、内部排序键）
+COMPACT_STREAM_DROP = ("backupUrls", "size", "priority")
+
+
+def parse_fields(fields: Optional[Union[str, Iterable[str]]]) -> Optional[List[str]]:
+    """规范化 fields 参数（逗号分隔或列表），空值返回 None 表示不裁剪"""
+    if not fields:
+        return None
+    if isinstance(fields, str):
+        fields = [fields]
+    paths = []
+    for item in fields:
+        paths.extend(path.strip() for path in item.split(",") if path.strip())
+    return paths or None
+
+
+def _field_tree(paths: List[str]) -> dict:
+    """把点分路径（如 stat.view、videoStreams.url）转换为嵌套字典"""
+    tree = {}
+    for path in paths:
+        node = tree
+        for part in path.split("."):
+            node = node.setdefault(part, {})
+    return tree
+
+
+def _apply(value: Any, tree: dict) -> Any:
+    if not tree:
+        return value
+    if isinstance(value, list):
+        return [_apply(item, tree) for item in value]
+    if isinstance(value, dict):
+        return {
+            key: _apply(value[key], subtree)
+            for key, subtree in tree.items()
+            if key in value
+        }
+    return value
+
+
+def project(data: dict, fields: Optional[Union[str, Iterable[str]]]) -> dict:
+    """
+    按 fields 保留字段
+
+    路径用点分隔，列表中的每个元素都会按同一路径裁剪，
+    如 "title,stat.view,videoStreams.url"；不存在的字段会被忽略。
+    """
+    paths = parse_fields(fields)
+    if not paths or not isinstance(data, dict):
+        return data
+    return _apply(data, _field_tree(paths))
+
+
+def compact(data: dict) -> dict:
+    """
+    精简模式：去掉格式化的重复字段、视频流的备用地址与值为 None 的字段
+
+    音频流保留 backupUrls，供音频代理失败时回退。
+    """
+    if not isinstance(data, dict):
+        return data
+    result = {key: value for key, value in data.items() if value is not None}
+    for formatted, raw in COMPACT_DUPLICATES:
+        if formatted in result and raw in result:
+            del result[formatted]
+
+    if isinstance(result.get("videoStreams"), list):
+        result["videoStreams"] = [
+            {
+                key: value
+                for key, value in stream.items()
+                if key not in COMPACT_STREAM_DROP and value is not None
+            }
+            if isinstance(stream, dict)
+            else stream
+            for stream in result["videoStreams"]
+        ]
+    return result
+
+
+def shape_result(
+    data: Optional[dict],
+    fields: Optional[Union[str, Iterable[str]]] = None,
+    compact_mode: bool = False,
+) -> Optional[dict]:
+    """先按 fields 投影，再按需精简（精简只在原始值字段也被保留时去掉格式化字段）"""
+    if data is None:
+        return None
+    data = project(data, fields)
+    return compact(data) if compact_mode else data
@@ -0,0 +1,91 @@
+"""
+限流工具 - 令牌桶与按 Key 的并发/速率限制
+"""
+
+import time
+import asyncio
+import hashlib
+import threading
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, Tuple
+
+from .priority import PrioritySemaphore
+
+
+class TokenBucket:
+    """
+    令牌桶（线程安全）
+
+    Args:
+        rate: 每秒补充的令牌数
+        capacity: 桶容量（允许的突发量）
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, amount: float = 1) -> bool:
+        """尝试取出令牌，不足时立即返回 False"""
+        with self._lock:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return True
+            return False
+
+    def wait_time(self, amount: float = 1) -> float:
+        """令牌足够前还需等待的秒数"""
+        with self._lock:
+            self._refill()
+            return max(0.0, (min(amount, self.capacity) - self.tokens) / self.rate)
+
+    async def acquire(self, amount: float = 1):
+        """等待直到取出令牌（超过容量的请求按容量计）"""
+        amount = min(amount, self.capacity)
+        while not self.try_acquire(amount):
+            await asyncio.sleep(max(self.wait_time(amount), 0.01))
+
+
+class KeyedLimiter:
+    """
+    按 Key（如 API Key）限制并发数与 token 速率
+
+    Args:
+        concurrency: 每个 Key 的最大并发请求数
+        tokens_per_minute: 每个 Key 每分钟的 token 配额，0 表示不限制
+    """
+
+    def __init__(self, concurrency: int = 4, tokens_per_minute: int = 0):
+        self.concurrency = concurrency
+        self.tokens_per_minute = tokens_per_minute
+        self._limits: Dict[str, Tuple[PrioritySemaphore, Optional[TokenBucket]]] = {}
+
+    def _get(self, key: str) -> Tuple[PrioritySemaphore, Optional[TokenBucket]]:
+        # 不在内存中保存原始 API Key
+        digest = hashlib.sha1((key or "").encode("utf-8")).hexdigest()
+        if digest not in self._limits:
+            bucket = (
+                TokenBucket(self.tokens_per_minute / 60, self.tokens_per_minute)
+                if self.tokens_per_minute > 0
+                else None
+            )
+            self._limits[digest] = (PrioritySemaphore(self.concurrency), bucket)
+        return self._limits[digest]
+
+    @asynccontextmanager
+    async def limit(self, key: str, tokens: int = 0):
+        """占用一个并发名额（交互式请求优先）并扣除预计消耗的 token"""
+        semaphore, bucket = self._get(key)
+        async with semaphore:
+            if bucket is not None and tokens:
+                await bucket.acquire(tokens)
+            yield
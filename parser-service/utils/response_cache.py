@@ -0,0 +1,198 @@
+"""
+响应缓存 - 内存 LRU + 可选的 SQLite 磁盘层
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Iterable, Optional
+
+# 参与 AI 对话缓存键的字段
+CHAT_CACHE_FIELDS = ("model", "messages", "temperature", "max_tokens")
+
+
+def chat_cache_key(url: str, body: Optional[str]) -> Optional[str]:
+    """
+    生成 chat/completions 请求的缓存键
+
+    只取 model、messages、temperature、max_tokens 并规范化后计算哈希，
+    字段顺序、空白等差异不影响结果；请求体不是 JSON 对象时返回 None。
+    """
+    try:
+        payload = json.loads(body or "")
+    except ValueError:
+        return None
+    if not isinstance(payload, dict) or payload.get("stream"):
+        return None
+
+    normalized = json.dumps(
+        [url, {k: payload.get(k) for k in CHAT_CACHE_FIELDS}],
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def proxy_cache_key(
+    url: str, cookie: Optional[str] = None, identity: Iterable[str] = ()
+) -> str:
+    """
+    生成代理 GET 请求的缓存键：URL + Cookie 身份哈希
+
+    identity 中列出的 Cookie 字段存在时只用这些字段计算身份（忽略 buvid3、
+    b_nut 等每次访问都可能变化的字段），否则使用整个 Cookie。
+    """
+    pairs = {}
+    for item in (cookie or "").split(";"):
+        name, sep, value = item.strip().partition("=")
+        if sep:
+            pairs[name.strip()] = value.strip()
+    selected = {name: pairs[name] for name in identity if name in pairs}
+
+    normalized = json.dumps(
+        [url, selected or pairs], sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """线程安全的内存 LRU 缓存，可为条目设置过期时间"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # key -> (过期时间或 None, 值)
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "maxEntries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+class DiskCache:
+    """基于 SQLite 的磁盘缓存层，按最近访问时间淘汰"""
+
+    def __init__(self, db_path: str, max_entries: int = 5000):
+        self.max_entries = max_entries
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE cache SET accessed_at = ? WHERE key = ?", (time.time(), key)
+            )
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, accessed_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), time.time()),
+            )
+            self._conn.execute(
+                "DELETE FROM cache WHERE key IN ("
+                "SELECT key FROM cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM cache")
+
+    def stats(self) -> dict:
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        return {"entries": count, "maxEntries": self.max_entries}
+
+
+class ResponseCache:
+    """两级响应缓存：先查内存，未命中再查磁盘并回填内存"""
+
+    def __init__(self, max_entries: int = 256, disk_path: Optional[str] = None):
+        self.memory = LRUCache(max_entries)
+        self.disk = DiskCache(disk_path) if disk_path else None
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        return value
+
+    def set(self, key: str, value: Any):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> dict:
+        return {
+            "memory": self.memory.stats(),
+            "disk": self.disk.stats() if self.disk is not None else None,
+        }
@@ -0,0 +1,68 @@
+"""
+流式响应工具 - 将 requests 的阻塞式响应体转为异步迭代
+"""
+
+import json
+from typing import Any, AsyncIterator, Optional
+
+import requests
+from starlette.concurrency import iterate_in_threadpool
+
+from .cancellation import cancel_stats, is_cancelled
+
+
+async def iter_upstream(
+    resp: requests.Response,
+    chunk_size: Optional[int] = 64 * 1024,
+    skip: int = 0,
+    limit: Optional[int] = None,
+    tag: str = "Stream",
+    decode: bool = True,
+) -> AsyncIterator[bytes]:
+    """
+    异步迭代上游响应体
+
+    阻塞读取在线程池中执行，不占用事件循环。客户端断开时 Starlette 会关闭
+    该生成器，finally 中随即关闭上游连接，不再继续拉取数据。
+
+    Args:
+        resp: 以 stream=True 发起的上游响应
+        chunk_size: 每次读取的字节数，None 表示数据到达即输出（适用于 SSE）
+        skip: 丢弃开头的字节数（上游忽略 Range 时在本地跳过）
+        limit: 最多输出的字节数，None 表示不限制
+        tag: 日志前缀
+        decode: 是否解压 Content-Encoding；False 时按上游原始字节输出
+    """
+    finished = False
+    if decode:
+        chunks = resp.iter_content(chunk_size)
+    else:
+        chunks = resp.raw.stream(chunk_size or 64 * 1024, decode_content=False)
+    try:
+        async for chunk in iterate_in_threadpool(chunks):
+            if skip:
+                if len(chunk) <= skip:
+                    skip -= len(chunk)
+                    continue
+                chunk = chunk[skip:]
+                skip = 0
+
+            if limit is not None:
+                if len(chunk) >= limit:
+                    yield chunk[:limit]
+                    break
+                limit -= len(chunk)
+
+            yield chunk
+        finished = True
+    finally:
+        resp.close()
+        if not finished:
+            if is_cancelled():
+                cancel_stats.add("stream")
+            print(f"[{tag}] 客户端已断开，关闭上游连接")
+
+
+def sse_event(event: str, data: Any) -> str:
+    """生成一条 Server-Sent Events 消息"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
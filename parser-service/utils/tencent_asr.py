@@ -0,0 +1,296 @@
+"""
+腾讯云录音文件识别 - 服务端 TC3 签名、提交任务、轮询与结果合并
+文档: https://cloud.tencent.com/document/product/1093
+"""
+
+import re
+import json
+import time
+import hmac
+import hashlib
+import contextvars
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+from urllib.parse import urlparse
+
+from .http_client import post_with_retry
+from .cancellation import cancellable_sleep, check_cancelled
+
+ASR_ENDPOINT = "https://asr.tencentcloudapi.com"
+ASR_SERVICE = "asr"
+ASR_VERSION = "2019-06-14"
+
+# 任务状态: 0-任务等待，1-任务执行中，2-任务成功，3-任务失败
+TASK_WAITING = 0
+TASK_RUNNING = 1
+TASK_SUCCESS = 2
+TASK_FAILED = 3
+
+_TIMESTAMP_RE = re.compile(r"^\[\d+:\d+\.\d+,\s*\d+:\d+\.\d+\]\s*", re.MULTILINE)
+
+
+class TencentAsrError(Exception):
+    """腾讯云 ASR 调用失败"""
+
+
+def tc3_sign(
+    secret_id: str,
+    secret_key: str,
+    host: str,
+    action: str,
+    payload: str,
+    timestamp: int,
+    service: str = ASR_SERVICE,
+) -> str:
+    """生成腾讯云 TC3-HMAC-SHA256 签名，返回 Authorization 头"""
+    algorithm = "TC3-HMAC-SHA256"
+    date = datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%d")
+    content_type = "application/json; charset=utf-8"
+
+    # 1. 拼接规范请求串
+    canonical_headers = (
+        f"content-type:{content_type}\nhost:{host}\nx-tc-action:{action.lower()}\n"
+    )
+    signed_headers = "content-type;host;x-tc-action"
+    hashed_payload = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    canonical_request = (
+        f"POST\n/\n\n{canonical_headers}\n{signed_headers}\n{hashed_payload}"
+    )
+
+    # 2. 拼接待签名字符串
+    credential_scope = f"{date}/{service}/tc3_request"
+    hashed_canonical_request = hashlib.sha256(
+        canonical_request.encode("utf-8")
+    ).hexdigest()
+    string_to_sign = (
+        f"{algorithm}\n{timestamp}\n{credential_scope}\n{hashed_canonical_request}"
+    )
+
+    # 3. 计算签名
+    def _hmac(key: bytes, msg: str) -> bytes:
+        return hmac.new(key, msg.encode("utf-8"), hashlib.sha256).digest()
+
+    secret_date = _hmac(("TC3" + secret_key).encode("utf-8"), date)
+    secret_service = _hmac(secret_date, service)
+    secret_signing = _hmac(secret_service, "tc3_request")
+    signature = hmac.new(
+        secret_signing, string_to_sign.encode("utf-8"), hashlib.sha256
+    ).hexdigest()
+
+    # 4. 拼接 Authorization
+    return (
+        f"{algorithm} Credential={secret_id}/{credential_scope}, "
+        f"SignedHeaders={signed_headers}, Signature={signature}"
+    )
+
+
+def clean_timestamps(text: str) -> str:
+    """
+    清理识别结果中的时间戳前缀
+    如: [0:0.000,0:30.798] 文本内容 => 文本内容
+    """
+    if not text:
+        return ""
+    return _TIMESTAMP_RE.sub("", text).strip()
+
+
+class TencentAsrClient:
+    """腾讯云录音文件识别客户端"""
+
+    def __init__(
+        self,
+        secret_id: str,
+        secret_key: str,
+        region: str = "ap-shanghai",
+        endpoint: Optional[str] = None,
+    ):
+        self.secret_id = secret_id
+        self.secret_key = secret_key
+        self.region = region
+        self.endpoint = endpoint or ASR_ENDPOINT
+        self.host = urlparse(self.endpoint).netloc
+
+    def call(self, action: str, params: dict) -> dict:
+        """调用腾讯云 API，返回 Response 字段"""
+        timestamp = int(time.time())
+        payload = json.dumps(params, ensure_ascii=False)
+        headers = {
+            "Content-Type": "application/json; charset=utf-8",
+            "Host": self.host,
+            "X-TC-Action": action,
+            "X-TC-Version": ASR_VERSION,
+            "X-TC-Timestamp": str(timestamp),
+            "X-TC-Region": self.region,
+            "Authorization": tc3_sign(
+                self.secret_id,
+                self.secret_key,
+                self.host,
+                action,
+                payload,
+                timestamp,
+            ),
+        }
+
+        success, result = post_with_retry(
+            url=self.endpoint,
+            headers=headers,
+            data=payload.encode("utf-8"),
+            timeout=30,
+            retries=3,
+            retry_delay=1.0,
+        )
+        if not success:
+            raise TencentAsrError(f"请求失败: {result}")
+
+        try:
+            response = result.json().get("Response", {})
+        except ValueError:
+            raise TencentAsrError(f"响应解析失败: HTTP {result.status_code}")
+
+        error = response.get("Error")
+        if error:
+            raise TencentAsrError(f"{error.get('Code')}: {error.get('Message')}")
+        return response
+
+    def create_task(
+        self,
+        audio_base64: Optional[str] = None,
+        audio_url: Optional[str] = None,
+        engine: str = "16k_zh",
+        res_text_format: int = 1,
+    ) -> int:
+        """创建录音文件识别任务，返回 TaskId"""
+        params = {
+            "EngineModelType": engine,
+            "ChannelNum": 1,
+            "ResTextFormat": res_text_format,
+        }
+        if audio_base64:
+            params["SourceType"] = 1
+            params["Data"] = audio_base64
+            params["DataLen"] = len(audio_base64)
+        elif audio_url:
+            params["SourceType"] = 0
+            params["Url"] = audio_url
+        else:
+            raise TencentAsrError("缺少音频数据")
+
+        task_id = self.call("CreateRecTask", params).get("Data", {}).get("TaskId")
+        if not task_id:
+            raise TencentAsrError("创建识别任务失败")
+        return task_id
+
+    def wait_for_result(
+        self,
+        task_id: int,
+        on_status: Optional[Callable[[int, int], None]] = None,
+        timeout: float = 600,
+        min_interval: float = 1.0,
+        max_interval: float = 8.0,
+    ) -> str:
+        """
+        轮询等待识别完成（自适应退避）
+
+        任务刚提交时间隔较短，状态未变化时逐步拉长轮询间隔，
+        状态发生变化（如从等待进入执行）时重新缩短间隔。
+
+        Args:
+            task_id: 任务 ID
+            on_status: 状态回调 on_status(status, poll_count)
+            timeout: 最长等待时间（秒）
+            min_interval: 最短轮询间隔（秒）
+            max_interval: 最长轮询间隔（秒）
+        """
+        deadline = time.monotonic() + timeout
+        interval = min_interval
+        last_status = None
+        polls = 0
+
+        while time.monotonic() < deadline:
+            check_cancelled("asr")
+            data = self.call("DescribeTaskStatus", {"TaskId": task_id}).get("Data", {})
+            status = data.get("Status")
+            polls += 1
+
+            if status == TASK_SUCCESS:
+                return data.get("Result", "")
+            if status == TASK_FAILED:
+                raise TencentAsrError(data.get("ErrorMsg") or "识别失败")
+
+            if on_status:
+                on_status(status, polls)
+
+            if status != last_status:
+                interval = min_interval
+                last_status = status
+            else:
+                interval = min(interval * 1.5, max_interval)
+
+            cancellable_sleep(min(interval, max(deadline - time.monotonic(), 0)), "asr")
+
+        raise TencentAsrError("识别超时，请稍后重试")
+
+    def recognize(
+        self,
+        chunks: List[dict],
+        engine: str = "16k_zh",
+        res_text_format: int = 1,
+        concurrency: int = 4,
+        on_progress: Optional[Callable[[dict], None]] = None,
+    ) -> dict:
+        """
+        并发识别多段音频并按顺序合并结果
+
+        Args:
+            chunks: 音频分段列表，每项包含 audio_base64 或 audio_url
+            engine: 引擎模型类型
+            res_text_format: 识别结果格式
+            concurrency: 同时进行的识别任务数
+            on_progress: 进度回调，参数为事件字典
+
+        Returns:
+            {"text": 合并后的文本, "chunks": 各分段结果}
+        """
+
+        def emit(event: dict):
+            if on_progress:
+                on_progress(event)
+
+        def recognize_one(index: int, chunk: dict) -> dict:
+            started = time.monotonic()
+            task_id = self.create_task(
+                audio_base64=chunk.get("audio_base64"),
+                audio_url=chunk.get("audio_url"),
+                engine=engine,
+                res_text_format=res_text_format,
+            )
+            emit({"index": index, "stage": "created", "taskId": task_id})
+
+            result = self.wait_for_result(
+                task_id,
+                on_status=lambda status, polls: emit(
+                    {"index": index, "stage": "polling", "status": status, "polls": polls}
+                ),
+            )
+            text = clean_timestamps(result)
+            elapsed = round(time.monotonic() - started, 3)
+            emit({"index": index, "stage": "done", "elapsed": elapsed})
+            return {"index": index, "taskId": task_id, "text": text, "elapsed": elapsed}
+
+        pool = ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(chunks))))
+        try:
+            # 复制上下文，使分段线程能感知客户端断开
+            futures = [
+                pool.submit(contextvars.copy_context().run, recognize_one, i, c)
+                for i, c in enumerate(chunks)
+            ]
+            results = [f.result() for f in futures]
+        finally:
+            # 任一分段失败时不再提交剩余分段
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        return {
+            "text": "\n".join(r["text"] for r in results if r["text"]),
+            "chunks": results,
+        }
@@ -0,0 +1,85 @@
+"""
+文本工具 - token 估算、按句子边界分段
+"""
+
+import re
+from typing import List
+
+_CJK_RE = re.compile(r"[぀-ヿ㐀-䶿一-鿿豈-﫿가-힯]")
+
+# 句末位置：中文/全角标点、换行之后，或英文句点后接空白
+_SENTENCE_END_RE = re.compile(r"(?<=[。！？!?；;…\n])|(?<=\.)(?=\s)")
+
+# 过长句子再按逗号等次级标点切分
+_CLAUSE_END_RE = re.compile(r"(?<=[，,、：:])")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估算文本的 token 数
+
+    中日韩字符约 1 字 1 token，其余字符约 4 个字符 1 token。
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def split_sentences(text: str) -> List[str]:
+    """按句子边界切分文本（保留标点，拼接后与原文一致）"""
+    if not text:
+        return []
+    return [s for s in _SENTENCE_END_RE.split(text) if s]
+
+
+def _split_long(sentence: str, max_tokens: int) -> List[str]:
+    """把超出上限的单句按次级标点切分，仍超出时按字符数硬切"""
+    pieces = []
+    for clause in _CLAUSE_END_RE.split(sentence):
+        if not clause:
+            continue
+        if estimate_tokens(clause) <= max_tokens:
+            pieces.append(clause)
+            continue
+        # 每个字符至多 1 token，按 max_tokens 个字符切分一定不超限
+        pieces.extend(
+            clause[i : i + max_tokens] for i in range(0, len(clause), max_tokens)
+        )
+    return pieces
+
+
+def chunk_text(text: str, max_tokens: int = 1500) -> List[str]:
+    """
+    按句子边界把文本切分为若干段，每段估算 token 数不超过 max_tokens
+
+    Args:
+        text: 原文
+        max_tokens: 每段 token 上限
+
+    Returns:
+        分段列表（空白段会被丢弃）
+    """
+    max_tokens = max(1, max_tokens)
+    chunks = []
+    current = ""
+    current_tokens = 0
+
+    for sentence in split_sentences(text):
+        sentence_tokens = estimate_tokens(sentence)
+        pieces = (
+            [sentence]
+            if sentence_tokens <= max_tokens
+            else _split_long(sentence, max_tokens)
+        )
+        for piece in pieces:
+            piece_tokens = estimate_tokens(piece)
+            if current and current_tokens + piece_tokens > max_tokens:
+                chunks.append(current)
+                current, current_tokens = "", 0
+            current += piece
+            current_tokens += piece_tokens
+
+    if current:
+        chunks.append(current)
+    return [chunk.strip() for chunk in chunks if chunk.strip()]
@@ -0,0 +1,204 @@
+"""
+转写结果缓存 - 按平台 + 规范媒体 ID 以及音频内容哈希保存识别结果
+
+同时记录识别引擎和参数，只有引擎与参数一致时才复用结果。同一媒体（或同一
+音频）在相同引擎与参数下只保留最新的一条结果。
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Optional
+
+
+def audio_hash(data: bytes) -> str:
+    """音频内容哈希"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def canonical_media_id(platform: str, data: dict) -> Optional[str]:
+    """
+    从解析结果中获取规范媒体 ID
+
+    抖音: awemeId，B站: bvid:cid（分P的 cid 不同），小红书: noteId
+    """
+    if not data:
+        return None
+    if platform == "douyin":
+        return data.get("awemeId") or None
+    if platform == "bilibili":
+        bvid, cid = data.get("bvid"), data.get("cid")
+        return f"{bvid}:{cid}" if bvid and cid else None
+    if platform == "xiaohongshu":
+        return data.get("noteId") or None
+    return None
+
+
+def _params_hash(params: Optional[dict]) -> str:
+    normalized = json.dumps(params or {}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+class TranscriptStore:
+    """基于 SQLite 的转写结果缓存（线程安全）"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS transcripts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    platform TEXT,
+                    media_id TEXT,
+                    audio_hash TEXT,
+                    engine TEXT NOT NULL,
+                    params_hash TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+            self._migrate_indexes()
+            self._conn.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS uq_transcripts_media "
+                "ON transcripts (platform, media_id, engine, params_hash) "
+                "WHERE media_id IS NOT NULL"
+            )
+            self._conn.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS uq_transcripts_audio "
+                "ON transcripts (audio_hash, engine, params_hash) "
+                "WHERE audio_hash IS NOT NULL"
+            )
+
+    def _migrate_indexes(self):
+        """旧版本使用普通索引，可能存在重复记录：每组只保留最新的一条"""
+        old = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' "
+            "AND name IN ('idx_transcripts_media', 'idx_transcripts_audio')"
+        ).fetchone()
+        if not old:
+            return
+        self._conn.execute(
+            "DELETE FROM transcripts WHERE media_id IS NOT NULL AND id NOT IN ("
+            "SELECT MAX(id) FROM transcripts WHERE media_id IS NOT NULL "
+            "GROUP BY platform, media_id, engine, params_hash)"
+        )
+        self._conn.execute(
+            "DELETE FROM transcripts WHERE audio_hash IS NOT NULL AND id NOT IN ("
+            "SELECT MAX(id) FROM transcripts WHERE audio_hash IS NOT NULL "
+            "GROUP BY audio_hash, engine, params_hash)"
+        )
+        self._conn.execute("DROP INDEX IF EXISTS idx_transcripts_media")
+        self._conn.execute("DROP INDEX IF EXISTS idx_transcripts_audio")
+
+    def lookup(
+        self,
+        engine: str,
+        params: Optional[dict] = None,
+        platform: Optional[str] = None,
+        media_id: Optional[str] = None,
+        audio_hash: Optional[str] = None,
+    ) -> Optional[dict]:
+        """
+        查找兼容的转写结果（优先按媒体 ID，其次按音频哈希）
+
+        Returns:
+            命中时返回记录字典，否则返回 None
+        """
+        params_hash = _params_hash(params)
+        queries = []
+        if platform and media_id:
+            queries.append(
+                (
+                    "platform = ? AND media_id = ?",
+                    (platform, media_id),
+                )
+            )
+        if audio_hash:
+            queries.append(("audio_hash = ?", (audio_hash,)))
+
+        with self._lock, self._conn:
+            for where, args in queries:
+                row = self._conn.execute(
+                    f"SELECT * FROM transcripts WHERE {where} "
+                    "AND engine = ? AND params_hash = ? "
+                    "ORDER BY created_at DESC LIMIT 1",
+                    (*args, engine, params_hash),
+                ).fetchone()
+                if row:
+                    self._conn.execute(
+                        "UPDATE transcripts SET hits = hits + 1 WHERE id = ?",
+                        (row["id"],),
+                    )
+                    return self._to_dict(row)
+        return None
+
+    def save(
+        self,
+        text: str,
+        engine: str,
+        params: Optional[dict] = None,
+        platform: Optional[str] = None,
+        media_id: Optional[str] = None,
+        audio_hash: Optional[str] = None,
+    ) -> Optional[int]:
+        """
+        保存转写结果，返回记录 ID
+
+        同一媒体 ID 或音频哈希（引擎与参数相同）已有记录时替换为新结果。
+        既没有 platform + media_id 也没有 audio_hash 时无法再被查到，不保存并
+        返回 None。
+        """
+        if not (platform and media_id):
+            platform = media_id = None
+        if media_id is None and not audio_hash:
+            return None
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT OR REPLACE INTO transcripts "
+                "(platform, media_id, audio_hash, engine, params_hash, params, text, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    platform,
+                    media_id,
+                    audio_hash or None,
+                    engine,
+                    _params_hash(params),
+                    json.dumps(params or {}, sort_keys=True, ensure_ascii=False),
+                    text,
+                    time.time(),
+                ),
+            )
+            return cursor.lastrowid
+
+    def stats(self) -> dict:
+        """缓存统计"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) AS count, COALESCE(SUM(hits), 0) AS hits FROM transcripts"
+            ).fetchone()
+        return {"count": row["count"], "hits": row["hits"]}
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> dict:
+        return {
+            "id": row["id"],
+            "platform": row["platform"],
+            "mediaId": row["media_id"],
+            "audioHash": row["audio_hash"],
+            "engine": row["engine"],
+            "params": json.loads(row["params"]),
+            "text": row["text"],
+            "createdAt": row["created_at"],
+        }
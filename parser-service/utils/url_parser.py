@@ -2,10 +2,23 @@
 
 import re
 import urllib.parse
-from urllib.parse import urlparse
-from typing import Optional
+from urllib.parse import urlparse, parse_qs
+from typing import List, Optional
 
-import requests
+from .deadline import effective_timeout
+from .http_client import CONTROL_EXCEPTIONS, session_get
+
+# 链接可能紧跟在中文文字之后（如“复制打开https://...”），开头不能用 \b
+URL_PATTERN = re.compile(
+    r"(?<![a-zA-Z0-9])https?:\/\/(?:www\.|[-a-zA-Z0-9.@:%_+~#=]{1,256}\.[a-zA-Z0-9()]{1,6})\b(?:[-a-zA-Z0-9()@:%_+.~#?&//=]*)?"
+)
+
+# 平台 -> 链接域名特征
+PLATFORM_DOMAINS = {
+    "douyin": ("douyin.com", "iesdouyin.com"),
+    "bilibili": ("bilibili.com", "b23.tv"),
+    "xiaohongshu": ("xiaohongshu.com", "xhslink.com"),
+}
 
 
 class UrlParser:
@@ -14,10 +27,7 @@ class UrlParser:
     @staticmethod
     def get_url(text: str) -> Optional[str]:
         """从文本中提取 URL"""
-        url_pattern = re.compile(
-            r"\bhttps?:\/\/(?:www\.|[-a-zA-Z0-9.@:%_+~#=]{1,256}\.[a-zA-Z0-9()]{1,6})\b(?:[-a-zA-Z0-9()@:%_+.~#?&//=]*)?"
-        )
-        match = url_pattern.search(text)
+        match = URL_PATTERN.search(text)
         if match:
             url = match.group()
             # 去除末尾可能包含的中文标点符号
@@ -25,6 +35,58 @@ class UrlParser:
             return url
         return None
 
+    @staticmethod
+    def get_urls(text: str) -> List[str]:
+        """从文本中提取全部 URL（去重，保持出现顺序）"""
+        urls = []
+        for match in URL_PATTERN.finditer(text or ""):
+            url = match.group().rstrip("、，。；：！？")
+            if url not in urls:
+                urls.append(url)
+        return urls
+
+    @staticmethod
+    def detect_platform(url: str) -> Optional[str]:
+        """
+        识别链接所属平台
+
+        Returns:
+            平台名称: douyin/bilibili/xiaohongshu/None
+        """
+        url_lower = url.lower()
+        for platform, domains in PLATFORM_DOMAINS.items():
+            if any(domain in url_lower for domain in domains):
+                return platform
+        return None
+
+    @staticmethod
+    def get_canonical_id(url: str, platform: Optional[str] = None) -> Optional[str]:
+        """
+        从（重定向后的）链接中提取规范内容 ID，用于批量解析去重
+
+        抖音: aweme_id，B站: BV号:p分P（或 av号），小红书: 笔记 ID；
+        短链接等无法识别的返回 None
+        """
+        platform = platform or UrlParser.detect_platform(url)
+        if platform == "douyin":
+            match = re.search(r"/(?:video|note)/(\d+)", url) or re.search(
+                r"modal_id=(\d+)", url
+            )
+            return match.group(1) if match else None
+        if platform == "bilibili":
+            match = re.search(r"BV[a-zA-Z0-9]{10}", url) or re.search(
+                r"/video/(av\d+)", url, re.IGNORECASE
+            )
+            if not match:
+                return None
+            video_id = match.group(1) if match.groups() else match.group(0)
+            page = parse_qs(urlparse(url).query).get("p", ["1"])[0]
+            return f"{video_id}:p{page}"
+        if platform == "xiaohongshu":
+            match = re.search(r"/(?:explore|discovery/item|item)/([0-9a-zA-Z]+)", url)
+            return match.group(1) if match else None
+        return None
+
     @staticmethod
     def get_video_id(url: str) -> Optional[str]:
         """从 URL 中提取视频 ID"""
@@ -50,8 +112,11 @@ class UrlParser:
         }
         try:
             for _ in range(5):
-                resp = requests.get(
-                    url, headers=headers, allow_redirects=False, timeout=5
+                resp = session_get(
+                    url,
+                    headers=headers,
+                    allow_redirects=False,
+                    timeout=effective_timeout(url, 5, "redirect"),
                 )
                 redirect_url = resp.headers.get("location")
                 if redirect_url:
@@ -65,6 +130,8 @@ class UrlParser:
                 else:
                     break
             return url
+        except CONTROL_EXCEPTIONS:
+            raise
         except Exception as e:
             print(f"Redirect error: {e}")
             return url